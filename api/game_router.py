@@ -1,16 +1,21 @@
 from __future__ import annotations
+import json
+import math
 import os
-from fastapi import APIRouter, Header, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request
 from typing import Literal
 
 from services.alerts_cog import AlertsCog
-from db.models_game import PlayerStats
+from models.models_game import DELTA_FIELDS, STAT_FIELDS, PlayerStats
+from services.leaderboard import leaderboard
+from services.stats_buffer import stats_buffer
+from utils.config import settings
 from utils.db import async_session_maker
 
 router = APIRouter(prefix="/game", tags=["game"]) 
 
 async def _require_token(authorization: str | None):
-    token = os.getenv("GAME_EVENT_TOKEN")
+    token = getattr(settings, "GAME_EVENT_TOKEN", "") or os.getenv("GAME_EVENT_TOKEN")
     if not token or not authorization or not authorization.startswith("Bearer ") or authorization.split(" ",1)[1] != token:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
@@ -28,7 +33,120 @@ async def post_alert(kind: Literal["rare_loot","boss","suspicious"], payload: di
 @router.post("/stats/update")
 async def stats_update(item: dict, authorization: str | None = Header(default=None)):
     await _require_token(authorization)
-    # item = {player, kills, deaths, playtime_hours}
+    # item = {player, kills, deaths, playtime_hours} and/or increments {kills_delta, deaths_delta, playtime_delta}
+    try:
+        row = stat_row(item, numeric_strings=True)  # this endpoint always took "kills": "3"
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    if _buffer_deltas(row) and len(row) == 1:
+        return {"ok": True}
     async with async_session_maker() as s:
-        await PlayerStats.upsert(s, item)
-    return {"ok": True}
\ No newline at end of file
+        stored = await PlayerStats.upsert(s, row)
+    leaderboard.update([stored])
+    return {"ok": True}
+
+MAX_BULK_ROWS = 10_000
+
+def parse_stats_body(body: bytes, content_type: str | None) -> list:
+    """JSON array (or {"items": [...]}) or NDJSON; an unparseable NDJSON line becomes a ValueError item."""
+    text = body.decode("utf-8", errors="replace")
+    ndjson = "ndjson" in (content_type or "") or "jsonl" in (content_type or "")
+    if not ndjson:
+        try:
+            data = json.loads(text)
+        except ValueError:
+            ndjson = True  # no (or a wrong) content type: one object per line is the other accepted form
+        else:
+            items = data.get("items") if isinstance(data, dict) else data
+            if not isinstance(items, list):
+                raise HTTPException(status_code=400, detail="Expected a JSON array of stats objects")
+            return items
+    items: list = []
+    for n, line in enumerate(text.splitlines(), 1):
+        if line.strip():
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(ValueError(f"line {n}: invalid JSON ({e.msg})"))
+    return items
+
+def stat_row(item, *, numeric_strings: bool = False) -> dict:
+    """
+    Validated {player, <given stat and *_delta fields>}; raises ValueError with a short reason.
+    With `numeric_strings`, values like "3" or "1.5" are read as numbers.
+    """
+    if isinstance(item, ValueError):
+        raise item
+    if not isinstance(item, dict):
+        raise ValueError("not an object")
+    player = item.get("player")
+    if not isinstance(player, str) or not player.strip() or len(player.strip()) > 32:
+        raise ValueError("player must be a name of 1-32 characters")
+    row = {"player": player.strip()}
+    for f in (*STAT_FIELDS, *DELTA_FIELDS):
+        if f not in item or item[f] is None:
+            continue
+        v = item[f]
+        if numeric_strings and isinstance(v, str):
+            try:
+                v = float(v.strip())
+            except ValueError:
+                raise ValueError(f"{f} must be a non-negative number") from None
+        if isinstance(v, bool) or not isinstance(v, (int, float)) or not math.isfinite(v) or v < 0:
+            raise ValueError(f"{f} must be a non-negative number")
+        whole = DELTA_FIELDS.get(f, f) != "playtime_hours"
+        if whole and v != int(v):
+            raise ValueError(f"{f} must be a whole number")
+        row[f] = int(v) if whole else float(v)
+    return row
+
+def _buffer_deltas(row: dict) -> bool:
+    """Move *_delta fields of `row` into the write-behind buffer; True if there were any."""
+    deltas = {f: row.pop(f) for f in DELTA_FIELDS if f in row}
+    if deltas:
+        stats_buffer.add(row["player"], deltas.get("kills_delta", 0), deltas.get("deaths_delta", 0),
+                         deltas.get("playtime_delta", 0.0))
+    return bool(deltas)
+
+@router.post("/stats/bulk")
+async def stats_bulk(request: Request, authorization: str | None = Header(default=None)):
+    """
+    Upsert many players at once (JSON array or NDJSON); bad rows are reported, the rest are written.
+    Increments (*_delta) are buffered and written with the next stats flush.
+    """
+    await _require_token(authorization)
+    items = parse_stats_body(await request.body(), request.headers.get("content-type"))
+    if len(items) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ROWS} rows per request")
+    errors: list[dict] = []
+    rows: list[dict] = []
+    sources: list[list[int]] = []  # request indexes merged into each row
+    by_player: dict[str, int] = {}
+    buffered = 0
+    for i, item in enumerate(items):
+        try:
+            row = stat_row(item)
+        except ValueError as e:
+            errors.append({"index": i, "error": str(e)})
+            continue
+        buffered += _buffer_deltas(row)
+        if len(row) == 1:
+            continue  # increments only
+        j = by_player.get(row["player"])
+        if j is None:  # the same player twice in one statement is an error in Postgres; later values win
+            by_player[row["player"]] = len(rows)
+            rows.append(row)
+            sources.append([i])
+        else:
+            rows[j].update(row)
+            sources[j].append(i)
+    failed: dict[int, str] = {}
+    if rows:
+        async with async_session_maker() as s:
+            failed, stored = await PlayerStats.bulk_upsert(s, rows)
+        leaderboard.update(stored)
+    for j, err in failed.items():
+        errors.extend({"index": i, "player": rows[j]["player"], "error": err} for i in sources[j])
+    errors.sort(key=lambda e: e["index"])
+    return {"ok": not errors, "received": len(items), "upserted": len(rows) - len(failed), "buffered": buffered,
+            "errors": errors}
@@ -4,5 +4,20 @@ class BotError(Exception):
 class PermissionDenied(BotError):
     """Raised when user lacks proper role."""
 
+class UnknownServer(BotError):
+    """Raised when a command targets a server name that isn't registered."""
+
 class RconError(BotError):
     """Raised when RCON fails."""
+
+class RconAuthError(RconError):
+    """Raised when the RCON password is rejected."""
+
+class RconBusy(RconError):
+    """Raised when too many RCON commands of one priority class are already queued."""
+
+class RconUnavailable(RconError):
+    """Raised without touching the network while the RCON circuit breaker is open."""
+
+class PropertiesConflict(BotError):
+    """Raised when server.properties changed on the server while an edit was being written."""
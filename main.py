@@ -10,8 +10,9 @@ import sys
 import time
 from importlib import import_module
 
-from sqlalchemy import text
+from sqlalchemy import inspect as sa_inspect, text
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.ext.asyncio import AsyncEngine
 
 from fastapi import FastAPI
@@ -26,11 +27,24 @@ discord.VoiceClient.warn_nacl = False
 from utils.config import settings
 from utils.logging import configure_logging
 from utils.db import async_engine, async_session_maker  # noqa: F401
-
-from services.mc_chat_bridge import setup_chat_bridge
+from utils.discord_scheduler import rest as discord_rest
+from utils.rcon_client import close_pool, rcon_health, rcon_pool_stats
+from utils.rcon_scheduler import scheduler as rcon_scheduler
+from utils.sftp_client import close_ssh_pool, ssh_pool_stats
+
+from api.game_router import router as game_router
+from services.chat_relay import ChatRelayCog, relay as chat_relay
+from services.game_events import bus as event_bus
+from services.log_archive import LogSearchCog, archive_stats, flush_log_archive, setup_log_archive
+from services.mc_chat_bridge import chat_bridge_stats, setup_chat_bridge
 from services.minecraft_cog import MinecraftCog
 from services.moderation_cog import ModerationCog
-from services.presence_task import setup_presence_tasks
+from services.plugin_index import plugin_index
+from services.presence_task import presence_stats, setup_presence_tasks
+from services.properties_service import properties_service
+from services.server_registry import registry as server_registry, setup_server_registry
+from services.leaderboard import leaderboard
+from services.stats_buffer import stats_buffer
 
 # ---------- logging
 configure_logging(settings.LOG_LEVEL)
@@ -68,11 +82,16 @@ class MyBot(commands.Bot):
         log.info("[discord] setup_hook: loading cogs & presence")
         await self.add_cog(MinecraftCog(self))
         await self.add_cog(ModerationCog(self))
+        await self.add_cog(ChatRelayCog(self))
+        await self.add_cog(LogSearchCog(self))
         await self.load_extension("services.portal_cog")
         await self.load_extension("services.help_cog")
+        await self.load_extension("services.stats_cog")
 
 
+        await setup_server_registry(self)  # also starts one status poller per server
         setup_presence_tasks(self)
+        setup_log_archive(self, event_bus)  # subscribe before the bridge starts publishing
         setup_chat_bridge(self)
 
         try:
@@ -85,6 +104,8 @@ class MyBot(commands.Bot):
 bot = MyBot(
     command_prefix=settings.DISCORD_COMMAND_PREFIX,
     intents=intents,
+    # longer rate-limit waits raise discord.RateLimited, so the REST scheduler can park the route
+    max_ratelimit_timeout=float(getattr(settings, "DISCORD_MAX_RATELIMIT_WAIT_SECONDS", 30)),
 )
 
 # extra visibility on discord lifecycle
@@ -116,6 +137,7 @@ async def on_disconnect():
 
 # ---------- app
 app = FastAPI(title="VSB GameOperator")
+app.include_router(game_router)
 
 
 @app.get("/health")
@@ -125,6 +147,7 @@ async def health():
         "started": bool(getattr(app.state, "started", False)),
         "discord_task": getattr(app.state, "bot_task", None) is not None,
         "discord_logged_in": bot.user is not None,
+        "rcon": rcon_health(),
     }
 
 
@@ -140,6 +163,21 @@ async def debug_state():
             "guilds": intents.guilds,
             "members": intents.members,
         },
+        "rcon_pool": rcon_pool_stats(),
+        "rcon_scheduler": rcon_scheduler.stats(),
+        "discord_rest": discord_rest.stats(),
+        "servers": server_registry.stats(),
+        "ssh_pool": ssh_pool_stats(),
+        "properties": properties_service.stats(),
+        "plugin_index": plugin_index.stats(),
+        "chat_bridge": chat_bridge_stats(),
+        "chat_relay": chat_relay.stats(),
+        "events": event_bus.stats(),
+        "presence": presence_stats(),
+        "stats_buffer": stats_buffer.stats(),
+        "leaderboard": leaderboard.stats(),
+        "portal": cog.stats() if (cog := bot.get_cog("PortalCog")) else None,
+        "log_archive": archive_stats(),
     }
 
 
@@ -181,7 +219,8 @@ async def _import_models() -> "Base":
         base_mod = import_module("base")
 
     # Import model modules (add more here if you add files)
-    for name in ("models.events", "models.server", "events", "server"):
+    for name in ("models.events", "models.server", "models.log_checkpoint", "models.log_archive",
+                 "models.portal_message", "models.models_game", "events", "server"):
         with contextlib.suppress(ModuleNotFoundError):
             import_module(name)
 
@@ -189,13 +228,41 @@ async def _import_models() -> "Base":
     return Base
 
 
+def _add_missing_columns(sync_conn, metadata) -> None:
+    """ALTER TABLE … ADD COLUMN for nullable (or server-defaulted) columns an existing table lacks."""
+    inspector = sa_inspect(sync_conn)
+    prep = sync_conn.dialect.identifier_preparer
+    for table in metadata.sorted_tables:
+        have = {c["name"] for c in inspector.get_columns(table.name)}
+        for col in table.columns:
+            if col.name in have:
+                continue
+            if not col.nullable and col.server_default is None:
+                log.warning("DB: %s.%s is missing and NOT NULL without a default; add it by hand",
+                            table.name, col.name)
+                continue
+            ddl = CreateColumn(col).compile(dialect=sync_conn.dialect)
+            sync_conn.execute(text(f"ALTER TABLE {prep.format_table(table)} ADD COLUMN {ddl}"))
+            log.info("DB: added column %s.%s", table.name, col.name)
+
+
+def _create_schema(sync_conn, metadata) -> None:
+    metadata.create_all(sync_conn)
+    # create_all skips tables that already exist, so columns and indexes declared on them later
+    # (e.g. server.rcon_password, the player_stats leaderboard indexes) are added here if missing
+    _add_missing_columns(sync_conn, metadata)
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
 async def _create_all(engine: AsyncEngine) -> None:
-    """Create tables if they don't exist yet."""
+    """Create tables, and columns/indexes missing from existing tables, if they don't exist yet."""
     Base = await _import_models()
     try:
         async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-        log.info("DB schema ensured (create_all).")
+            await conn.run_sync(_create_schema, Base.metadata)
+        log.info("DB schema ensured (create_all + missing columns/indexes).")
     except SQLAlchemyError:
         log.exception("DB create_all failed.")
         raise
@@ -226,9 +293,12 @@ async def on_startup():
         log.info("[2/3] Ensuring DB schema (create_all)…")
         await _create_all(async_engine)
         log.info("[2/3] DB schema OK in %.2fs", time.perf_counter() - t)
+        await leaderboard.try_seed()
     except Exception as e:
         log.exception("DB init failed (continuing so Discord can still run): %s", e)
 
+    stats_buffer.start()  # write-behind flusher for /game/stats increments
+
     # 2) Start Discord (non-blocking) + watchdog
     if not token:
         log.error("[3/3] DISCORD_TOKEN not set; skip bot start.")
@@ -276,6 +346,20 @@ async def on_shutdown():
         bot_task.cancel()
         with contextlib.suppress(asyncio.CancelledError):
             await bot_task
+    # Close pooled RCON connections
+    with contextlib.suppress(Exception):
+        await server_registry.close()
+    with contextlib.suppress(Exception):
+        await close_pool()
+    # Close pooled SSH connections
+    with contextlib.suppress(Exception):
+        await close_ssh_pool()
+    # Write out archived events still buffered
+    with contextlib.suppress(Exception):
+        await flush_log_archive()
+    # Write buffered stat increments
+    with contextlib.suppress(Exception):
+        await stats_buffer.close()
     # Dispose DB
     with contextlib.suppress(Exception):
         await async_engine.dispose()
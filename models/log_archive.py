@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import BigInteger, Computed, DateTime, Index, String, Text, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Mapped, mapped_column
+from models.base import Base
+
+class GameLogEntry(Base):
+    """A chat line or game event from a server log, archived live by the bridge or by a .log.gz backfill."""
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    server: Mapped[str] = mapped_column(String(100))
+    kind: Mapped[str] = mapped_column(String(16))  # services.game_events kinds
+    player: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    message: Mapped[str] = mapped_column(Text, default="")
+    logged_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    # hash of (server, time, line, n-th repeat): a line archived live and again by a backfill is stored once
+    dedupe: Mapped[str] = mapped_column(String(40), unique=True)
+    tsv: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR, Computed("to_tsvector('simple', coalesce(player, '') || ' ' || message)", persisted=True),
+        deferred=True,
+    )
+
+Index("ix_gamelogentry_tsv", GameLogEntry.tsv, postgresql_using="gin")
+Index("ix_gamelogentry_player_time", func.lower(GameLogEntry.player), GameLogEntry.logged_at)
+Index("ix_gamelogentry_logged_at", GameLogEntry.logged_at)
@@ -0,0 +1,14 @@
+from typing import Optional
+from sqlalchemy import BigInteger, Integer, String, Float, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+from models.base import Base
+
+class LogCheckpoint(Base):
+    """Where the chat bridge stopped reading a server log (one row per log path)."""
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    path: Mapped[str] = mapped_column(String(512), unique=True)
+    # file identity: SFTP v3 has no inode, so hash the first line (log4j writes a timestamped header)
+    head_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    mtime: Mapped[float] = mapped_column(Float, default=0.0)
+    offset: Mapped[int] = mapped_column(BigInteger, default=0)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
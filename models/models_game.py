@@ -3,10 +3,14 @@ from dataclasses import dataclass
 from typing import Optional
 
 from sqlalchemy import BigInteger, Column, Integer, String, Float, select, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import declarative_base
 
-Base = declarative_base()
+from models.base import Base
+
+STAT_FIELDS = ("kills", "deaths", "playtime_hours")
+DELTA_FIELDS = {"kills_delta": "kills", "deaths_delta": "deaths", "playtime_delta": "playtime_hours"}
+BULK_CHUNK = 500  # rows per INSERT; 4 params each stays far below Postgres' 32767 limit
 
 class AccountLink(Base):
     __tablename__ = "account_links"
@@ -41,9 +45,10 @@ class PlayerStats(Base):
     __tablename__ = "player_stats"
     id = Column(Integer, primary_key=True)
     player = Column(String(32), index=True, unique=True)
-    kills = Column(Integer, default=0)
-    deaths = Column(Integer, default=0)
-    playtime_hours = Column(Float, default=0.0)
+    # indexed: leaderboard seeding and deep pages are ORDER BY <metric> DESC LIMIT …
+    kills = Column(Integer, default=0, index=True)
+    deaths = Column(Integer, default=0, index=True)
+    playtime_hours = Column(Float, default=0.0, index=True)
 
     @staticmethod
     async def upsert(s: AsyncSession, d: dict):
@@ -61,14 +66,81 @@ class PlayerStats(Base):
         await s.commit()
         return row
 
+    @staticmethod
+    def _upsert_stmt(rows: list[dict], fields: tuple[str, ...]):
+        """Multi-row INSERT … ON CONFLICT (player) DO UPDATE of `fields`; other columns keep their values."""
+        stmt = pg_insert(PlayerStats).values([{"kills": 0, "deaths": 0, "playtime_hours": 0.0, **r} for r in rows])
+        if not fields:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["player"])
+        else:
+            stmt = stmt.on_conflict_do_update(index_elements=["player"],
+                                              set_={f: getattr(stmt.excluded, f) for f in fields})
+        return stmt.returning(PlayerStats.player, *(PlayerStats.__table__.c[f] for f in STAT_FIELDS))
+
+    @staticmethod
+    async def bulk_upsert(s: AsyncSession, rows: list[dict]) -> tuple[dict[int, str], list]:
+        """
+        Upsert validated rows ({player, kills?, deaths?, playtime_hours?}).
+        Returns ({row index: error}, stored rows as (player, kills, deaths, playtime_hours)).
+
+        One statement per chunk of rows that set the same fields. If a chunk fails, its rows are
+        retried one by one inside savepoints so a single bad row only fails itself.
+        """
+        errors: dict[int, str] = {}
+        stored: list = []
+        groups: dict[tuple[str, ...], list[int]] = {}
+        for i, r in enumerate(rows):
+            groups.setdefault(tuple(f for f in STAT_FIELDS if f in r), []).append(i)
+        for fields, idx in groups.items():
+            for start in range(0, len(idx), BULK_CHUNK):
+                chunk = idx[start:start + BULK_CHUNK]
+                try:
+                    async with s.begin_nested():
+                        stored += (await s.execute(PlayerStats._upsert_stmt([rows[i] for i in chunk], fields))).all()
+                except Exception:
+                    for i in chunk:
+                        try:
+                            async with s.begin_nested():
+                                stored += (await s.execute(PlayerStats._upsert_stmt([rows[i]], fields))).all()
+                        except Exception as e:
+                            errors[i] = str(getattr(e, "orig", e)).splitlines()[0]
+        await s.commit()
+        return errors, stored
+
+    @staticmethod
+    def _increment_stmt(rows: list[dict]):
+        """Multi-row INSERT … ON CONFLICT (player) DO UPDATE SET kills = player_stats.kills + excluded.kills, …"""
+        stmt = pg_insert(PlayerStats).values(rows)
+        table = PlayerStats.__table__.c
+        stmt = stmt.on_conflict_do_update(index_elements=["player"],
+                                          set_={f: table[f] + getattr(stmt.excluded, f) for f in STAT_FIELDS})
+        return stmt.returning(PlayerStats.player, *(table[f] for f in STAT_FIELDS))
+
+    @staticmethod
+    async def bulk_increment(s: AsyncSession, rows: list[dict]) -> list:
+        """
+        Add {player, kills, deaths, playtime_hours} increments (new players start from them); one transaction.
+        Returns the resulting totals per player.
+        """
+        stored: list = []
+        for start in range(0, len(rows), BULK_CHUNK):
+            stored += (await s.execute(PlayerStats._increment_stmt(rows[start:start + BULK_CHUNK]))).all()
+        await s.commit()
+        return stored
+
     @staticmethod
     async def fetch_one(s: AsyncSession, player: str) -> Optional["PlayerStats"]:
         res = await s.execute(select(PlayerStats).where(PlayerStats.player == player))
         return res.scalar_one_or_none()
 
     @staticmethod
-    async def top(s: AsyncSession, metric: str, limit: int = 10):
+    async def top(s: AsyncSession, metric: str, limit: int = 10, offset: int = 0):
         if metric not in {"kills","deaths","playtime_hours"}:
             metric = "kills"
-        res = await s.execute(select(PlayerStats).order_by(getattr(PlayerStats, metric).desc()).limit(limit))
+        # ties by name in code-point order ("C" collation), the same order services.leaderboard.TopK keeps,
+        # so a page served from memory and the next one read here neither repeat nor skip anyone
+        q = (select(PlayerStats)
+             .order_by(getattr(PlayerStats, metric).desc().nulls_last(), PlayerStats.player.collate("C"))
+             .limit(limit).offset(offset))
+        res = await s.execute(q)
         return list(res.scalars())
\ No newline at end of file
@@ -0,0 +1,13 @@
+from typing import Optional
+from sqlalchemy import BigInteger, Integer, String, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+from models.base import Base
+
+class PortalMessage(Base):
+    """The bot's portal message in a channel, so restarts edit it instead of searching history."""
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    channel_id: Mapped[int] = mapped_column(BigInteger, unique=True)
+    message_id: Mapped[int] = mapped_column(BigInteger)
+    # sha256 of the last rendered embed + components; an identical render is not sent again
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
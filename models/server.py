@@ -1,3 +1,4 @@
+from typing import Optional
 from sqlalchemy import BigInteger, Integer, String, Boolean
 from sqlalchemy.orm import Mapped, mapped_column
 from models.base import Base
@@ -10,7 +11,11 @@ class Server(Base):
     sftp_host: Mapped[str] = mapped_column(String(255))
     sftp_port: Mapped[int] = mapped_column(Integer)
     sftp_user: Mapped[str] = mapped_column(String(128))
-    # store secrets elsewhere ideally; for demo keep nullable
+    # store secrets elsewhere ideally; for demo keep nullable (NULL = use the MC_RCON_/SFTP_ env values)
+    rcon_password: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    sftp_password: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    # <server_dir>/server.properties and <server_dir>/plugins; NULL = MC_PROPERTIES_PATH / MC_PLUGINS_DIR
+    server_dir: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
 
 class WhitelistEvent(Base):
@@ -6,6 +6,8 @@ from typing import Literal
 import discord
 from discord.ext import commands
 
+from utils.discord_scheduler import send_message
+
 log = logging.getLogger(__name__)
 
 ALERT_CHANNEL_ID = int(os.getenv("ALERT_CHANNEL_ID", "0"))
@@ -33,7 +35,7 @@ class AlertsCog(commands.Cog):
             e = discord.Embed(title="🛑 Suspicious Activity", color=0xEF476F)
             e.add_field(name="Player", value=payload.get("player","?"))
             e.add_field(name="Details", value=payload.get("details","?"), inline=False)
-        await ch.send(embed=e)
+        await send_message(ch, embed=e)
 
 async def setup(bot):
     await bot.add_cog(AlertsCog(bot))
\ No newline at end of file
@@ -0,0 +1,118 @@
+# services/chat_outbox.py
+"""
+Bounded outbound queue between the chat bridge and Discord.
+
+Lines are collected for a short flush window and packed into as few messages as fit in
+Discord's 2000 character limit. While a send is in flight (discord.py sleeps through 429s
+inside `send`), new lines keep queueing and go out together in the next batch. If the
+queue is full the oldest lines are dropped and the next message says how many were
+skipped, so chat falls behind by seconds rather than minutes and never loses lines silently.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+log = logging.getLogger(__name__)
+
+DISCORD_LIMIT = 2000
+
+
+def _skipped_marker(n: int) -> str:
+    return f"*… {n} line{'s' if n != 1 else ''} skipped …*"
+
+
+class ChatOutbox:
+    def __init__(self, send: Callable[[str], Awaitable[object]], *, max_lines: int = 500,
+                 window: float = 1.0, limit: int = DISCORD_LIMIT):
+        self._send = send
+        self.max_lines = max(1, max_lines)
+        self.window = window
+        self.limit = limit
+        self._queue: deque[tuple[str, float]] = deque()  # (line, monotonic time it was queued)
+        self._skipped = 0  # dropped since the last marker went out
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._last_delay = 0.0
+        self._max_delay = 0.0
+        self._stats = {"queued": 0, "sent_lines": 0, "messages": 0, "skipped": 0,
+                       "send_errors": 0, "peak_depth": 0}
+
+    def put(self, line: str) -> None:
+        if len(line) > self.limit:
+            line = line[:self.limit - 1] + "…"
+        self._queue.append((line, time.monotonic()))
+        self._stats["queued"] += 1
+        if len(self._queue) > self.max_lines:
+            self._queue.popleft()
+            self._skipped += 1
+            self._stats["skipped"] += 1
+        self._stats["peak_depth"] = max(self._stats["peak_depth"], len(self._queue))
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _pack(self) -> tuple[str, float] | None:
+        """Take as many queued lines as fit in one message; returns (content, oldest queued_at)."""
+        if not self._queue and not self._skipped:
+            return None
+        parts: list[str] = []
+        size = lines = 0
+        oldest = self._queue[0][1] if self._queue else time.monotonic()
+        if self._skipped:
+            parts.append(_skipped_marker(self._skipped))
+            size = len(parts[0])
+            self._skipped = 0
+        while self._queue:
+            line = self._queue[0][0]
+            extra = len(line) + (1 if parts else 0)
+            if size + extra > self.limit:
+                break
+            parts.append(line)
+            size += extra
+            lines += 1
+            self._queue.popleft()
+        self._stats["sent_lines"] += lines
+        return "\n".join(parts), oldest
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.window)  # let a burst accumulate into one message
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Send everything queued so far, packed into as few messages as possible."""
+        while (packed := self._pack()) is not None:
+            content, queued_at = packed
+            try:
+                await self._send(content)
+                self._stats["messages"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["send_errors"] += 1
+                log.warning("[chat_bridge] Discord send failed: %s", e)
+            self._last_delay = time.monotonic() - queued_at
+            self._max_delay = max(self._max_delay, self._last_delay)
+
+    def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> dict:
+        oldest = self._queue[0][1] if self._queue else None
+        return {
+            "depth": self.depth,
+            "oldest_age_s": round(time.monotonic() - oldest, 2) if oldest else 0.0,
+            "last_delay_s": round(self._last_delay, 2),
+            "max_delay_s": round(self._max_delay, 2),
+            **self._stats,
+        }
@@ -0,0 +1,210 @@
+# services/chat_relay.py
+"""
+Discord -> Minecraft half of the chat bridge.
+
+Messages posted in DISCORD_MC_CHAT_CHANNEL_ID are shown in-game with `tellraw @a`. They are
+collected for a short window and sent as one tellraw per batch (split only where a command
+would exceed the RCON request limit), each user has a small message budget, and the
+relay never sends more than `max_cmds_per_second` RCON commands no matter how busy the
+channel gets, so chat cannot eat into the server tick.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+import discord
+from discord.ext import commands
+
+from utils.config import settings
+from utils.rcon_client import mc_cmd
+from utils.rcon_protocol import MAX_COMMAND_LEN
+from utils.scheduling import Priority
+
+log = logging.getLogger(__name__)
+
+_PREFIX = {"text": "[Discord] ", "color": "dark_aqua"}
+_MAX_TEXT = 256  # longer messages are cut; chat is not the place for essays
+_WS = re.compile(r"\s+")
+
+
+class _Bucket:
+    """Token bucket: `burst` tokens, refilled at `rate` per second."""
+
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def take(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.burst
+
+
+def clean_text(message: discord.Message) -> str:
+    """Message text as one line: mentions resolved to names, § formatting codes removed."""
+    text = message.clean_content.replace("§", "")
+    if message.attachments:
+        text += " [attachment]"
+    text = _WS.sub(" ", text).strip()
+    return text if len(text) <= _MAX_TEXT else text[:_MAX_TEXT - 1] + "…"
+
+
+def _components(name: str, text: str) -> list[dict]:
+    return [_PREFIX, {"text": name, "color": "aqua"}, {"text": f": {text}", "color": "white"}]
+
+
+def _tellraw(components: list[dict]) -> str:
+    # ASCII-only JSON: escapes survive any RCON charset handling
+    return "tellraw @a " + json.dumps(["", *components], separators=(",", ":"))
+
+
+def build_commands(messages: list[tuple[str, str]], skipped: int = 0) -> list[str]:
+    """Pack (name, text) messages into as few tellraw commands as fit in an RCON request."""
+    cmds: list[str] = []
+    current: list[dict] = []
+    items = [_components(name, text) for name, text in messages]
+    if skipped:
+        items.insert(0, [_PREFIX, {"text": f"… {skipped} message(s) skipped", "color": "gray", "italic": True}])
+    for comps in items:
+        while len(_tellraw(comps)) > MAX_COMMAND_LEN:  # one huge message on its own: shorten it
+            text = comps[-1]["text"]
+            comps = [*comps[:-1], {**comps[-1], "text": text[:int(len(text) * 0.8)] + "…"}]
+        candidate = [*current, {"text": "\n"}, *comps] if current else comps
+        if len(_tellraw(candidate)) > MAX_COMMAND_LEN:
+            cmds.append(_tellraw(current))
+            candidate = comps
+        current = candidate
+    if current:
+        cmds.append(_tellraw(current))
+    return cmds
+
+
+async def _default_run(cmd: str) -> str:
+    return await mc_cmd(cmd, Priority.USER)
+
+
+class ChatRelay:
+    def __init__(self, run_cmd: Callable[[str], Awaitable[object]] = _default_run, *, window: float = 0.5,
+                 max_cmds_per_second: float = 2.0, user_messages: int = 3, user_seconds: float = 10.0,
+                 max_pending: int = 50):
+        self._run_cmd = run_cmd
+        self.window = window
+        self.max_pending = max(1, max_pending)
+        self.user_messages = max(1, user_messages)
+        self.user_seconds = max(0.1, user_seconds)
+        self._rcon = _Bucket(max(0.1, max_cmds_per_second), max(1.0, max_cmds_per_second))
+        self._users: dict[int, _Bucket] = {}
+        self._pending: deque[tuple[str, str]] = deque()
+        self._skipped = 0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._stats = {"received": 0, "relayed": 0, "rate_limited": 0, "skipped": 0,
+                       "commands": 0, "errors": 0}
+
+    def submit(self, user_id: int, name: str, text: str) -> bool:
+        """Queue a message; False if the user is over their budget (the message is dropped)."""
+        self._stats["received"] += 1
+        bucket = self._users.get(user_id)
+        if bucket is None:
+            if len(self._users) > 1000:
+                self._users = {uid: b for uid, b in self._users.items() if not b.full}
+            bucket = self._users[user_id] = _Bucket(self.user_messages / self.user_seconds, self.user_messages)
+        if not bucket.take():
+            self._stats["rate_limited"] += 1
+            return False
+        self._pending.append((name, text))
+        if len(self._pending) > self.max_pending:
+            self._pending.popleft()
+            self._skipped += 1
+            self._stats["skipped"] += 1
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.window)
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        while self._pending or self._skipped:
+            # wait for the RCON budget before draining, so messages arriving meanwhile join this batch
+            while (delay := self._rcon.wait_time()) > 0:
+                await asyncio.sleep(delay)
+            batch, skipped = list(self._pending), self._skipped
+            self._pending.clear()
+            self._skipped = 0
+            cmds = build_commands(batch, skipped)
+            for cmd in cmds:
+                while not self._rcon.take():
+                    await asyncio.sleep(self._rcon.wait_time())
+                try:
+                    await self._run_cmd(cmd)
+                    self._stats["commands"] += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    log.warning("[chat_relay] tellraw failed: %s", e)
+            self._stats["relayed"] += len(batch)
+
+    def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending), **self._stats}
+
+
+relay = ChatRelay(
+    window=float(getattr(settings, "CHAT_RELAY_FLUSH_SECONDS", 0.5)),
+    max_cmds_per_second=float(getattr(settings, "CHAT_RELAY_MAX_RCON_PER_SECOND", 2)),
+    user_messages=int(getattr(settings, "CHAT_RELAY_USER_MESSAGES", 3)),
+    user_seconds=float(getattr(settings, "CHAT_RELAY_USER_SECONDS", 10)),
+)
+
+
+class ChatRelayCog(commands.Cog):
+    def __init__(self, bot: commands.Bot, chat_relay: ChatRelay | None = None):
+        self.bot = bot
+        self.relay = chat_relay or relay
+        self.chan_id = int(getattr(settings, "DISCORD_MC_CHAT_CHANNEL_ID", 0) or 0)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if not self.chan_id or message.channel.id != self.chan_id or message.author.bot:
+            return
+        text = clean_text(message)
+        if text and not self.relay.submit(message.author.id, message.author.display_name.replace("§", ""), text):
+            log.debug("[chat_relay] %s is over the rate limit; message dropped", message.author)
+
+    def cog_unload(self):
+        self.relay.close()
@@ -0,0 +1,142 @@
+# services/game_events.py
+"""
+Typed game events parsed from the server log, and the in-process bus they are published on.
+
+The chat bridge feeds every log line through `parse_line`. Most lines are plugin noise, so
+a few substring checks reject them before the single combined regex runs. Subscribers
+(status, presence, portal, …) get events like `join`/`leave` the moment they are logged
+instead of waiting for the next `list` poll.
+"""
+from __future__ import annotations
+import asyncio
+import inspect
+import logging
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable
+
+log = logging.getLogger(__name__)
+
+CHAT, JOIN, LEAVE, DEATH, ADVANCEMENT, SERVER_START, SERVER_STOP = (
+    "chat", "join", "leave", "death", "advancement", "server_start", "server_stop")
+KINDS = (CHAT, JOIN, LEAVE, DEATH, ADVANCEMENT, SERVER_START, SERVER_STOP)
+
+
+@dataclass(frozen=True)
+class GameEvent:
+    kind: str
+    player: str | None = None
+    message: str = ""  # chat text, death message or advancement title
+    line: str = ""
+    at: float = field(default_factory=time.time)
+
+
+# vanilla death messages ("<player> <verb> …"); the player-name pattern keeps mob deaths out
+_DEATH_VERBS = (
+    "was slain", "was shot", "was killed", "was blown up", "was fireballed", "was pummeled",
+    "was pricked", "was impaled", "was squashed", "was squished", "was stung", "was poked",
+    "was struck by lightning", "was obliterated", "was skewered", "was roasted", "was doomed",
+    "was frozen", "was burnt", "was burned", "was stomped", "was spitballed",
+    "fell from", "fell off", "fell out of", "fell while", "fell too far", "drowned", "died",
+    "blew up", "burned to death", "went up in flames", "walked into", "tried to swim in lava",
+    "hit the ground", "starved to death", "suffocated", "froze to death", "withered away",
+    "experienced kinetic energy", "discovered the floor was lava", "didn't want to live",
+    "left the confines of this world", "went off with a bang",
+)
+_NAME = r"\.?[A-Za-z0-9_]{1,16}"  # Java names; a leading "." is a Geyser/Floodgate (Bedrock) player
+
+# [19:33:43] [Server thread/INFO]: …   (vanilla)      [19:33:43 INFO]: …   (Paper/Spigot)
+_EVENT_RX = re.compile(
+    r"^\[[^\]]+\](?: \[[^\]]+\])?: (?:"
+    rf"(?:\[Not Secure\] )?<(?P<chat>[^>]+)> (?P<chat_msg>.*)"
+    rf"|(?P<join>{_NAME}) joined the game"
+    rf"|(?P<leave>{_NAME}) left the game"
+    rf"|(?P<adv>{_NAME}) has (?:made the advancement|completed the challenge|reached the goal) \[(?P<adv_msg>.+)\]"
+    r"|(?P<start>Done) \([\d.,]+s\)!.*"
+    r"|(?P<stop>Stopping (?:the )?server)"
+    rf"|(?P<death>{_NAME}) (?P<death_msg>(?:{'|'.join(re.escape(v) for v in _DEATH_VERBS)})\b.*)"
+    r")$"
+)
+# one of these must occur for _EVENT_RX to have a chance; checked with plain `in`
+_HINTS = ("<", " the game", " has ", "Done (", "Stopping", *(f" {v}" for v in _DEATH_VERBS))
+
+
+def parse_line(line: str) -> GameEvent | None:
+    if "INFO]: " not in line or not any(h in line for h in _HINTS):
+        return None
+    m = _EVENT_RX.match(line.rstrip("\r\n"))
+    if not m:
+        return None
+    g = m.groupdict()
+    if g["chat"] is not None:
+        return GameEvent(CHAT, g["chat"], g["chat_msg"], line)
+    if g["join"]:
+        return GameEvent(JOIN, g["join"], "", line)
+    if g["leave"]:
+        return GameEvent(LEAVE, g["leave"], "", line)
+    if g["adv"]:
+        return GameEvent(ADVANCEMENT, g["adv"], g["adv_msg"], line)
+    if g["start"]:
+        return GameEvent(SERVER_START, None, "", line)
+    if g["stop"]:
+        return GameEvent(SERVER_STOP, None, "", line)
+    return GameEvent(DEATH, g["death"], f"{g['death']} {g['death_msg']}", line)
+
+
+Handler = Callable[[GameEvent], object]
+
+
+class EventBus:
+    """
+    Fan-out of game events to subscribers, in publish order.
+
+    Plain handlers run inline (keep them cheap); coroutine handlers run as tasks so a slow
+    subscriber never holds up the log reader. A failing handler is logged and skipped.
+    """
+
+    def __init__(self):
+        self._subs: dict[str | None, list[Handler]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._published: Counter[str] = Counter()
+        self._errors = 0
+
+    def subscribe(self, handler: Handler, *kinds: str) -> Callable[[], None]:
+        """Call `handler` for events of `kinds` (all events if none given); returns an unsubscribe."""
+        keys = kinds or (None,)
+        for k in keys:
+            self._subs.setdefault(k, []).append(handler)
+
+        def unsubscribe() -> None:
+            for k in keys:
+                if handler in self._subs.get(k, ()):
+                    self._subs[k].remove(handler)
+
+        return unsubscribe
+
+    def publish(self, event: GameEvent) -> None:
+        self._published[event.kind] += 1
+        for handler in (*self._subs.get(event.kind, ()), *self._subs.get(None, ())):
+            try:
+                result = handler(event)
+                if inspect.isawaitable(result):
+                    task = asyncio.ensure_future(result)
+                    self._tasks.add(task)
+                    task.add_done_callback(self._task_done)
+            except Exception:
+                self._errors += 1
+                log.exception("[events] %s handler failed", event.kind)
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self._errors += 1
+            log.error("[events] handler failed: %r", task.exception())
+
+    def stats(self) -> dict:
+        return {"published": dict(self._published), "handler_errors": self._errors,
+                "running": len(self._tasks)}
+
+
+bus = EventBus()
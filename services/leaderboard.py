@@ -0,0 +1,133 @@
+# services/leaderboard.py
+"""
+In-memory top-K per ranked stat, so /leaderboard never touches the database.
+
+Each `TopK` is seeded at startup with one indexed `ORDER BY <metric> DESC LIMIT k` query
+and then kept current from the values every stats write returns (absolute upserts and
+buffered increments alike). Players outside the top K are not tracked; `floor` is an upper
+bound for all of them, so a tracked player whose value drops below it simply leaves the
+list. Pages past what is tracked are read from the database (an index scan) and the list
+is re-seeded in the background.
+"""
+from __future__ import annotations
+import asyncio
+import bisect
+import logging
+from typing import Iterable
+
+from models.models_game import STAT_FIELDS, PlayerStats
+from utils.config import settings
+from utils.db import async_session_maker
+
+log = logging.getLogger(__name__)
+
+
+class TopK:
+    """Best `k` (player, value) pairs, highest first; ties ordered by name as PlayerStats.top orders them."""
+
+    def __init__(self, k: int):
+        self.k = max(1, k)
+        self._keys: list[tuple[float, str]] = []  # (-value, player), ascending
+        self._values: dict[str, float] = {}
+        self.complete = False  # every player is tracked (fewer than k exist)
+        self.floor = float("-inf")  # no untracked player has more than this
+
+    def seed(self, rows: Iterable[tuple[str, float]], complete: bool) -> None:
+        self._keys = sorted((-float(v), p) for p, v in rows)[:self.k]
+        self._values = {p: -nv for nv, p in self._keys}
+        self.complete = complete and len(self._keys) < self.k
+        self.floor = float("-inf") if self.complete or not self._keys else -self._keys[-1][0]
+
+    def _remove(self, player: str) -> None:
+        old = self._values.pop(player)
+        i = bisect.bisect_left(self._keys, (-old, player))
+        del self._keys[i]
+
+    def update(self, player: str, value: float) -> None:
+        value = float(value)
+        if self._values.get(player) == value:
+            return
+        if player in self._values:
+            self._remove(player)
+        if not self.complete and value <= self.floor:
+            return  # somebody untracked may be ahead of (or tied with) it now
+        if len(self._keys) >= self.k and (-value, player) > self._keys[-1]:
+            self.floor = max(self.floor, value)
+            self.complete = False
+            return
+        bisect.insort(self._keys, (-value, player))
+        self._values[player] = value
+        if len(self._keys) > self.k:
+            nv, dropped = self._keys.pop()
+            del self._values[dropped]
+            self.floor = max(self.floor, -nv)
+            self.complete = False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def certain(self) -> int:
+        """How many leading entries are exact ranks: those strictly above `floor` (ties at it may be untracked)."""
+        return len(self._keys) if self.complete else bisect.bisect_left(self._keys, (-self.floor,))
+
+    def covers(self, end: int) -> bool:
+        """True if ranks [0, end) are all known from memory."""
+        return self.complete or end <= self.certain()
+
+    def page(self, offset: int, limit: int) -> list[tuple[str, float]]:
+        return [(p, -nv) for nv, p in self._keys[offset:offset + limit]]
+
+
+class Leaderboard:
+    def __init__(self, k: int = 100):
+        self.k = k
+        self.boards = {m: TopK(k) for m in STAT_FIELDS}
+        self.ready = False
+        self._reseed: asyncio.Task | None = None
+        self._stats = {"memory_hits": 0, "db_reads": 0, "updates": 0, "seeds": 0}
+
+    async def seed(self) -> None:
+        async with async_session_maker() as s:
+            for metric, board in self.boards.items():
+                rows = await PlayerStats.top(s, metric, limit=self.k)
+                board.seed(((r.player, getattr(r, metric) or 0) for r in rows), complete=len(rows) < self.k)
+        self.ready = True
+        self._stats["seeds"] += 1
+        log.info("[leaderboard] seeded top %d for %s", self.k, ", ".join(self.boards))
+
+    def update(self, rows: Iterable) -> None:
+        """Feed stats rows (anything with .player and the metric attributes, e.g. RETURNING rows)."""
+        for r in rows:
+            self._stats["updates"] += 1
+            for metric, board in self.boards.items():
+                v = getattr(r, metric, None)
+                if v is not None:
+                    board.update(r.player, v)
+
+    async def page(self, metric: str, offset: int = 0, limit: int = 10) -> list[tuple[str, float]]:
+        board = self.boards.get(metric) or self.boards["kills"]
+        if self.ready and board.covers(offset + limit):
+            self._stats["memory_hits"] += 1
+            return board.page(offset, limit)
+        self._stats["db_reads"] += 1
+        shrunk = self.ready and not board.complete and board.certain() < self.k // 2  # tracked players fell out
+        if (not self.ready or shrunk) and (self._reseed is None or self._reseed.done()):
+            self._reseed = asyncio.create_task(self.try_seed())
+        metric = metric if metric in self.boards else "kills"
+        async with async_session_maker() as s:
+            rows = await PlayerStats.top(s, metric, limit=limit, offset=offset)
+        return [(r.player, getattr(r, metric) or 0) for r in rows]
+
+    async def try_seed(self) -> None:
+        """seed(), logging instead of raising; until it succeeds /leaderboard reads the database."""
+        try:
+            await self.seed()
+        except Exception as e:
+            log.warning("[leaderboard] seeding failed: %s", e)
+
+    def stats(self) -> dict:
+        return {"ready": self.ready, "k": self.k, "tracked": {m: len(b) for m, b in self.boards.items()},
+                **self._stats}
+
+
+leaderboard = Leaderboard(k=int(getattr(settings, "LEADERBOARD_SIZE", 100)))
@@ -0,0 +1,381 @@
+# services/log_archive.py
+"""
+Searchable history of chat and game events in the `gamelogentry` table.
+
+Live: `LogArchive` subscribes to the game event bus and writes what the chat bridge sees
+in batches (one multi-row INSERT every few seconds or every `batch` rows).
+Backfill: `backfill()` streams the rotated `logs/*.log.gz` files over SFTP, decompressing
+as it reads, through the same parser. Rows are keyed by a hash of server, time and line,
+so running a backfill over days the bridge already archived stores nothing twice.
+"""
+from __future__ import annotations
+import asyncio
+import contextlib
+import hashlib
+import logging
+import posixpath
+import re
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from typing import AsyncIterator
+from zoneinfo import ZoneInfo
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import OperationalError
+
+from models.log_archive import GameLogEntry
+from services.game_events import KINDS, EventBus, GameEvent, parse_line
+from services.log_tail import gz_chunks
+from services.mc_chat_bridge import _resolve_log_path
+from utils.config import settings
+from utils.db import async_session_maker
+from utils.permissions import is_mod
+from utils.sftp_client import SftpTarget, sftp_conn
+
+log = logging.getLogger(__name__)
+
+_TIME_RX = re.compile(r"^\[(\d\d):(\d\d):(\d\d)")
+_ARCHIVE_RX = re.compile(r"^(\d{4}-\d\d-\d\d)-\d+\.log\.gz$")
+_GZ_CHUNK = 256 * 1024
+PAGE_SIZE = 10
+_PLAYER_MAX = GameLogEntry.player.type.length  # chat names are not length-checked by the parser
+# the database or the connection to it is the problem, not the rows: keep them and retry later
+_TRANSIENT = (OperationalError, OSError)
+
+
+def log_timezone() -> tzinfo:
+    name = str(getattr(settings, "MC_LOG_TIMEZONE", "UTC") or "UTC")
+    try:
+        return ZoneInfo(name)
+    except Exception:
+        log.warning("[archive] unknown MC_LOG_TIMEZONE %r; using UTC", name)
+        return timezone.utc
+
+
+def _line_time(line: str) -> tuple[int, int, int] | None:
+    m = _TIME_RX.match(line)
+    return (int(m[1]), int(m[2]), int(m[3])) if m else None
+
+
+class _Dedupe:
+    """Row keys: identical lines logged in the same second get 0, 1, 2, … so none collapse."""
+
+    def __init__(self, server: str):
+        self.server = server
+        self._second: datetime | None = None
+        self._seen: dict[str, int] = {}
+
+    def key(self, at: datetime, line: str) -> str:
+        if at != self._second:
+            self._second, self._seen = at, {}
+        n = self._seen[line] = self._seen.get(line, -1) + 1
+        return hashlib.sha1(f"{self.server}|{at.isoformat()}|{n}|{line}".encode()).hexdigest()
+
+
+def _row(ev: GameEvent, server: str, at: datetime, dedupe: _Dedupe) -> dict:
+    return {
+        "server": server,
+        "kind": ev.kind,
+        "player": ev.player[:_PLAYER_MAX] if ev.player else None,
+        "message": ev.message,
+        "logged_at": at,
+        "dedupe": dedupe.key(at, ev.line.rstrip("\r\n")),
+    }
+
+
+async def insert_rows(rows: list[dict], session_maker=async_session_maker) -> int:
+    """One multi-row INSERT; rows already archived are skipped. Returns how many were new."""
+    if not rows:
+        return 0
+    stmt = pg_insert(GameLogEntry).values(rows).on_conflict_do_nothing(index_elements=["dedupe"])
+    async with session_maker() as s:
+        result = await s.execute(stmt)
+        await s.commit()
+    return max(0, result.rowcount or 0)
+
+
+async def insert_isolated(rows: list[dict], insert=insert_rows) -> tuple[int, list[dict]]:
+    """
+    insert() that survives rows the database refuses: a failed batch is split in halves until
+    the bad rows are found. Returns (new rows, rejected rows); connection errors are raised.
+    """
+    try:
+        return await insert(rows), []
+    except _TRANSIENT:
+        raise
+    except Exception as e:
+        if len(rows) <= 1:
+            log.warning("[archive] dropping %d row(s) the database refuses: %s", len(rows), e)
+            return 0, list(rows)
+    mid = len(rows) // 2
+    new_a, bad_a = await insert_isolated(rows[:mid], insert)
+    new_b, bad_b = await insert_isolated(rows[mid:], insert)
+    return new_a + new_b, bad_a + bad_b
+
+
+class LogArchive:
+    """Buffers live events and writes them in batches; DB trouble never blocks the bridge."""
+
+    def __init__(self, server: str, *, batch: int = 200, flush_every: float = 5.0,
+                 max_buffer: int = 5000, tz: tzinfo | None = None, insert=insert_rows):
+        self.server = server
+        self.batch = batch
+        self.flush_every = flush_every
+        self.tz = tz or log_timezone()
+        self._insert = insert
+        self._buf: deque[dict] = deque(maxlen=max_buffer)
+        self._dedupe = _Dedupe(server)
+        self._flushing: asyncio.Task | None = None
+        self._stats = {"archived": 0, "duplicates": 0, "flushes": 0, "errors": 0, "dropped": 0, "rejected": 0}
+
+    def attach(self, bus: EventBus) -> None:
+        bus.subscribe(self.on_event)
+
+    def _logged_at(self, ev: GameEvent) -> datetime:
+        now = datetime.fromtimestamp(ev.at, self.tz)
+        hms = _line_time(ev.line)
+        if hms is None:
+            return now.replace(microsecond=0)
+        at = now.replace(hour=hms[0], minute=hms[1], second=hms[2], microsecond=0)
+        return at - timedelta(days=1) if at > now + timedelta(minutes=5) else at  # logged just before midnight
+
+    def on_event(self, ev: GameEvent) -> None:
+        if len(self._buf) == self._buf.maxlen:
+            self._stats["dropped"] += 1  # deque drops the oldest
+        self._buf.append(_row(ev, self.server, self._logged_at(ev), self._dedupe))
+        if len(self._buf) >= self.batch and (self._flushing is None or self._flushing.done()):
+            self._flushing = asyncio.create_task(self.flush())
+
+    async def flush(self) -> None:
+        while self._buf:
+            rows = [self._buf.popleft() for _ in range(min(self.batch, len(self._buf)))]
+            try:
+                new, rejected = await insert_isolated(rows, self._insert)
+            except _TRANSIENT as e:
+                self._stats["errors"] += 1
+                self._buf.extendleft(reversed(rows))  # keep them for the next attempt (bounded by maxlen)
+                log.warning("[archive] insert of %d rows failed: %s", len(rows), e)
+                return
+            self._stats["flushes"] += 1
+            self._stats["archived"] += new
+            self._stats["rejected"] += len(rejected)
+            self._stats["duplicates"] += len(rows) - len(rejected) - new
+
+    async def run(self, is_closed) -> None:
+        while not is_closed():
+            await asyncio.sleep(self.flush_every)
+            if self._flushing is None or self._flushing.done():
+                self._flushing = asyncio.create_task(self.flush())
+                await asyncio.shield(self._flushing)
+
+    def stats(self) -> dict:
+        return {"buffered": len(self._buf), **self._stats}
+
+
+# ---- backfill ----
+
+async def gz_lines(sftp, path: str, chunk: int = _GZ_CHUNK) -> AsyncIterator[str]:
+    """Lines of a remote .gz file, decompressed while it downloads (never held in memory whole)."""
+    buf = b""
+    async for out in gz_chunks(sftp, path, chunk):
+        *lines, buf = (buf + out).split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8", errors="replace")
+    if buf:
+        yield buf.decode("utf-8", errors="replace")
+
+
+@dataclass
+class BackfillResult:
+    files: int = 0
+    events: int = 0
+    inserted: int = 0
+    rejected: int = 0
+
+
+async def _backfill_batch(rows: list[dict], insert, res: BackfillResult) -> None:
+    new, rejected = await insert_isolated(rows, insert)
+    res.inserted += new
+    res.rejected += len(rejected)
+
+
+async def backfill(server: str, logs_dir: str, target: SftpTarget | None = None, *, since: date | None = None,
+                   batch: int = 1000, tz: tzinfo | None = None, insert=insert_rows) -> BackfillResult:
+    """Archive events from `logs_dir/YYYY-MM-DD-N.log.gz` (optionally only from `since` on)."""
+    tz = tz or log_timezone()
+    res = BackfillResult()
+    async with sftp_conn(target) as sftp:
+        names = sorted(e.filename for e in await sftp.readdir(logs_dir) if _ARCHIVE_RX.match(e.filename))
+        for name in names:
+            day = date.fromisoformat(_ARCHIVE_RX.match(name)[1])
+            if since and day < since:
+                continue
+            res.files += 1
+            dedupe = _Dedupe(server)
+            rows: list[dict] = []
+            last: tuple[int, int, int] | None = None
+            async for line in gz_lines(sftp, posixpath.join(logs_dir, name)):
+                hms = _line_time(line)
+                if hms is None:
+                    continue
+                if last and hms < last and (last[0] - hms[0]) >= 12:
+                    day += timedelta(days=1)  # the file ran past midnight
+                last = hms
+                ev = parse_line(line)
+                if ev is None:
+                    continue
+                at = datetime(day.year, day.month, day.day, *hms, tzinfo=tz)
+                rows.append(_row(ev, server, at, dedupe))
+                res.events += 1
+                if len(rows) >= batch:
+                    await _backfill_batch(rows, insert, res)
+                    rows = []
+            await _backfill_batch(rows, insert, res)
+            log.info("[archive] backfilled %s (%d events so far)", name, res.events)
+    return res
+
+
+# ---- search ----
+
+@dataclass(frozen=True)
+class LogHit:
+    logged_at: datetime
+    kind: str
+    player: str | None
+    message: str
+
+
+async def search(text: str | None = None, *, player: str | None = None, kind: str | None = None,
+                 server: str | None = None, limit: int = 10, offset: int = 0) -> list[LogHit]:
+    """Newest first. `text` uses web-search syntax ("quoted phrase", -exclude, or)."""
+    q = select(GameLogEntry.logged_at, GameLogEntry.kind, GameLogEntry.player, GameLogEntry.message)
+    if text:
+        q = q.where(GameLogEntry.tsv.op("@@")(func.websearch_to_tsquery("simple", text)))
+    if player:
+        q = q.where(func.lower(GameLogEntry.player) == player.lower())
+    if kind:
+        q = q.where(GameLogEntry.kind == kind)
+    if server:
+        q = q.where(GameLogEntry.server == server)
+    q = q.order_by(GameLogEntry.logged_at.desc(), GameLogEntry.id.desc()).limit(limit).offset(offset)
+    async with async_session_maker() as s:
+        rows = (await s.execute(q)).all()
+    return [LogHit(*r) for r in rows]
+
+
+archive: LogArchive | None = None
+
+
+def archive_stats() -> dict | None:
+    return archive.stats() if archive else None
+
+
+async def flush_log_archive() -> None:
+    if archive:
+        await archive.flush()
+
+
+def setup_log_archive(bot, bus: EventBus) -> LogArchive:
+    global archive
+    archive = LogArchive(
+        settings.MC_SERVER_NAME,
+        batch=int(getattr(settings, "LOG_ARCHIVE_BATCH", 200)),
+        flush_every=float(getattr(settings, "LOG_ARCHIVE_FLUSH_SECONDS", 5)),
+    )
+    archive.attach(bus)
+    bot.loop.create_task(archive.run(bot.is_closed))
+    return archive
+
+
+# ---- /logsearch ----
+
+def _format_hits(hits: list[LogHit], page: int) -> str:
+    if not hits:
+        return "No matches." if page == 0 else "No more matches."
+    lines = []
+    for h in hits[:PAGE_SIZE]:
+        who = f"**{discord.utils.escape_markdown(h.player)}** " if h.player else ""
+        text = discord.utils.escape_markdown(h.message)[:300]
+        lines.append(f"`{h.logged_at:%Y-%m-%d %H:%M:%S}` {h.kind} {who}{text}".rstrip())
+    return "\n".join(lines)[:1900] + f"\n\n*Page {page + 1}*"
+
+
+class LogSearchView(discord.ui.View):
+    """◀ ▶ paging; each page is one indexed query (`PAGE_SIZE + 1` rows tell whether there is a next one)."""
+
+    def __init__(self, text: str | None, player: str | None, kind: str | None, page: int, has_next: bool):
+        super().__init__(timeout=600)
+        self.text, self.player, self.kind = text, player, kind
+        self.page = page
+        self.prev_page.disabled = page == 0
+        self.next_page.disabled = not has_next
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        hits = await search(self.text, player=self.player, kind=self.kind,
+                            limit=PAGE_SIZE + 1, offset=page * PAGE_SIZE)
+        view = LogSearchView(self.text, self.player, self.kind, page, len(hits) > PAGE_SIZE)
+        await interaction.response.edit_message(content=_format_hits(hits, page), view=view)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, max(0, self.page - 1))
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+
+class LogSearchCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._backfill: asyncio.Task | None = None
+
+    @app_commands.command(name="logsearch", description="Search archived chat and game events")
+    @app_commands.describe(query='Words to find ("exact phrase", -exclude, or)', player="Only this player",
+                           kind="Only this event kind")
+    @app_commands.choices(kind=[app_commands.Choice(name=k, value=k) for k in KINDS])
+    async def logsearch(self, interaction: discord.Interaction, query: str | None = None,
+                        player: str | None = None, kind: str | None = None):
+        if not is_mod(interaction):
+            return await interaction.response.send_message("No permission.", ephemeral=True)
+        if not (query or player or kind):
+            return await interaction.response.send_message("Give a query, a player or a kind.", ephemeral=True)
+        await interaction.response.defer(thinking=True, ephemeral=True)
+        try:
+            hits = await search(query, player=player, kind=kind, limit=PAGE_SIZE + 1)
+        except Exception as e:
+            log.warning("[archive] search failed: %s", e)
+            return await interaction.followup.send(f"❌ Search failed: `{e}`", ephemeral=True)
+        view = LogSearchView(query, player, kind, 0, len(hits) > PAGE_SIZE)
+        await interaction.followup.send(_format_hits(hits, 0), view=view, ephemeral=True)
+
+    @app_commands.command(name="logbackfill", description="Import rotated server logs (logs/*.log.gz) into the archive")
+    @app_commands.describe(since="Only logs from this day on (YYYY-MM-DD)")
+    async def logbackfill(self, interaction: discord.Interaction, since: str | None = None):
+        if not is_mod(interaction):
+            return await interaction.response.send_message("No permission.", ephemeral=True)
+        try:
+            since_day = date.fromisoformat(since) if since else None
+        except ValueError:
+            return await interaction.response.send_message("`since` must look like 2024-05-31.", ephemeral=True)
+        if self._backfill and not self._backfill.done():
+            return await interaction.response.send_message("A backfill is already running.", ephemeral=True)
+        await interaction.response.send_message("Backfill started; I'll report here when it is done.", ephemeral=True)
+
+        async def job():
+            try:
+                res = await backfill(settings.MC_SERVER_NAME, posixpath.dirname(_resolve_log_path()), since=since_day)
+                rejected = f", {res.rejected} rejected" if res.rejected else ""
+                msg = f"✅ Backfill done: {res.files} file(s), {res.events} event(s), {res.inserted} new{rejected}."
+            except Exception as e:
+                log.exception("[archive] backfill failed")
+                msg = f"❌ Backfill failed: `{e}`"
+            with contextlib.suppress(discord.HTTPException):
+                await interaction.followup.send(msg, ephemeral=True)
+
+        self._backfill = asyncio.create_task(job())
@@ -0,0 +1,210 @@
+# services/log_tail.py
+"""
+Durable position for tailing a remote log that log4j rotates into `logs/*.log.gz`.
+
+A checkpoint is (path, file identity, byte offset). The identity is a hash of the file's
+first line, which log4j starts with a timestamp, so a freshly rotated `latest.log` never
+matches the old one even once it has grown past the old offset. On resume the missed part
+of the old file is read back from its `.gz` archive, followed by the new file.
+"""
+from __future__ import annotations
+import hashlib
+import logging
+import posixpath
+import zlib
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from sqlalchemy import select
+
+from models.log_checkpoint import LogCheckpoint
+from utils.db import async_session_maker
+
+log = logging.getLogger(__name__)
+
+HEAD_BYTES = 1024  # identity = hash of the first line, looked for in this many bytes
+_ARCHIVE_CANDIDATES = 6  # newest `.log.gz` files checked for the pre-rotation log
+_GZ_CHUNK = 64 * 1024
+_GZ_HEAD_CHUNK = 4096  # a compressed first line is far smaller than this
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    head_hash: str | None  # None while the file has no complete first line yet
+    offset: int
+    mtime: float = 0.0
+
+
+@dataclass(frozen=True)
+class FileState:
+    head_hash: str | None
+    size: int
+    mtime: float
+
+
+def head_hash(data: bytes) -> str | None:
+    nl = data.find(b"\n")
+    return hashlib.sha1(data[:nl]).hexdigest() if nl >= 0 else None
+
+
+def split_lines(data: bytes) -> tuple[list[str], int]:
+    """Complete lines in `data` and the number of bytes they span (a partial tail is left)."""
+    end = data.rfind(b"\n") + 1
+    if not end:
+        return [], 0
+    return data[:end].decode("utf-8", errors="replace").splitlines(), end
+
+
+async def _read_range(sftp, path: str, start: int, length: int | None = None) -> bytes:
+    async with (await sftp.open(path, "rb")) as f:
+        await f.seek(start)
+        return await f.read(length if length is not None else -1)
+
+
+async def file_state(sftp, path: str) -> FileState:
+    attrs = await sftp.stat(path)
+    head = await _read_range(sftp, path, 0, HEAD_BYTES) if attrs.size else b""
+    return FileState(head_hash(head), int(attrs.size or 0), float(attrs.mtime or 0))
+
+
+def is_same_file(cp: Checkpoint, st: FileState) -> bool:
+    if cp.head_hash is None or st.head_hash is None:
+        return cp.offset <= st.size  # no identity yet: only shrinking gives a rotation away
+    return cp.head_hash == st.head_hash and cp.offset <= st.size
+
+
+async def gz_chunks(sftp, path: str, chunk: int = _GZ_CHUNK) -> AsyncIterator[bytes]:
+    """Decompressed pieces of a remote .gz file, inflated while it downloads (concatenated members too)."""
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    async with (await sftp.open(path, "rb")) as f:
+        while data := await f.read(chunk):
+            out = d.decompress(data)
+            while d.eof and d.unused_data:
+                rest = d.unused_data
+                d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                out += d.decompress(rest)
+            if out:
+                yield out
+    if out := d.flush():
+        yield out
+
+
+async def _gz_head_hash(sftp, path: str) -> str | None:
+    """Identity of a .gz log from its first few KB; the rest is never downloaded."""
+    head = b""
+    chunks = gz_chunks(sftp, path, _GZ_HEAD_CHUNK)
+    try:
+        async for out in chunks:
+            head += out
+            if len(head) >= HEAD_BYTES or b"\n" in head:
+                break
+    finally:
+        await chunks.aclose()
+    return head_hash(head[:HEAD_BYTES])
+
+
+async def _gz_tail(sftp, path: str, offset: int, budget: int) -> tuple[bytes, int]:
+    """Decompressed bytes of `path` from `offset` on, only the last `budget` of them; (data, its offset)."""
+    pos, start = 0, offset
+    tail = bytearray()
+    async for out in gz_chunks(sftp, path):
+        end = pos + len(out)
+        if end > offset:
+            tail += out[max(0, offset - pos):]
+            if len(tail) > budget:
+                start += len(tail) - budget
+                del tail[:len(tail) - budget]
+        pos = end
+    return bytes(tail), start
+
+
+async def _find_archive(sftp, path: str, cp: Checkpoint) -> str | None:
+    """Path of the `.log.gz` that used to be `path` at checkpoint time."""
+    logs_dir = posixpath.dirname(path) or "."
+    try:
+        entries = [e for e in await sftp.readdir(logs_dir) if e.filename.endswith(".log.gz")]
+    except Exception as e:
+        log.debug("[log_tail] readdir(%s) failed: %s", logs_dir, e)
+        return None
+    # archived after our last read, newest first
+    entries = [e for e in entries if float(e.attrs.mtime or 0) >= cp.mtime - 1]
+    entries.sort(key=lambda e: e.attrs.mtime or 0, reverse=True)
+    for e in entries[:_ARCHIVE_CANDIDATES]:
+        candidate = f"{logs_dir}/{e.filename}"
+        try:
+            if await _gz_head_hash(sftp, candidate) == cp.head_hash:
+                return candidate
+        except Exception as exc:
+            log.debug("[log_tail] reading %s failed: %s", e.filename, exc)
+    return None
+
+
+async def catch_up(sftp, path: str, cp: Checkpoint | None, max_lines: int,
+                   max_line_bytes: int = 512) -> tuple[list[str], Checkpoint, int]:
+    """
+    Lines written since `cp` (at most `max_lines`, newest kept), the checkpoint after them
+    and how many missed lines were dropped. Without a checkpoint, or with max_lines=0,
+    nothing is replayed and reading starts at the current end of file.
+    """
+    st = await file_state(sftp, path)
+    if cp is None or max_lines <= 0:
+        return [], Checkpoint(st.head_hash, st.size, st.mtime), 0
+
+    budget = max_lines * max_line_bytes  # never pull megabytes to show a few hundred lines
+    chunks: list[tuple[bytes, int, bool]] = []  # (data, its offset in the file, starts mid-line)
+    if is_same_file(cp, st):
+        start = max(cp.offset, st.size - budget)
+        chunks.append((await _read_range(sftp, path, start), start, start > cp.offset))
+    else:
+        log.info("[chat_bridge] %s was rotated since the last checkpoint; catching up", path)
+        archive = await _find_archive(sftp, path, cp)
+        if archive is None:
+            log.warning("[chat_bridge] rotated log for %s not found; lines before the rotation are lost", path)
+        else:
+            try:
+                data, start = await _gz_tail(sftp, archive, cp.offset, budget)
+                chunks.append((data, start, start > cp.offset))
+            except Exception as e:
+                log.warning("[chat_bridge] reading %s failed (%s); lines before the rotation are lost", archive, e)
+        start = max(0, st.size - budget)
+        chunks.append((await _read_range(sftp, path, start), start, start > 0))
+
+    lines: list[str] = []
+    end = st.size
+    for data, start, mid_line in chunks:
+        skip = 0
+        if mid_line:
+            nl = data.find(b"\n")
+            skip = nl + 1 if nl >= 0 else len(data)
+            log.info("[chat_bridge] catch-up limited to the last %d KiB of %s", budget // 1024, path)
+        chunk_lines, used = split_lines(data[skip:])
+        lines.extend(chunk_lines)
+        end = start + skip + used  # the last chunk is always the current file
+
+    dropped = max(0, len(lines) - max_lines)
+    return lines[dropped:], Checkpoint(st.head_hash, end, st.mtime), dropped
+
+
+class CheckpointStore:
+    """Checkpoints in the `logcheckpoint` table; DB errors never stop the bridge."""
+
+    async def load(self, path: str) -> Checkpoint | None:
+        try:
+            async with async_session_maker() as s:
+                row = (await s.execute(select(LogCheckpoint).where(LogCheckpoint.path == path))).scalar_one_or_none()
+        except Exception as e:
+            log.warning("[chat_bridge] loading checkpoint failed: %s", e)
+            return None
+        return Checkpoint(row.head_hash, int(row.offset), float(row.mtime or 0)) if row else None
+
+    async def save(self, path: str, cp: Checkpoint) -> None:
+        try:
+            async with async_session_maker() as s:
+                row = (await s.execute(select(LogCheckpoint).where(LogCheckpoint.path == path))).scalar_one_or_none()
+                if row is None:
+                    row = LogCheckpoint(path=path)
+                    s.add(row)
+                row.head_hash, row.offset, row.mtime = cp.head_hash, cp.offset, cp.mtime
+                await s.commit()
+        except Exception as e:
+            log.warning("[chat_bridge] saving checkpoint failed: %s", e)
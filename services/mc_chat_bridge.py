@@ -2,19 +2,27 @@
 from __future__ import annotations
 import asyncio
 import logging
-import re
+import shlex
+import time
+from dataclasses import replace
 from typing import Optional
 
+import asyncssh
 import discord
+from services.chat_outbox import ChatOutbox
+from services.game_events import CHAT, EventBus, bus as event_bus, parse_line
+from services.log_tail import Checkpoint, CheckpointStore, catch_up, file_state, is_same_file
+from services.status_service import status_service
 from utils.config import settings
-from utils.sftp_client import sftp_conn
+from utils.discord_scheduler import send_message
+from utils.sftp_client import SftpTarget, sftp_conn, ssh_connection
 
 log = logging.getLogger(__name__)
 
-CHAT_REGEXES = [
-    # [19:33:43] [Server thread/INFO]: <Alice> hello
-    re.compile(r": <(?P<name>[^>]+)>\s(?P<msg>.*)$"),
-]
+BRIDGE_MODES = ("auto", "stream", "poll")
+_EXEC_PROBE_SECONDS = 5.0  # a `tail` that fails faster than this means exec is not usable
+_STREAM_RETRY_MAX_SECONDS = 1800.0  # "auto" retries the exec stream at least this often while polling
+_MAX_PARTIAL_LINE = 64 * 1024  # a "line" this long without a newline is skipped, not buffered
 
 def _resolve_log_path() -> str:
     lp = (getattr(settings, "MC_LOG_PATH", "") or "").strip()
@@ -23,94 +31,277 @@ def _resolve_log_path() -> str:
     base = (getattr(settings, "MC_SERVER_DIR", "") or "").rstrip("/")
     return f"{base}/logs/latest.log" if base else "logs/latest.log"
 
-async def _remote_size(path: str) -> Optional[int]:
+async def _remote_size(sftp, path: str) -> Optional[int]:
+    """stat() over the tail's own SFTP channel; no extra connection per poll."""
     try:
-        async with sftp_conn() as sftp:
-            st = await sftp.stat(path)
-            return int(getattr(st, "size", 0))
+        st = await sftp.stat(path)
+        return int(getattr(st, "size", 0))
     except Exception:
         return None
 
-def setup_chat_bridge(bot: discord.Client):
-    async def runner():
-        await bot.wait_until_ready()
-        chan_id = getattr(settings, "DISCORD_MC_CHAT_CHANNEL_ID", 0)
-        if not chan_id:
-            log.warning("[chat_bridge] DISCORD_MC_CHAT_CHANNEL_ID not set — bridge disabled.")
-            return
+class _ExecUnavailable(Exception):
+    """The SSH server refuses exec channels (or has no `tail`); poll over SFTP instead."""
 
-        path = _resolve_log_path()
-        log.info("[chat_bridge] Using log path: %s", path)
+class ChatBridge:
+    """
+    Reads the server log, publishes every recognised line as a game event on `bus` and
+    forwards chat into a Discord channel.
 
-        offset = 0
-        buf = ""
-        poll = max(1.0, getattr(settings, "POLL_INTERVAL_SECONDS", 15))
+    mode "stream" runs `tail -f` over an SSH exec channel and handles lines as they are
+    written; "poll" reads the log over SFTP every `poll` seconds; "auto" streams and drops
+    to polling when exec fails, trying the stream again after `stream_retry` seconds
+    (doubling up to 30 minutes while exec keeps failing), so one hiccup is not for good.
 
-        while not bot.is_closed():
-            try:
-                async with sftp_conn() as sftp:
-                    try:
-                        f = await sftp.open(path, "r")
-                    except Exception as e:
-                        log.warning("[chat_bridge] open(%s) failed: %s — retrying…", path, e)
-                        await asyncio.sleep(2.0)
-                        continue
-
-                    async with f:
-                        # start from EOF so we don't spam old history
-                        if offset == 0:
-                            sz = await _remote_size(path)
-                            offset = int(sz or 0)
-                            await f.seek(offset)
-
-                        while not bot.is_closed():
-                            chunk = await f.read(64 * 1024)
-                            if not chunk:
-                                # rotation/truncation check
-                                sz = await _remote_size(path)
-                                if sz is not None and sz < offset:
-                                    log.info("[chat_bridge] log rotated/truncated; resetting offset")
-                                    offset = 0
-                                    await f.seek(0)
-                                await asyncio.sleep(poll)
-                                continue
-
-                            # normalize to str
-                            if isinstance(chunk, bytes):
-                                text = chunk.decode("utf-8", errors="replace")
-                            else:
-                                text = chunk  # already str
-                            offset += len(chunk if isinstance(chunk, (bytes, bytearray)) else text.encode("utf-8", errors="ignore"))
-
-                            buf += text
-                            *lines, buf = buf.split("\n")
-                            if not lines:
-                                continue
-
-                            ch = bot.get_channel(chan_id)
-                            if not isinstance(ch, (discord.TextChannel, discord.Thread)):
-                                continue
-
-                            # parse & send
-                            for line in lines[-50:]:
-                                m = None
-                                for rx in CHAT_REGEXES:
-                                    m = rx.search(line)
-                                    if m:
-                                        break
-                                if not m:
-                                    continue
-                                name = m.group("name")
-                                msg = m.group("msg")
-                                try:
-                                    await ch.send(f"**{name}**: {msg}")
-                                except Exception as e:
-                                    log.warning("[chat_bridge] Discord send failed: %s", e)
+    The read position is checkpointed to the DB, so after a restart or a log rotation the
+    bridge replays what it missed (at most `catchup_max` lines) instead of starting at EOF.
+    """
+
+    def __init__(self, bot: discord.Client, chan_id: int, path: str, *, mode: str = "auto",
+                 poll: float = 15.0, target: SftpTarget | None = None, store: CheckpointStore | None = None,
+                 catchup_max: int = 200, checkpoint_every: float = 10.0, outbox: ChatOutbox | None = None,
+                 bus: EventBus | None = None, stream_retry: float = 60.0):
+        self.bot = bot
+        self.chan_id = chan_id
+        self.path = path
+        self.mode = mode if mode in BRIDGE_MODES else "auto"
+        self.poll = poll
+        self.target = target
+        self.store = store or CheckpointStore()
+        self.catchup_max = catchup_max
+        self.checkpoint_every = checkpoint_every
+        self.cp: Checkpoint | None = None  # position after the last complete line handled
+        self._loaded = False
+        self._saved: Checkpoint | None = None
+        self._saved_at = 0.0
+        self.outbox = outbox or ChatOutbox(self._send)
+        self.bus = bus or event_bus
+        self.live = False  # True while lines are being read as they are written
+        self.stream_retry = stream_retry
+        self._retry_delay = stream_retry
+        self._stream_retry_at: float | None = None  # "auto" fell back to polling until then
 
+    @property
+    def offset(self) -> int:
+        return self.cp.offset if self.cp else 0
+
+    async def run(self) -> None:
+        log.info("[chat_bridge] Using log path: %s (mode=%s)", self.path, self.mode)
+        while not self.bot.is_closed():
+            if self.mode == "poll":
+                try:
+                    await self._poll()
+                finally:
+                    self.live = False
+                if self._stream_due():
+                    log.info("[chat_bridge] trying the exec stream again")
+                    self.mode, self._stream_retry_at = "auto", None
+                continue
+            try:
+                await self._stream()
             except asyncio.CancelledError:
                 raise
+            except _ExecUnavailable as e:
+                if self.mode == "stream":
+                    log.warning("[chat_bridge] exec stream unavailable: %s — retrying…", e)
+                    await asyncio.sleep(30.0)
+                    continue
+                log.warning("[chat_bridge] exec stream unavailable (%s) — polling over SFTP, retrying the stream "
+                            "in %.0fs", e, self._retry_delay)
+                self.mode = "poll"
+                self._stream_retry_at = time.monotonic() + self._retry_delay
+                self._retry_delay = min(self._retry_delay * 2, _STREAM_RETRY_MAX_SECONDS)
+                continue
             except Exception as e:
-                log.warning("[chat_bridge] SFTP tail error: %s", e)
+                log.warning("[chat_bridge] log stream error: %s — reconnecting…", e)
                 await asyncio.sleep(2.0)
 
+    def _stream_due(self) -> bool:
+        return self._stream_retry_at is not None and time.monotonic() >= self._stream_retry_at
+
+    # ---- checkpoints ----
+
+    async def _resume(self, sftp) -> None:
+        """Pick up from the saved/in-memory checkpoint, replaying lines missed since then."""
+        cp = self.cp
+        if not self._loaded:
+            cp = await self.store.load(self.path)
+            self._loaded = True
+        lines, self.cp, dropped = await catch_up(sftp, self.path, cp, self.catchup_max)
+        if dropped:
+            log.warning("[chat_bridge] catch-up limit %d reached; %d older lines skipped", self.catchup_max, dropped)
+        if lines:
+            log.info("[chat_bridge] replaying %d missed log lines", len(lines))
+        await self._emit(lines)
+        await self._checkpoint(force=True)
+
+    def _advance(self, nbytes: int) -> None:
+        self.cp = replace(self.cp, offset=self.cp.offset + nbytes)
+
+    async def _checkpoint(self, force: bool = False) -> None:
+        if self.cp is None or self.cp == self._saved:
+            return
+        if not force and time.monotonic() - self._saved_at < self.checkpoint_every:
+            return
+        await self.store.save(self.path, self.cp)
+        self._saved, self._saved_at = self.cp, time.monotonic()
+
+    async def _rotated(self, sftp) -> bool:
+        """Cheap check first: the path only differs from our position if it is another file."""
+        size = await _remote_size(sftp, self.path)
+        if size is None or size == self.offset:
+            return False
+        if size < self.offset:
+            return True
+        st = await file_state(sftp, self.path)
+        return not is_same_file(self.cp, st)
+
+    # ---- stream mode ----
+
+    async def _stream(self) -> None:
+        async with sftp_conn(self.target) as sftp, ssh_connection(self.target) as conn:
+            await self._resume(sftp)
+            # -f (not -F): stay on this file; a rotation is noticed by the watcher and resumed
+            cmd = f"tail -c +{self.offset + 1} -f -- {shlex.quote(self.path)} 2>/dev/null"
+            started = time.monotonic()
+            try:
+                proc = await conn.create_process(cmd, encoding=None)
+            except asyncssh.ChannelOpenError as e:
+                raise _ExecUnavailable(e.reason or str(e)) from e
+            reader = asyncio.create_task(self._read_stream(proc, started))
+            watcher = asyncio.create_task(self._watch(sftp))
+            self.live = True
+            try:
+                await asyncio.wait({reader, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                self.live = False
+                for task in (reader, watcher):
+                    task.cancel()
+                proc.close()
+                await self._checkpoint(force=True)
+                if time.monotonic() - started >= _EXEC_PROBE_SECONDS:
+                    self._retry_delay = self.stream_retry  # exec works; a later failure starts the backoff over
+            if reader.done() and not reader.cancelled():
+                reader.result()  # re-raise why the stream ended
+            elif watcher.done() and not watcher.cancelled():
+                watcher.result()
+
+    async def _read_stream(self, proc, started: float) -> None:
+        async for line in proc.stdout:
+            if not line.endswith(b"\n"):
+                continue  # only at EOF; the partial line is re-read from the checkpoint
+            self._advance(len(line))
+            await self._emit([line.decode("utf-8", errors="replace").rstrip("\r\n")])
+            if self.bot.is_closed():
+                return
+        await proc.wait_closed()
+        status = proc.exit_status
+        if status and time.monotonic() - started < _EXEC_PROBE_SECONDS:
+            raise _ExecUnavailable(f"`tail` exited with status {status}")
+        raise ConnectionError(f"log stream ended (exit status {status})")
+
+    async def _watch(self, sftp) -> None:
+        """Save the checkpoint now and then; return once the log has been rotated."""
+        while not self.bot.is_closed():
+            await asyncio.sleep(self.checkpoint_every)
+            await self._checkpoint()
+            if await self._rotated(sftp):
+                log.info("[chat_bridge] log rotated; reopening")
+                return
+
+    # ---- poll mode ----
+
+    async def _poll(self) -> None:
+        try:
+            async with sftp_conn(self.target) as sftp:
+                try:
+                    await self._resume(sftp)
+                    f = await sftp.open(self.path, "rb")
+                except Exception as e:
+                    log.warning("[chat_bridge] open(%s) failed: %s — retrying…", self.path, e)
+                    await asyncio.sleep(2.0)
+                    return
+
+                async with f:
+                    await f.seek(self.offset)
+                    self.live = True
+                    buf = b""
+                    while not self.bot.is_closed() and not self._stream_due():
+                        chunk = await f.read(64 * 1024)
+                        if not chunk:
+                            await self._checkpoint()
+                            # our handle is at EOF; if the path is longer/shorter it is a new file
+                            if await self._rotated(sftp):
+                                log.info("[chat_bridge] log rotated/truncated; reopening")
+                                return
+                            await asyncio.sleep(self.poll)
+                            continue
+
+                        buf += chunk
+                        end = buf.rfind(b"\n") + 1
+                        if not end:
+                            if len(buf) > _MAX_PARTIAL_LINE:
+                                log.warning("[chat_bridge] skipping %d bytes without a newline", len(buf))
+                                self._advance(len(buf))
+                                buf = b""
+                            continue
+                        complete, buf = buf[:end], buf[end:]
+                        self._advance(len(complete))
+                        lines = complete.decode("utf-8", errors="replace").splitlines()
+                        await self._emit(lines)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.warning("[chat_bridge] SFTP tail error: %s", e)
+            await asyncio.sleep(2.0)
+
+    async def _emit(self, lines: list[str]) -> None:
+        for line in lines:
+            ev = parse_line(line)
+            if ev is None:
+                continue
+            self.bus.publish(ev)
+            if ev.kind == CHAT:
+                self.outbox.put(f"**{discord.utils.escape_markdown(ev.player)}**: {ev.message}")
+
+    async def _send(self, content: str) -> None:
+        ch = self.bot.get_channel(self.chan_id)
+        if not isinstance(ch, (discord.TextChannel, discord.Thread)):
+            raise RuntimeError(f"channel {self.chan_id} not found")
+        await send_message(ch, content, allowed_mentions=discord.AllowedMentions.none())
+
+    def stats(self) -> dict:
+        retry_in = max(0.0, self._stream_retry_at - time.monotonic()) if self._stream_retry_at is not None else None
+        return {"mode": self.mode, "live": self.live, "offset": self.offset, "stream_retry_in_s": retry_in,
+                "outbox": self.outbox.stats()}
+
+_bridge: ChatBridge | None = None
+
+def chat_bridge_stats() -> dict | None:
+    return _bridge.stats() if _bridge else None
+
+def setup_chat_bridge(bot: discord.Client):
+    async def runner():
+        global _bridge
+        await bot.wait_until_ready()
+        chan_id = getattr(settings, "DISCORD_MC_CHAT_CHANNEL_ID", 0)
+        if not chan_id:
+            log.warning("[chat_bridge] DISCORD_MC_CHAT_CHANNEL_ID not set — bridge disabled.")
+            return
+
+        bridge = ChatBridge(
+            bot,
+            chan_id,
+            _resolve_log_path(),
+            mode=str(getattr(settings, "CHAT_BRIDGE_MODE", "auto")).lower(),
+            poll=max(1.0, getattr(settings, "POLL_INTERVAL_SECONDS", 15)),
+            catchup_max=int(getattr(settings, "CHAT_BRIDGE_CATCHUP_MAX_LINES", 200)),
+            checkpoint_every=float(getattr(settings, "CHAT_BRIDGE_CHECKPOINT_SECONDS", 10)),
+        )
+        bridge.outbox.max_lines = max(1, int(getattr(settings, "CHAT_BRIDGE_QUEUE_MAX_LINES", 500)))
+        bridge.outbox.window = float(getattr(settings, "CHAT_BRIDGE_FLUSH_SECONDS", 1.0))
+        _bridge = bridge
+        status_service.follow(bridge.bus, lambda: bridge.live)
+        await bridge.run()
+
     bot.loop.create_task(runner())
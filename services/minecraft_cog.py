@@ -1,31 +1,63 @@
 # services/minecraft_cog.py
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import textwrap
 import discord
 from discord.ext import commands
 from discord import app_commands
 
+from exceptions import PropertiesConflict, UnknownServer
+from services.properties_service import edit_properties
+from services.server_registry import ALL_SERVERS, ManagedServer, registry
+from services.status_service import INTERACTIVE_MAX_AGE, get_snapshot
 from utils.config import settings
-from utils.rcon_client import mc_cmd, get_status
-from utils.sftp_client import (
-    upload_plugin_from_url,
-    edit_server_properties,
-)
+from utils.permissions import is_mod
+from utils.rcon_client import mc_cmd, rcon_session
+from utils.scheduling import Priority
+from utils.sftp_client import upload_plugin_from_url
 
 MAX_MSG = 1900  # keep replies under Discord 2k char cap with code fences
+_SERVER_HELP = f"Target server (default: {settings.MC_SERVER_NAME}; '{ALL_SERVERS}' = every server)"
 
-def _is_mod(inter: discord.Interaction) -> bool:
-    uid_roles = {r.id for r in getattr(inter.user, "roles", [])}
-    allowed = (
-        set(settings.roles_from_csv(settings.DISCORD_ADMIN_ROLE_IDS))
-        | set(settings.roles_from_csv(settings.DISCORD_MOD_ROLE_IDS))
-        | set(settings.roles_from_csv(settings.DISCORD_SERVER_MOD_ROLE_IDS))
+
+class _ServerTransformer(app_commands.Transformer):
+    """Autocompletes the registry's server names (plus 'all'); validation happens in `_targets`."""
+
+    async def transform(self, interaction: discord.Interaction, value: str) -> str:
+        return value
+
+    async def autocomplete(self, interaction: discord.Interaction, value: str) -> list[app_commands.Choice[str]]:
+        names = [*registry.names(), ALL_SERVERS]
+        return [app_commands.Choice(name=n, value=n) for n in names if value.lower() in n.lower()][:25]
+
+
+ServerArg = app_commands.Transform[str, _ServerTransformer]
+
+def _is_all(server: str | None) -> bool:
+    return bool(server) and server.strip().lower() == ALL_SERVERS
+
+def _targets(server: str | None) -> list[ManagedServer]:
+    """Servers a command should run on; raises UnknownServer for a bad name."""
+    return registry.all() if _is_all(server) else [registry.get(server)]
+
+def _single(server: str | None) -> ManagedServer:
+    if _is_all(server):
+        raise UnknownServer(f"'{ALL_SERVERS}' is not supported here; pick one server.")
+    return registry.get(server)
+
+async def _mc(server: str | None, cmd: str, priority: Priority = Priority.USER) -> str:
+    """One RCON command on the chosen server; with 'all', every server's reply prefixed by its name."""
+    if not _is_all(server):
+        return await mc_cmd(cmd, priority=priority, pool=registry.get(server).rcon)
+    results = await registry.fan_out(cmd, priority)
+    return "\n".join(
+        f"[{name}] {(r.output or '').strip() if r.ok else f'error: {r.error}'}" for name, r in results.items()
     )
-    return bool(uid_roles & allowed)
 
 async def _require_mod(inter: discord.Interaction) -> bool:
-    if not _is_mod(inter):
+    if not is_mod(inter):
         await inter.response.send_message("No permission.", ephemeral=True)
         return False
     return True
@@ -43,16 +75,24 @@ async def _reply_err(inter: discord.Interaction, title: str, err: Exception | st
         await inter.response.defer(ephemeral=ephemeral, thinking=True)
     await inter.followup.send(embed=emb, ephemeral=ephemeral)
 
-# Attempt Paper-friendly reload first, fall back to vanilla
-async def _safe_reload() -> str:
-    try:
-        out = (await mc_cmd("reload confirm")).strip()
-        if "Unknown or incomplete command" in out or "Incorrect argument" in out:
-            return (await mc_cmd("reload")).strip()
-        return out
-    except Exception:
-        # Fall back if confirm sub-arg isn’t supported
-        return (await mc_cmd("reload")).strip()
+# Attempt Paper-friendly reload first, fall back to vanilla (both on one RCON session)
+async def _safe_reload(m: ManagedServer) -> str:
+    async with rcon_session(Priority.ADMIN, pool=m.rcon) as s:
+        try:
+            out = (await s.cmd("reload confirm")).strip()
+            if "Unknown or incomplete command" in out or "Incorrect argument" in out:
+                return (await s.cmd("reload")).strip()
+            return out
+        except Exception:
+            # Fall back if confirm sub-arg isn’t supported
+            return (await s.cmd("reload")).strip()
+
+async def _reload(server: str | None) -> str:
+    if not _is_all(server):
+        return await _safe_reload(registry.get(server))
+    targets = registry.all()
+    outs = await asyncio.gather(*[_safe_reload(m) for m in targets], return_exceptions=True)
+    return "\n".join(f"[{m.name}] {out if isinstance(out, str) else f'error: {out}'}" for m, out in zip(targets, outs))
 
 class MinecraftCog(commands.Cog):
     """Slash-only admin & utility commands for Minecraft via RCON."""
@@ -68,15 +108,32 @@ class MinecraftCog(commands.Cog):
 
     # ---------- Minimal /servers (kept; useful as a quick check) ----------
     @app_commands.command(name="servers", description="Show Minecraft server status and version")
-    async def servers(self, interaction: discord.Interaction):
+    @app_commands.describe(server=_SERVER_HELP)
+    async def servers(self, interaction: discord.Interaction, server: ServerArg = None):
         await interaction.response.defer(thinking=True, ephemeral=True)
         try:
-            status = await get_status()
-            ver = await mc_cmd("version")
-            embed = discord.Embed(title="Minecraft Server", color=discord.Color.green())
-            embed.add_field(name="Online", value=f"{status['online']}/{status['max']}", inline=True)
-            embed.add_field(name="Players", value=", ".join(status['players']) or "—", inline=True)
-            embed.add_field(name="Version", value=str(ver).strip()[:1024], inline=False)
+            targets = _targets(server)
+            embed = discord.Embed(title="Minecraft Server" if len(targets) == 1 else "Minecraft Servers", color=discord.Color.green())
+            for m in targets:
+                try:
+                    status = (await get_snapshot(max_age=INTERACTIVE_MAX_AGE, service=m.status)).as_dict()
+                    ver = await mc_cmd("version", pool=m.rcon)
+                except Exception as e:
+                    if len(targets) == 1:
+                        raise
+                    embed.add_field(name=m.name, value=f"🔴 {str(e)[:1000]}", inline=False)
+                    continue
+                if len(targets) == 1:
+                    embed.add_field(name="Online", value=f"{status['online']}/{status['max']}", inline=True)
+                    embed.add_field(name="Players", value=", ".join(status['players']) or "—", inline=True)
+                    embed.add_field(name="Version", value=str(ver).strip()[:1024], inline=False)
+                else:
+                    players = ", ".join(status['players']) or "—"
+                    embed.add_field(
+                        name=m.name,
+                        value=f"{status['online']}/{status['max']} · {players}\n{str(ver).strip()}"[:1024],
+                        inline=False,
+                    )
             await interaction.followup.send(embed=embed, ephemeral=True)
         except Exception as e:
             await _reply_err(interaction, "Server info error", e)
@@ -84,79 +141,79 @@ class MinecraftCog(commands.Cog):
     # ===================== PLAYER GROUP ==============================
 
     @player.command(name="op", description="Give operator status to a player")
-    @app_commands.describe(player="Minecraft nickname")
-    async def player_op(self, interaction: discord.Interaction, player: str):
+    @app_commands.describe(player="Minecraft nickname", server=_SERVER_HELP)
+    async def player_op(self, interaction: discord.Interaction, player: str, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd(f"op {player}")
+            out = await _mc(server, f"op {player}", Priority.ADMIN)
             await _reply_ok(interaction, "op", out)
         except Exception as e:
             await _reply_err(interaction, "op failed", e)
 
     @player.command(name="deop", description="Remove operator status from a player")
-    @app_commands.describe(player="Minecraft nickname")
-    async def player_deop(self, interaction: discord.Interaction, player: str):
+    @app_commands.describe(player="Minecraft nickname", server=_SERVER_HELP)
+    async def player_deop(self, interaction: discord.Interaction, player: str, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd(f"deop {player}")
+            out = await _mc(server, f"deop {player}", Priority.ADMIN)
             await _reply_ok(interaction, "deop", out)
         except Exception as e:
             await _reply_err(interaction, "deop failed", e)
 
     @player.command(name="kick", description="Kick a player")
-    @app_commands.describe(player="Minecraft nickname", reason="Optional reason")
-    async def player_kick(self, interaction: discord.Interaction, player: str, reason: str | None = None):
+    @app_commands.describe(player="Minecraft nickname", reason="Optional reason", server=_SERVER_HELP)
+    async def player_kick(self, interaction: discord.Interaction, player: str, reason: str | None = None, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
             cmd = f"kick {player}" + (f" {reason}" if reason else "")
-            out = await mc_cmd(cmd)
+            out = await _mc(server, cmd, Priority.ADMIN)
             await _reply_ok(interaction, "kick", out)
         except Exception as e:
             await _reply_err(interaction, "kick failed", e)
 
     @player.command(name="ban", description="Ban a player")
-    @app_commands.describe(player="Minecraft nickname", reason="Optional reason")
-    async def player_ban(self, interaction: discord.Interaction, player: str, reason: str | None = None):
+    @app_commands.describe(player="Minecraft nickname", reason="Optional reason", server=_SERVER_HELP)
+    async def player_ban(self, interaction: discord.Interaction, player: str, reason: str | None = None, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
             cmd = f"ban {player}" + (f" {reason}" if reason else "")
-            out = await mc_cmd(cmd)
+            out = await _mc(server, cmd, Priority.ADMIN)
             await _reply_ok(interaction, "ban", out)
         except Exception as e:
             await _reply_err(interaction, "ban failed", e)
 
     @player.command(name="ban_ip", description="Ban an IP address")
-    @app_commands.describe(ip="IPv4/IPv6 address")
-    async def player_ban_ip(self, interaction: discord.Interaction, ip: str):
+    @app_commands.describe(ip="IPv4/IPv6 address", server=_SERVER_HELP)
+    async def player_ban_ip(self, interaction: discord.Interaction, ip: str, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd(f"ban-ip {ip}")
+            out = await _mc(server, f"ban-ip {ip}", Priority.ADMIN)
             await _reply_ok(interaction, "ban-ip", out)
         except Exception as e:
             await _reply_err(interaction, "ban-ip failed", e)
 
     @player.command(name="pardon", description="Unban a player")
-    @app_commands.describe(player="Minecraft nickname")
-    async def player_pardon(self, interaction: discord.Interaction, player: str):
+    @app_commands.describe(player="Minecraft nickname", server=_SERVER_HELP)
+    async def player_pardon(self, interaction: discord.Interaction, player: str, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd(f"pardon {player}")
+            out = await _mc(server, f"pardon {player}", Priority.ADMIN)
             await _reply_ok(interaction, "pardon", out)
         except Exception as e:
             await _reply_err(interaction, "pardon failed", e)
 
     @player.command(name="pardon_ip", description="Unban an IP")
-    @app_commands.describe(ip="IPv4/IPv6 address")
-    async def player_pardon_ip(self, interaction: discord.Interaction, ip: str):
+    @app_commands.describe(ip="IPv4/IPv6 address", server=_SERVER_HELP)
+    async def player_pardon_ip(self, interaction: discord.Interaction, ip: str, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd(f"pardon-ip {ip}")
+            out = await _mc(server, f"pardon-ip {ip}", Priority.ADMIN)
             await _reply_ok(interaction, "pardon-ip", out)
         except Exception as e:
             await _reply_err(interaction, "pardon-ip failed", e)
 
     @player.command(name="whitelist", description="Whitelist controls (on/off/add/remove/list)")
-    @app_commands.describe(action="on/off/add/remove/list", player="Player for add/remove")
+    @app_commands.describe(action="on/off/add/remove/list", player="Player for add/remove", server=_SERVER_HELP)
     @app_commands.choices(
         action=[
             app_commands.Choice(name="on", value="on"),
@@ -166,14 +223,14 @@ class MinecraftCog(commands.Cog):
             app_commands.Choice(name="list", value="list"),
         ]
     )
-    async def player_whitelist(self, interaction: discord.Interaction, action: app_commands.Choice[str], player: str | None = None):
+    async def player_whitelist(self, interaction: discord.Interaction, action: app_commands.Choice[str], player: str | None = None, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
             act = action.value
             if act in {"add", "remove"} and not player:
                 return await _reply_err(interaction, "whitelist", "Player is required for add/remove.")
             cmd = f"whitelist {act}" + (f" {player}" if player and act in {'add','remove'} else "")
-            out = await mc_cmd(cmd)
+            out = await _mc(server, cmd, Priority.ADMIN)
             await _reply_ok(interaction, "whitelist", out)
         except Exception as e:
             await _reply_err(interaction, "whitelist failed", e)
@@ -181,64 +238,74 @@ class MinecraftCog(commands.Cog):
     # ===================== SERVER GROUP ==============================
 
     @server.command(name="stop", description="Stop the server")
-    async def server_stop(self, interaction: discord.Interaction):
+    @app_commands.describe(server=_SERVER_HELP)
+    async def server_stop(self, interaction: discord.Interaction, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd("stop")
+            out = await _mc(server, "stop", Priority.ADMIN)
             await _reply_ok(interaction, "stop", out)
         except Exception as e:
             await _reply_err(interaction, "stop failed", e)
 
     @server.command(name="save_all", description="Force save all worlds")
-    async def server_save_all(self, interaction: discord.Interaction):
+    @app_commands.describe(server=_SERVER_HELP)
+    async def server_save_all(self, interaction: discord.Interaction, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd("save-all")
+            out = await _mc(server, "save-all", Priority.ADMIN)
             await _reply_ok(interaction, "save-all", out)
         except Exception as e:
             await _reply_err(interaction, "save-all failed", e)
 
     @server.command(name="save_off", description="Disable auto-saving (be careful)")
-    async def server_save_off(self, interaction: discord.Interaction):
+    @app_commands.describe(server=_SERVER_HELP)
+    async def server_save_off(self, interaction: discord.Interaction, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd("save-off")
+            out = await _mc(server, "save-off", Priority.ADMIN)
             await _reply_ok(interaction, "save-off", out)
         except Exception as e:
             await _reply_err(interaction, "save-off failed", e)
 
     @server.command(name="save_on", description="Re-enable auto-saving")
-    async def server_save_on(self, interaction: discord.Interaction):
+    @app_commands.describe(server=_SERVER_HELP)
+    async def server_save_on(self, interaction: discord.Interaction, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd("save-on")
+            out = await _mc(server, "save-on", Priority.ADMIN)
             await _reply_ok(interaction, "save-on", out)
         except Exception as e:
             await _reply_err(interaction, "save-on failed", e)
 
     @server.command(name="reload", description="Reload datapacks & settings (can lag)")
-    async def server_reload(self, interaction: discord.Interaction):
+    @app_commands.describe(server=_SERVER_HELP)
+    async def server_reload(self, interaction: discord.Interaction, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await _safe_reload()
+            out = await _reload(server)
             await _reply_ok(interaction, "reload", out)
         except Exception as e:
             await _reply_err(interaction, "reload failed", e)
 
     @server.command(name="list", description="Show online players")
-    async def server_list(self, interaction: discord.Interaction):
+    @app_commands.describe(server=_SERVER_HELP)
+    async def server_list(self, interaction: discord.Interaction, server: ServerArg = None):
         # Allowed for anyone; it’s read-only
         try:
-            status = await get_status()
-            body = f"Online: {status['online']}/{status['max']}\nPlayers: {', '.join(status['players']) or '—'}"
-            await _reply_ok(interaction, "list", body)
+            targets = _targets(server)
+            lines = []
+            for m in targets:
+                status = (await get_snapshot(max_age=INTERACTIVE_MAX_AGE, service=m.status)).as_dict()
+                body = f"Online: {status['online']}/{status['max']}\nPlayers: {', '.join(status['players']) or '—'}"
+                lines.append(f"[{m.name}]\n{body}" if len(targets) > 1 else body)
+            await _reply_ok(interaction, "list", "\n\n".join(lines))
         except Exception as e:
             await _reply_err(interaction, "list failed", e)
 
     # ====================== WORLD GROUP ==============================
 
     @world.command(name="gamemode", description="Set game mode for a player")
-    @app_commands.describe(mode="survival/creative/adventure/spectator", player="Minecraft nickname")
+    @app_commands.describe(mode="survival/creative/adventure/spectator", player="Minecraft nickname", server=_SERVER_HELP)
     @app_commands.choices(
         mode=[
             app_commands.Choice(name="survival", value="survival"),
@@ -247,46 +314,46 @@ class MinecraftCog(commands.Cog):
             app_commands.Choice(name="spectator", value="spectator"),
         ]
     )
-    async def world_gamemode(self, interaction: discord.Interaction, mode: app_commands.Choice[str], player: str):
+    async def world_gamemode(self, interaction: discord.Interaction, mode: app_commands.Choice[str], player: str, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd(f"gamemode {mode.value} {player}")
+            out = await _mc(server, f"gamemode {mode.value} {player}", Priority.ADMIN)
             await _reply_ok(interaction, "gamemode", out)
         except Exception as e:
             await _reply_err(interaction, "gamemode failed", e)
 
     @world.command(name="tp", description="Teleport player(s)")
-    @app_commands.describe(target="Player or selector", destination="Player/selector/coords")
-    async def world_tp(self, interaction: discord.Interaction, target: str, destination: str):
+    @app_commands.describe(target="Player or selector", destination="Player/selector/coords", server=_SERVER_HELP)
+    async def world_tp(self, interaction: discord.Interaction, target: str, destination: str, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd(f"tp {target} {destination}")
+            out = await _mc(server, f"tp {target} {destination}", Priority.ADMIN)
             await _reply_ok(interaction, "tp", out)
         except Exception as e:
             await _reply_err(interaction, "tp failed", e)
 
     @world.command(name="time_set", description="Set time (day, night, or ticks)")
-    @app_commands.describe(value="day/night or numeric ticks")
-    async def world_time_set(self, interaction: discord.Interaction, value: str):
+    @app_commands.describe(value="day/night or numeric ticks", server=_SERVER_HELP)
+    async def world_time_set(self, interaction: discord.Interaction, value: str, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd(f"time set {value}")
+            out = await _mc(server, f"time set {value}", Priority.ADMIN)
             await _reply_ok(interaction, "time set", out)
         except Exception as e:
             await _reply_err(interaction, "time set failed", e)
 
     @world.command(name="time_add", description="Add ticks to time")
-    @app_commands.describe(ticks="Number of ticks to add")
-    async def world_time_add(self, interaction: discord.Interaction, ticks: int):
+    @app_commands.describe(ticks="Number of ticks to add", server=_SERVER_HELP)
+    async def world_time_add(self, interaction: discord.Interaction, ticks: int, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd(f"time add {ticks}")
+            out = await _mc(server, f"time add {ticks}", Priority.ADMIN)
             await _reply_ok(interaction, "time add", out)
         except Exception as e:
             await _reply_err(interaction, "time add failed", e)
 
     @world.command(name="weather", description="Set weather")
-    @app_commands.describe(kind="clear/rain/thunder")
+    @app_commands.describe(kind="clear/rain/thunder", server=_SERVER_HELP)
     @app_commands.choices(
         kind=[
             app_commands.Choice(name="clear", value="clear"),
@@ -294,16 +361,16 @@ class MinecraftCog(commands.Cog):
             app_commands.Choice(name="thunder", value="thunder"),
         ]
     )
-    async def world_weather(self, interaction: discord.Interaction, kind: app_commands.Choice[str]):
+    async def world_weather(self, interaction: discord.Interaction, kind: app_commands.Choice[str], server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd(f"weather {kind.value}")
+            out = await _mc(server, f"weather {kind.value}", Priority.ADMIN)
             await _reply_ok(interaction, "weather", out)
         except Exception as e:
             await _reply_err(interaction, "weather failed", e)
 
     @world.command(name="difficulty", description="Change difficulty")
-    @app_commands.describe(level="peaceful/easy/normal/hard")
+    @app_commands.describe(level="peaceful/easy/normal/hard", server=_SERVER_HELP)
     @app_commands.choices(
         level=[
             app_commands.Choice(name="peaceful", value="peaceful"),
@@ -312,43 +379,43 @@ class MinecraftCog(commands.Cog):
             app_commands.Choice(name="hard", value="hard"),
         ]
     )
-    async def world_difficulty(self, interaction: discord.Interaction, level: app_commands.Choice[str]):
+    async def world_difficulty(self, interaction: discord.Interaction, level: app_commands.Choice[str], server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd(f"difficulty {level.value}")
+            out = await _mc(server, f"difficulty {level.value}", Priority.ADMIN)
             await _reply_ok(interaction, "difficulty", out)
         except Exception as e:
             await _reply_err(interaction, "difficulty failed", e)
 
     @world.command(name="worldborder_set", description="Set world border size")
-    @app_commands.describe(size="Border size")
-    async def world_worldborder_set(self, interaction: discord.Interaction, size: int):
+    @app_commands.describe(size="Border size", server=_SERVER_HELP)
+    async def world_worldborder_set(self, interaction: discord.Interaction, size: int, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd(f"worldborder set {size}")
+            out = await _mc(server, f"worldborder set {size}", Priority.ADMIN)
             await _reply_ok(interaction, "worldborder set", out)
         except Exception as e:
             await _reply_err(interaction, "worldborder set failed", e)
 
     @world.command(name="effect_give", description="Give potion effect")
-    @app_commands.describe(player="Nickname", effect="Effect id/name", duration="Seconds (optional)", amplifier="Level (optional)")
-    async def world_effect_give(self, interaction: discord.Interaction, player: str, effect: str, duration: int | None = None, amplifier: int | None = None):
+    @app_commands.describe(player="Nickname", effect="Effect id/name", duration="Seconds (optional)", amplifier="Level (optional)", server=_SERVER_HELP)
+    async def world_effect_give(self, interaction: discord.Interaction, player: str, effect: str, duration: int | None = None, amplifier: int | None = None, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
             cmd = f"effect give {player} {effect}"
             if duration is not None: cmd += f" {duration}"
             if amplifier is not None: cmd += f" {amplifier}"
-            out = await mc_cmd(cmd)
+            out = await _mc(server, cmd, Priority.ADMIN)
             await _reply_ok(interaction, "effect give", out)
         except Exception as e:
             await _reply_err(interaction, "effect give failed", e)
 
     @world.command(name="effect_clear", description="Clear potion effects")
-    @app_commands.describe(player="Nickname")
-    async def world_effect_clear(self, interaction: discord.Interaction, player: str):
+    @app_commands.describe(player="Nickname", server=_SERVER_HELP)
+    async def world_effect_clear(self, interaction: discord.Interaction, player: str, server: ServerArg = None):
         if not await _require_mod(interaction): return
         try:
-            out = await mc_cmd(f"effect clear {player}")
+            out = await _mc(server, f"effect clear {player}", Priority.ADMIN)
             await _reply_ok(interaction, "effect clear", out)
         except Exception as e:
             await _reply_err(interaction, "effect clear failed", e)
@@ -356,25 +423,28 @@ class MinecraftCog(commands.Cog):
     # ======================= INFO GROUP ==============================
 
     @info.command(name="seed", description="Show world seed")
-    async def info_seed(self, interaction: discord.Interaction):
+    @app_commands.describe(server=_SERVER_HELP)
+    async def info_seed(self, interaction: discord.Interaction, server: ServerArg = None):
         try:
-            out = await mc_cmd("seed")
+            out = await _mc(server, "seed")
             await _reply_ok(interaction, "seed", out)
         except Exception as e:
             await _reply_err(interaction, "seed error", e)
 
     @info.command(name="datapack_list", description="List datapacks")
-    async def info_datapack_list(self, interaction: discord.Interaction):
+    @app_commands.describe(server=_SERVER_HELP)
+    async def info_datapack_list(self, interaction: discord.Interaction, server: ServerArg = None):
         try:
-            out = await mc_cmd("datapack list")
+            out = await _mc(server, "datapack list")
             await _reply_ok(interaction, "datapack list", out)
         except Exception as e:
             await _reply_err(interaction, "datapack list error", e)
 
     @info.command(name="scoreboard_objectives_list", description="List scoreboard objectives")
-    async def info_scoreboard_objectives_list(self, interaction: discord.Interaction):
+    @app_commands.describe(server=_SERVER_HELP)
+    async def info_scoreboard_objectives_list(self, interaction: discord.Interaction, server: ServerArg = None):
         try:
-            out = await mc_cmd("scoreboard objectives list")
+            out = await _mc(server, "scoreboard objectives list")
             await _reply_ok(interaction, "scoreboard objectives list", out)
         except Exception as e:
             await _reply_err(interaction, "scoreboard objectives list error", e)
@@ -382,32 +452,48 @@ class MinecraftCog(commands.Cog):
     # ======================= EDIT PROPERTIES =========================
 
     @app_commands.command(name="properties", description="Edit server.properties (key=value, key2=value2, …)")
-    @app_commands.describe(kv='Comma separated key=value pairs, e.g. "motd=Hello,max-players=50"')
-    async def properties_edit(self, interaction: discord.Interaction, kv: str):
-        if not _is_mod(interaction):
+    @app_commands.describe(kv='Comma separated key=value pairs, e.g. "motd=Hello,max-players=50"', server=_SERVER_HELP)
+    async def properties_edit(self, interaction: discord.Interaction, kv: str, server: ServerArg = None):
+        if not is_mod(interaction):
             return await interaction.response.send_message("No permission.", ephemeral=True)
         try:
             pairs = {k.strip(): v.strip() for k, v in (item.split("=", 1) for item in kv.split(",") if "=" in item)}
             if not pairs:
                 return await interaction.response.send_message("Nothing to change. Provide key=value pairs.", ephemeral=True)
             await interaction.response.defer(thinking=True, ephemeral=True)
-            await edit_server_properties(pairs)
+            m = _single(server)
+            changed = await edit_properties(pairs, path=m.properties_path, target=m.sftp)
+            if not changed:
+                return await interaction.followup.send("Nothing changed; the file already has those values.", ephemeral=True)
             # Do not force full server reload; Paper datapack reload is heavy. Admin can /server reload if needed.
-            await interaction.followup.send(f"Updated: `{pairs}`", ephemeral=True)
+            lines = "\n".join(f"{k}: {old if old is not None else '(unset)'} -> {new}" for k, (old, new) in changed.items())
+            await interaction.followup.send(f"Updated:\n```text\n{lines}\n```", ephemeral=True)
+        except PropertiesConflict as e:
+            await interaction.followup.send(f"{e}. Try again.", ephemeral=True)
         except Exception as e:
             await interaction.followup.send(f"Error updating properties: `{e}`", ephemeral=True)
 
     # ======================= INSTALL PLUGIN ==========================
 
     @app_commands.command(name="plugin", description="Install plugin from a direct URL to a .jar")
-    @app_commands.describe(url="Direct URL to plugin .jar")
-    async def plugin_install(self, interaction: discord.Interaction, url: str):
-        if not _is_mod(interaction):
+    @app_commands.describe(url="Direct URL to plugin .jar", server=_SERVER_HELP)
+    async def plugin_install(self, interaction: discord.Interaction, url: str, server: ServerArg = None):
+        if not is_mod(interaction):
             return await interaction.response.send_message("No permission.", ephemeral=True)
         try:
             await interaction.response.defer(thinking=True, ephemeral=True)
-            await upload_plugin_from_url(url)
-            await interaction.followup.send("Plugin uploaded. Use `/server reload` to load it.", ephemeral=True)
+            m = _single(server)
+
+            async def progress(done: int, total: int | None):
+                of = f" / {total / 2**20:.1f} MiB ({done * 100 // total}%)" if total else " MiB"
+                with contextlib.suppress(discord.HTTPException):  # progress is best effort
+                    await interaction.edit_original_response(content=f"Uploading to {m.name}: {done / 2**20:.1f}{of}")
+
+            up = await upload_plugin_from_url(url, dest_dir=m.plugins_dir, target=m.sftp, progress=progress)
+            await interaction.edit_original_response(content=(
+                f"Plugin `{up.name}` uploaded to {m.name} ({up.size / 2**20:.1f} MiB, sha256 `{up.sha256[:16]}…`). "
+                "Use `/server reload` to load it."
+            ))
         except Exception as e:
             await interaction.followup.send(f"Error uploading plugin: `{e}`", ephemeral=True)
 
@@ -1,6 +1,8 @@
 import discord
 from discord.ext import commands
 from utils.config import settings
+from utils.discord_scheduler import send_message
+from utils.scheduling import Priority
 
 ADMIN_TRIGGERS = ("!admin", "/admin")
 
@@ -17,7 +19,8 @@ class ModerationCog(commands.Cog):
             roles_to_tag = []
             roles_to_tag += [f"<@&{rid}>" for rid in settings.roles_from_csv(settings.DISCORD_ADMIN_ROLE_IDS)]
             roles_to_tag += [f"<@&{rid}>" for rid in settings.roles_from_csv(settings.DISCORD_MOD_ROLE_IDS)]
-            await channel.send(f"{' '.join(roles_to_tag)}\n**/admin report:** {message}\nFrom: <@{interaction.user.id}>")
+            await send_message(channel, f"{' '.join(roles_to_tag)}\n**/admin report:** {message}\nFrom: <@{interaction.user.id}>",
+                               priority=Priority.USER)
 
     # Scan messages for !admin
     @commands.Cog.listener()
@@ -34,4 +37,5 @@ class ModerationCog(commands.Cog):
                 roles_to_tag += [f"<@&{rid}>" for rid in settings.roles_from_csv(settings.DISCORD_MOD_ROLE_IDS)]
                 payload = content.split(maxsplit=1)
                 msg = payload[1] if len(payload) > 1 else "(no message)"
-                await channel.send(f"{' '.join(roles_to_tag)}\n**!admin report:** {msg}\nFrom: <@{message.author.id}>")
+                await send_message(channel, f"{' '.join(roles_to_tag)}\n**!admin report:** {msg}\nFrom: <@{message.author.id}>",
+                                   priority=Priority.USER)
@@ -0,0 +1,306 @@
+# services/plugin_index.py
+"""
+Inventory of the plugins folder: name, version, main class and dependencies of every jar.
+
+A jar is a ZIP file, so its `plugin.yml` (or `paper-plugin.yml`) can be found without
+downloading it: read the end-of-central-directory record from the tail of the file, then
+the central directory it points to, then just the one compressed entry. Results are cached
+per jar by (path, size, mtime), so a rescan only reads jars that were added or replaced.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import posixpath
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+
+import asyncssh
+
+from utils.config import settings
+from utils.sftp_client import MTIME_SETTLE_SECONDS, SftpTarget, default_target, plugin_dir_entries, sftp_conn
+
+log = logging.getLogger(__name__)
+
+DESCRIPTORS = ("paper-plugin.yml", "plugin.yml")  # Paper prefers paper-plugin.yml when a jar has both
+_EOCD = struct.Struct("<4sHHHHIIH")
+_CDH = struct.Struct("<4sHHHHHHIIIHHHHHII")
+_LFH = struct.Struct("<4sHHHHHIIIHH")
+_TAIL_BYTES = 4096  # jars rarely carry an archive comment, so the EOCD is in the last few bytes
+_MAX_TAIL_BYTES = _EOCD.size + 0xFFFF  # EOCD plus the longest possible comment
+_MAX_DESCRIPTOR_BYTES = 1 << 20
+_MAX_PARALLEL = 8  # jars read at once over the one SFTP channel
+_IO_ERRORS = (asyncssh.SFTPError, OSError)  # unreadable or vanished jar; not cached, it may be fixed without a new mtime
+
+
+class JarError(Exception):
+    """The jar could not be read as a ZIP, or has no usable plugin descriptor."""
+
+
+@dataclass(frozen=True)
+class PluginInfo:
+    file: str
+    size: int
+    mtime: int
+    name: str | None = None
+    version: str | None = None
+    main: str | None = None
+    depend: tuple[str, ...] = ()
+    softdepend: tuple[str, ...] = ()
+    api_version: str | None = None
+    descriptor: str | None = None  # which yml the fields came from
+    error: str | None = None
+
+    @property
+    def label(self) -> str:
+        if self.name is None:
+            return f"{self.file} ({self.error or 'no plugin.yml'})"
+        return f"{self.name} {self.version}" if self.version else self.name
+
+
+# ---- ZIP ----
+
+async def _find_entry(f, size: int, wanted: tuple[str, ...]) -> tuple[str, bytes]:
+    """Name and contents of the first of `wanted` present in the ZIP open as `f`."""
+    tail_start = max(0, size - _TAIL_BYTES)
+    tail = await f.read(size - tail_start, tail_start)
+    at = tail.rfind(b"PK\x05\x06")
+    if at < 0 and tail_start > 0:
+        tail_start = max(0, size - _MAX_TAIL_BYTES)
+        tail = await f.read(size - tail_start, tail_start)
+        at = tail.rfind(b"PK\x05\x06")
+    if at < 0 or at + _EOCD.size > len(tail):
+        raise JarError("not a ZIP file")
+    _, _, _, _, count, cd_size, cd_offset, _ = _EOCD.unpack_from(tail, at)
+    if count == 0xFFFF or cd_offset == 0xFFFFFFFF:
+        raise JarError("ZIP64 archives are not supported")
+
+    # the central directory usually sits right before the EOCD, i.e. often inside `tail`
+    if cd_offset >= tail_start:
+        cd = tail[cd_offset - tail_start:cd_offset - tail_start + cd_size]
+    else:
+        cd = await f.read(cd_size, cd_offset)
+
+    found: dict[str, tuple[int, int, int, int]] = {}
+    pos = 0
+    for _ in range(count):
+        if pos + _CDH.size > len(cd):
+            raise JarError("truncated central directory")
+        (sig, _, _, flags, method, _, _, _, csize, usize,
+         nlen, elen, clen, _, _, _, local_offset) = _CDH.unpack_from(cd, pos)
+        if sig != b"PK\x01\x02":
+            raise JarError("corrupt central directory")
+        name = cd[pos + _CDH.size:pos + _CDH.size + nlen].decode("utf-8", errors="replace")
+        if name in wanted:
+            if flags & 0x1:
+                raise JarError(f"{name} is encrypted")
+            found[name] = (method, csize, usize, local_offset)
+        pos += _CDH.size + nlen + elen + clen
+
+    for name in wanted:
+        if name in found:
+            method, csize, usize, local_offset = found[name]
+            break
+    else:
+        raise JarError("no plugin.yml")
+    if usize > _MAX_DESCRIPTOR_BYTES:
+        raise JarError(f"{name} is too large")
+
+    # the local header repeats the name and has its own extra field; guess, re-read if short
+    head = await f.read(_LFH.size + len(name) + 256 + csize, local_offset)
+    sig, *_, nlen, elen = _LFH.unpack_from(head)
+    if sig != b"PK\x03\x04":
+        raise JarError("corrupt local header")
+    start = _LFH.size + nlen + elen
+    data = head[start:start + csize]
+    if len(data) < csize:
+        data = await f.read(csize, local_offset + start)
+    if method == 0:
+        return name, data
+    if method == 8:
+        return name, zlib.decompressobj(-zlib.MAX_WBITS).decompress(data, _MAX_DESCRIPTOR_BYTES)
+    raise JarError(f"unsupported compression method {method}")
+
+
+# ---- YAML (just enough for plugin descriptors; PyYAML is not a dependency) ----
+
+def _strip_comment(line: str) -> str:
+    quote = None
+    for i, ch in enumerate(line):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "#" and (i == 0 or line[i - 1] in " \t"):
+            return line[:i]
+    return line
+
+
+def _scalar(value: str):
+    value = value.strip()
+    if value.startswith("[") and value.endswith("]"):
+        return [_scalar(v) for v in value[1:-1].split(",") if v.strip()]
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        return value[1:-1]
+    return value
+
+
+def _block(lines: list[tuple[int, str]], i: int, indent: int):
+    """Parse the mapping or sequence starting at lines[i]; returns (value, next index)."""
+    if lines[i][1].startswith("-"):
+        items = []
+        while i < len(lines) and lines[i][0] == indent and lines[i][1].startswith("-"):
+            rest = lines[i][1][1:].strip()
+            i += 1
+            if rest:
+                items.append(_scalar(rest))
+            elif i < len(lines) and lines[i][0] > indent:
+                value, i = _block(lines, i, lines[i][0])
+                items.append(value)
+        return items, i
+
+    mapping: dict = {}
+    while i < len(lines) and lines[i][0] >= indent:
+        depth, text = lines[i]
+        i += 1
+        key, sep, rest = text.partition(":")
+        if depth > indent or not sep or text.startswith("-"):
+            continue  # continuation of something we don't model
+        key, rest = _scalar(key), rest.strip()
+        if rest and rest[0] in "|>":
+            while i < len(lines) and lines[i][0] > indent:
+                i += 1  # block scalar (e.g. a long description); not needed
+            mapping[key] = ""
+        elif rest:
+            mapping[key] = _scalar(rest)
+        elif i < len(lines) and (lines[i][0] > indent or (lines[i][0] == indent and lines[i][1].startswith("-"))):
+            mapping[key], i = _block(lines, i, lines[i][0])
+        else:
+            mapping[key] = None
+    return mapping, i
+
+
+def parse_yaml_subset(text: str) -> dict:
+    """Block mappings/sequences, inline lists and plain or quoted scalars, all as strings."""
+    lines = []
+    for raw in text.replace("\t", "  ").splitlines():
+        line = _strip_comment(raw).rstrip()
+        if line.strip() and line.strip() not in ("---", "..."):
+            lines.append((len(line) - len(line.lstrip()), line.strip()))
+    if not lines:
+        return {}
+    value, _ = _block(lines, 0, lines[0][0])
+    return value if isinstance(value, dict) else {}
+
+
+def _names(value) -> tuple[str, ...]:
+    if isinstance(value, str):
+        value = [value]
+    return tuple(str(v) for v in value or () if isinstance(v, str) and v)
+
+
+def _info_from_descriptor(file: str, size: int, mtime: int, descriptor: str, text: str) -> PluginInfo:
+    y = parse_yaml_subset(text)
+    depend, softdepend = _names(y.get("depend")), _names(y.get("softdepend"))
+    deps = y.get("dependencies")
+    if descriptor == "paper-plugin.yml" and isinstance(deps, dict):
+        # dependencies: {server: {Name: {required: true, load: BEFORE}}}
+        hard, soft = [], []
+        server = deps.get("server")
+        for name, opts in (server.items() if isinstance(server, dict) else ()):
+            required = not isinstance(opts, dict) or str(opts.get("required", "true")).lower() != "false"
+            (hard if required else soft).append(str(name))
+        depend, softdepend = tuple(hard), tuple(soft)
+    name = y.get("name")
+    if not isinstance(name, str) or not name:
+        raise JarError(f"{descriptor} has no name")
+    return PluginInfo(
+        file=file, size=size, mtime=mtime, name=name,
+        version=str(y["version"]) if isinstance(y.get("version"), str) else None,
+        main=y.get("main") if isinstance(y.get("main"), str) else None,
+        depend=depend, softdepend=softdepend,
+        api_version=y.get("api-version") if isinstance(y.get("api-version"), str) else None,
+        descriptor=descriptor,
+    )
+
+
+# ---- index ----
+
+class _CountingReader:
+    def __init__(self, f, stats: dict):
+        self._f = f
+        self._stats = stats
+
+    async def read(self, size: int, offset: int) -> bytes:
+        data = await self._f.read(size, offset)
+        self._stats["bytes_read"] += len(data)
+        return data
+
+
+class PluginIndex:
+    """Per-jar metadata cache; `scan()` costs one readdir when nothing changed."""
+
+    def __init__(self, parallel: int = _MAX_PARALLEL):
+        self._cache: dict[tuple[SftpTarget, str], PluginInfo] = {}
+        self._parallel = parallel
+        self._stats = {"scans": 0, "hits": 0, "indexed": 0, "errors": 0, "bytes_read": 0}
+
+    async def scan(self, dir_path: str | None = None,
+                   target: SftpTarget | None = None) -> tuple[list[PluginInfo], list[str]]:
+        """(plugins sorted by name, non-jar folder names) for the plugins folder."""
+        dir_path = (dir_path or settings.MC_PLUGINS_DIR).rstrip("/") or "/"
+        tgt = target or default_target()
+        self._stats["scans"] += 1
+        async with sftp_conn(target) as sftp:
+            entries = await plugin_dir_entries(sftp, dir_path)
+            folders = sorted(n[:-1] for n, _ in entries if n.endswith("/"))
+            jars = [(n, a) for n, a in entries if n.lower().endswith(".jar") and not n.startswith(".")]
+
+            limit = asyncio.Semaphore(self._parallel)
+
+            async def one(name: str, attrs) -> PluginInfo:
+                key = (tgt, posixpath.join(dir_path, name))
+                size, mtime = int(attrs.size or 0), int(attrs.mtime or 0)
+                cached = self._cache.get(key)
+                if cached and (cached.size, cached.mtime) == (size, mtime):
+                    self._stats["hits"] += 1
+                    return cached
+                async with limit:
+                    info, cacheable = await self._index(sftp, key[1], name, size, mtime)
+                if cacheable and time.time() - mtime >= MTIME_SETTLE_SECONDS:  # may still be being written otherwise
+                    self._cache[key] = info
+                return info
+
+            infos = await asyncio.gather(*(one(n, a) for n, a in jars))
+
+        present = {(tgt, posixpath.join(dir_path, n)) for n, _ in jars}
+        for key in [k for k in self._cache if k[0] == tgt and posixpath.dirname(k[1]) == dir_path]:
+            if key not in present:
+                del self._cache[key]
+        return sorted(infos, key=lambda p: (p.name or p.file).lower()), folders
+
+    async def _index(self, sftp, path: str, file: str, size: int, mtime: int) -> tuple[PluginInfo, bool]:
+        """(info, cacheable); a jar that cannot be read becomes one errored row, not a failed scan."""
+        self._stats["indexed"] += 1
+        try:
+            async with (await sftp.open(path, "rb")) as f:
+                f = _CountingReader(f, self._stats)
+                descriptor, data = await _find_entry(f, size, DESCRIPTORS)
+            return _info_from_descriptor(file, size, mtime, descriptor, data.decode("utf-8", errors="replace")), True
+        except (JarError, struct.error, zlib.error, *_IO_ERRORS) as e:
+            self._stats["errors"] += 1
+            log.debug("[plugins] %s: %s", path, e)
+            return PluginInfo(file, size, mtime, error=str(e) or type(e).__name__), not isinstance(e, _IO_ERRORS)
+
+    def stats(self) -> dict:
+        return {"cached": len(self._cache), **self._stats}
+
+
+plugin_index = PluginIndex()
+
+
+async def plugin_inventory(dir_path: str | None = None,
+                           target: SftpTarget | None = None) -> tuple[list[PluginInfo], list[str]]:
+    return await plugin_index.scan(dir_path, target)
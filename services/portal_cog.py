@@ -2,16 +2,26 @@
 from __future__ import annotations
 import asyncio
 import contextlib
+import hashlib
+import json
 import logging
+from datetime import datetime
 from typing import Optional
 
 import discord
 from discord import app_commands
 from discord.ext import commands
+from sqlalchemy import select
 
+from models.portal_message import PortalMessage
 from utils.config import settings
-from utils.rcon_client import get_status, mc_cmd
-from utils.sftp_client import read_server_properties_text, list_plugins
+from utils.db import async_session_maker
+from utils.discord_scheduler import edit_message, send_message
+from services.status_service import INTERACTIVE_MAX_AGE, get_snapshot, status_service
+from utils.rcon_client import mc_cmd_many, rcon_health
+from utils.scheduling import Priority
+from services.plugin_index import plugin_inventory
+from services.properties_service import get_properties
 
 log = logging.getLogger(__name__)
 
@@ -29,9 +39,15 @@ PORTAL_CHANNEL_ID = int(getattr(settings, "PORTAL_CHANNEL_ID", 14040177669227152
 WHITELIST_ALLOWED_ROLE_IDS = _csv_ids(getattr(settings, "DISCORD_WHITELIST_ALLOWED_ROLE_IDS", ""))
 ADMIN_ROLE_IDS = _csv_ids(getattr(settings, "DISCORD_ADMIN_ROLE_IDS", "")) + _csv_ids(getattr(settings, "DISCORD_MOD_ROLE_IDS", ""))
 
-# Auto-refresh & voice status channel
+# Auto-refresh (the status voice channels are renamed by services.presence_task)
 PORTAL_REFRESH_SECONDS = int(getattr(settings, "PORTAL_REFRESH_SECONDS", 60))
-MC_STATUS_VOICE_CHANNEL_ID = int(getattr(settings, "MC_STATUS_VOICE_CHANNEL_ID", "0") or 0)
+PORTAL_EVENT_DEBOUNCE_SECONDS = 3
+
+async def _status_info(max_age: float, priority: Priority = Priority.USER) -> Optional[dict]:
+    """Shared status snapshot as a dict, or None if the server can't be reached."""
+    with contextlib.suppress(Exception):
+        return (await asyncio.wait_for(get_snapshot(max_age=max_age, priority=priority), timeout=8)).as_dict()
+    return None
 
 def _admin_mentions() -> str:
     return " ".join(f"<@&{rid}>" for rid in ADMIN_ROLE_IDS) or "@here"
@@ -44,11 +60,14 @@ def _has_any_role(member: discord.Member | discord.abc.User, role_ids: list[int]
     uroles = {r.id for r in member.roles}
     return any(rid in uroles for rid in role_ids)
 
+PROPS_SMALL_KEYS = ("motd", "difficulty", "max-players", "online-mode", "server-port", "pvp", "view-distance")
+
 async def _ack(inter: discord.Interaction, ephemeral: bool = True):
     if not inter.response.is_done():
         await inter.response.defer(ephemeral=ephemeral, thinking=True)
 
-def _portal_embed(server_info: Optional[dict] = None, props_small: Optional[dict] = None) -> discord.Embed:
+def _portal_embed(server_info: Optional[dict] = None, props_small: Optional[dict] = None,
+                  health: Optional[dict] = None) -> discord.Embed:
     e = discord.Embed(
         title="🎮 Minecraft Server",
         description="Use the buttons below.",
@@ -76,6 +95,13 @@ def _portal_embed(server_info: Optional[dict] = None, props_small: Optional[dict
         if "error" in server_info:
             e.add_field(name="Status Error", value=f"`{server_info['error']}`", inline=False)
 
+    # RCON circuit breaker: say "offline since …" instead of silently showing nothing
+    if health and health.get("state") != "closed":
+        since = health.get("down_since")
+        since_txt = discord.utils.format_dt(datetime.fromisoformat(since), "R") if since else "recently"
+        state = "🟡 Reconnecting…" if health["state"] == "half_open" else "🔴 Offline"
+        e.add_field(name="Server Status", value=f"{state} (since {since_txt})", inline=False)
+
     if props_small:
         pretty = "\n".join(f"**{k}**: {v}" for k, v in props_small.items())
         if pretty:
@@ -96,11 +122,14 @@ class WhitelistModal(discord.ui.Modal, title="Whitelist Request"):
             return await interaction.followup.send("You don’t have permission to request whitelist.", ephemeral=True)
         player = str(self.ign).strip()
         try:
-            await asyncio.wait_for(mc_cmd(f"whitelist add {player}"), timeout=8)
-            await asyncio.wait_for(mc_cmd("whitelist reload"), timeout=8)
-            await interaction.followup.send(f"✅ Added **{player}** to whitelist.", ephemeral=True)
-        except asyncio.TimeoutError:
-            await interaction.followup.send("❌ RCON timed out (check reachability).", ephemeral=True)
+            results = await mc_cmd_many([f"whitelist add {player}", "whitelist reload"], stop_on_error=True)
+            failed = next((r for r in results if not r.ok), None)
+            if failed is None:
+                await interaction.followup.send(f"✅ Added **{player}** to whitelist.", ephemeral=True)
+            elif isinstance(failed.error, asyncio.TimeoutError):
+                await interaction.followup.send("❌ RCON timed out (check reachability).", ephemeral=True)
+            else:
+                await interaction.followup.send(f"❌ RCON error: `{failed.error}`", ephemeral=True)
         except Exception as e:
             await interaction.followup.send(f"❌ RCON error: `{e}`", ephemeral=True)
 
@@ -123,7 +152,7 @@ class SupportModal(discord.ui.Modal, title="Contact Admin"):
             emb.add_field(name="User", value=interaction.user.mention, inline=True)
             emb.add_field(name="Subject", value=str(self.subject), inline=True)
             emb.add_field(name="Details", value=str(self.details), inline=False)
-            await thread.send(_admin_mentions(), embed=emb)
+            await send_message(thread, _admin_mentions(), embed=emb, priority=Priority.USER)
             await interaction.followup.send(f"Created {thread.mention}", ephemeral=True)
         except discord.Forbidden:
             await interaction.followup.send("I need **Manage Threads** permission here.", ephemeral=True)
@@ -144,8 +173,8 @@ class PortalView(discord.ui.View):
     async def status_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
         await _ack(interaction)
         try:
-            info = await asyncio.wait_for(get_status(), timeout=8)
-            await interaction.followup.send(embed=_portal_embed(server_info=info), ephemeral=True)
+            snap = await asyncio.wait_for(get_snapshot(max_age=INTERACTIVE_MAX_AGE), timeout=8)
+            await interaction.followup.send(embed=_portal_embed(server_info=snap.as_dict(), health=rcon_health()), ephemeral=True)
         except Exception as e:
             await interaction.followup.send(f"Status error: `{e}`", ephemeral=True)
 
@@ -153,14 +182,8 @@ class PortalView(discord.ui.View):
     async def props_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
         await _ack(interaction)
         try:
-            text = await asyncio.wait_for(read_server_properties_text(), timeout=10)
-            d: dict[str, str] = {}
-            for line in text.splitlines():
-                if line.strip() and not line.strip().startswith("#") and "=" in line:
-                    k, v = line.split("=", 1)
-                    d[k.strip()] = v.strip()
-            keys = ("motd", "difficulty", "max-players", "online-mode", "server-port", "pvp", "view-distance")
-            subset = {k: d[k] for k in keys if k in d}
+            d = (await asyncio.wait_for(get_properties(), timeout=10)).values
+            subset = {k: d[k] for k in PROPS_SMALL_KEYS if k in d}
             snippet = "\n".join(f"{k}={v}" for k, v in list(d.items())[:12])
             emb = _portal_embed(props_small=subset)
             if snippet:
@@ -188,18 +211,23 @@ class PortalView(discord.ui.View):
     async def plugins_btn(self, interaction: discord.Interaction, _: discord.ui.Button):
         await _ack(interaction)
         try:
-            names = await asyncio.wait_for(list_plugins(), timeout=12)
-            folders = [n[:-1] for n in names if n.endswith("/")]
-            if not folders:
-                return await interaction.followup.send("No plugin folders found in `MC_PLUGINS_DIR`.", ephemeral=True)
-            shown = folders[:50]
-            more = len(folders) - len(shown)
-            block = "\n".join(shown)
-            desc = f"Found **{len(folders)}** plugin folder(s):\n```text\n{block}\n```"
+            plugins, folders = await asyncio.wait_for(plugin_inventory(), timeout=12)
+            if not plugins and not folders:
+                return await interaction.followup.send("No plugins found in `MC_PLUGINS_DIR`.", ephemeral=True)
+            rows = [p.label + (f"  (needs {', '.join(p.depend)})" if p.depend else "") for p in plugins]
+            # data folders are named after their plugin; only list the ones without a jar
+            names = {p.name.lower() for p in plugins if p.name}
+            others = [f for f in folders if f.lower() not in names]
+            shown = rows[:40]
+            more = len(rows) - len(shown)
+            block = "\n".join(shown) or "(no jars)"
+            desc = f"Found **{len(plugins)}** plugin jar(s):\n```text\n{block[:3500]}\n```"
             if more > 0:
                 desc += f"\n… and **{more} more**"
-            e = discord.Embed(title="📦 Plugins (folders)", description=desc, color=0x2b88d8)
-            e.set_footer(text="From MC_PLUGINS_DIR via SFTP")
+            if others:
+                desc += f"\nOther folders: {', '.join(others[:20])}"
+            e = discord.Embed(title="📦 Plugins", description=desc[:4096], color=0x2b88d8)
+            e.set_footer(text="From MC_PLUGINS_DIR via SFTP (plugin.yml)")
             await interaction.followup.send(embed=e, ephemeral=True)
         except asyncio.TimeoutError:
             await interaction.followup.send("SFTP error: timed out while listing plugins.", ephemeral=True)
@@ -208,13 +236,45 @@ class PortalView(discord.ui.View):
 
 # ------------------------------- Cog ---------------------------------
 
+def _render_hash(embed: discord.Embed, view: discord.ui.View) -> str:
+    """Fingerprint of what an edit would send; equal hashes mean the edit would change nothing."""
+    payload = json.dumps([embed.to_dict(), view.to_components()], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class PortalStore:
+    """Portal message id + last render hash in the `portalmessage` table; DB errors only cost a lookup."""
+
+    async def load(self, channel_id: int) -> tuple[int, str | None] | None:
+        try:
+            async with async_session_maker() as s:
+                row = (await s.execute(select(PortalMessage).where(PortalMessage.channel_id == channel_id))).scalar_one_or_none()
+        except Exception as e:
+            log.warning("[portal] loading portal message id failed: %s", e)
+            return None
+        return (int(row.message_id), row.content_hash) if row else None
+
+    async def save(self, channel_id: int, message_id: int, content_hash: str | None) -> None:
+        try:
+            async with async_session_maker() as s:
+                row = (await s.execute(select(PortalMessage).where(PortalMessage.channel_id == channel_id))).scalar_one_or_none()
+                if row is None:
+                    row = PortalMessage(channel_id=channel_id)
+                    s.add(row)
+                row.message_id, row.content_hash = message_id, content_hash
+                await s.commit()
+        except Exception as e:
+            log.warning("[portal] saving portal message id failed: %s", e)
+
 class PortalCog(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, store: PortalStore | None = None):
         self.bot = bot
+        self.store = store or PortalStore()
         self._portal_message_id: int | None = None
+        self._portal_hash: str | None = None
+        self._loaded = False
         self._props_small_cache: dict[str, str] | None = None
         self._auto_task: asyncio.Task | None = None
-        self._last_voice_name: str | None = None
+        self._stats = {"edits": 0, "posts": 0, "skipped": 0, "history_scans": 0, "errors": 0}
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -226,29 +286,27 @@ class PortalCog(commands.Cog):
 
     async def _ensure_properties_cache(self):
         with contextlib.suppress(Exception):
-            text = await asyncio.wait_for(read_server_properties_text(), timeout=10)
-            d: dict[str, str] = {}
-            for line in text.splitlines():
-                if line.strip() and not line.strip().startswith("#") and "=" in line:
-                    k, v = line.split("=", 1)
-                    d[k.strip()] = v.strip()
-            keys = ("motd", "difficulty", "max-players", "online-mode", "server-port", "pvp", "view-distance")
-            self._props_small_cache = {k: d[k] for k in keys if k in d}
-
-    async def _get_or_find_portal_message(self, ch: discord.TextChannel) -> discord.Message | None:
-        if self._portal_message_id:
-            with contextlib.suppress(Exception):
-                return await ch.fetch_message(self._portal_message_id)
-        existing = None
+            d = (await asyncio.wait_for(get_properties(), timeout=10)).values
+            self._props_small_cache = {k: d[k] for k in PROPS_SMALL_KEYS if k in d}
+
+    async def _find_portal_message_id(self, ch: discord.TextChannel) -> int | None:
+        """Stored id, else (first run / DB down) one history scan for a portal we posted earlier."""
+        if self._portal_message_id or self._loaded:
+            return self._portal_message_id
+        self._loaded = True
+        stored = await self.store.load(ch.id)
+        if stored:
+            self._portal_message_id, self._portal_hash = stored
+            return self._portal_message_id
+        self._stats["history_scans"] += 1
         async for m in ch.history(limit=50):
             if m.author == self.bot.user and m.embeds and (m.embeds[0].footer and m.embeds[0].footer.text == "GameOperator Portal"):
-                existing = m
+                self._portal_message_id = m.id
+                await self.store.save(ch.id, m.id, None)
                 break
-        if existing:
-            self._portal_message_id = existing.id
-        return existing
+        return self._portal_message_id
 
-    async def _post_or_update_portal(self, live_info: Optional[dict] = None):
+    async def _post_or_update_portal(self, live_info: Optional[dict] = None, force: bool = False):
         ch = self.bot.get_channel(PORTAL_CHANNEL_ID)
         if not isinstance(ch, discord.TextChannel):
             log.error("[portal] Channel %s not found or wrong type.", PORTAL_CHANNEL_ID)
@@ -256,54 +314,60 @@ class PortalCog(commands.Cog):
 
         info = live_info
         if info is None:
-            with contextlib.suppress(Exception):
-                info = await asyncio.wait_for(get_status(), timeout=8)
+            info = await _status_info(max_age=INTERACTIVE_MAX_AGE)
 
-        embed = _portal_embed(server_info=info, props_small=self._props_small_cache)
+        embed = _portal_embed(server_info=info, props_small=self._props_small_cache, health=rcon_health())
+        view = PortalView()
+        digest = _render_hash(embed, view)
 
-        msg = await self._get_or_find_portal_message(ch)
+        message_id = await self._find_portal_message_id(ch)
+        if message_id and digest == self._portal_hash and not force:
+            self._stats["skipped"] += 1
+            return
         try:
-            if msg:
-                await msg.edit(embed=embed, view=PortalView())
-                log.debug("[portal] Updated portal message: %s", msg.id)
-            else:
-                sent = await ch.send(embed=embed, view=PortalView())
-                self._portal_message_id = sent.id
+            if message_id:
+                try:
+                    # partial message: edit by id, no GET first
+                    await edit_message(ch.get_partial_message(message_id), embed=embed, view=view)
+                    self._stats["edits"] += 1
+                    log.debug("[portal] Updated portal message: %s", message_id)
+                except discord.NotFound:
+                    log.info("[portal] Portal message %s is gone; posting a new one.", message_id)
+                    message_id = None
+            if not message_id:
+                sent = await send_message(ch, embed=embed, view=view)
+                message_id = self._portal_message_id = sent.id
+                self._stats["posts"] += 1
                 log.info("[portal] Posted portal message: %s", sent.id)
+            self._portal_hash = digest
+            await self.store.save(ch.id, message_id, digest)
         except Exception:
+            self._stats["errors"] += 1
             log.exception("[portal] Failed to post/update portal message.")
 
+    def stats(self) -> dict:
+        return {"message_id": self._portal_message_id, **self._stats}
+
     async def _auto_refresh_loop(self):
         await self.bot.wait_until_ready()
         while not self.bot.is_closed():
             try:
-                info = None
-                with contextlib.suppress(Exception):
-                    info = await asyncio.wait_for(get_status(), timeout=8)
+                info = await _status_info(max_age=PORTAL_REFRESH_SECONDS, priority=Priority.BACKGROUND)
 
                 # Update portal embed with fresh player list
                 await self._post_or_update_portal(live_info=info)
-
-                # Optionally rename a voice channel with online count
-                if MC_STATUS_VOICE_CHANNEL_ID and info:
-                    ch = self.bot.get_channel(MC_STATUS_VOICE_CHANNEL_ID)
-                    if isinstance(ch, discord.VoiceChannel):
-                        new_name = f"MC Online: {info.get('online','?')}/{info.get('max','?')}"
-                        if new_name != self._last_voice_name:
-                            with contextlib.suppress(discord.Forbidden, discord.HTTPException):
-                                await ch.edit(name=new_name, reason="Auto status update")
-                                self._last_voice_name = new_name
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 log.debug("[portal] auto refresh error: %s", e)
-            await asyncio.sleep(max(15, PORTAL_REFRESH_SECONDS))
+            if await status_service.wait_changed(timeout=max(15, PORTAL_REFRESH_SECONDS)):
+                await asyncio.sleep(PORTAL_EVENT_DEBOUNCE_SECONDS)  # fold a burst of joins into one edit
 
     @app_commands.command(name="portal", description="Repost the portal here")
     async def portal(self, interaction: discord.Interaction):
         await _ack(interaction)
         await self._ensure_properties_cache()
-        await self._post_or_update_portal()
+        await self._post_or_update_portal(force=True)
         await interaction.followup.send("Portal posted/updated.", ephemeral=True)
 
 async def setup(bot: commands.Bot):
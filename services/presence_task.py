@@ -1,39 +1,164 @@
 # services/presence_task.py
+"""
+Publishes the player count to Discord: the bot's activity and the status voice channels
+(DISCORD_VOICE_CHANNEL_ID and, if set, MC_STATUS_VOICE_CHANNEL_ID).
+
+Every tick computes the desired state and sends only what differs from what was last
+published. Bursts of joins/leaves are debounced into one update. Channel renames are
+limited by Discord to 2 per 10 minutes per channel; the publisher keeps that budget itself
+and, when it is used up, holds only the newest name until the budget frees instead of
+letting discord.py queue stale renames behind the rate limiter for minutes.
+"""
+from __future__ import annotations
 import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable
+
 import discord
+
+from services.status_service import get_snapshot, status_service
 from utils.config import settings
-from utils.rcon_client import get_status
+from utils.discord_scheduler import rename_channel
+from utils.scheduling import Priority
 
-def setup_presence_tasks(bot):
-    async def updater():
-        await bot.wait_until_ready()
-        vc_id = settings.DISCORD_VOICE_CHANNEL_ID
-        server_name = settings.MC_SERVER_NAME  # <— new
+log = logging.getLogger(__name__)
+
+
+class RenameBudget:
+    """Sliding window of renames per channel: at most `limit` in any `window` seconds."""
+
+    def __init__(self, limit: int = 2, window: float = 600.0, clock: Callable[[], float] = time.monotonic):
+        self.limit = max(1, limit)
+        self.window = window
+        self._clock = clock
+        self._used: dict[int, deque[float]] = {}
+
+    def _prune(self, channel_id: int) -> deque[float]:
+        used = self._used.setdefault(channel_id, deque())
+        cutoff = self._clock() - self.window
+        while used and used[0] <= cutoff:
+            used.popleft()
+        return used
+
+    def available(self, channel_id: int) -> bool:
+        return len(self._prune(channel_id)) < self.limit
+
+    def wait_time(self, channel_id: int) -> float:
+        used = self._prune(channel_id)
+        return 0.0 if len(used) < self.limit else used[0] + self.window - self._clock()
+
+    def spend(self, channel_id: int) -> None:
+        self._prune(channel_id).append(self._clock())
+
+
+class PresencePublisher:
+    def __init__(self, bot, channels: dict[int, str], *, budget: RenameBudget | None = None,
+                 debounce: float = 3.0):
+        """`channels` maps a voice channel id to its name format (`{server}`, `{online}`, `{max}`)."""
+        self.bot = bot
+        self.channels = {cid: fmt for cid, fmt in channels.items() if cid}
+        self.budget = budget or RenameBudget()
+        self.debounce = debounce
+        self._activity: str | None = None  # last published activity text
+        self._names: dict[int, str] = {}  # last published name per channel
+        self._pending: dict[int, str] = {}  # newest name waiting for rename budget
+        self._stats = {"presence_sent": 0, "presence_skipped": 0, "renames_sent": 0, "renames_skipped": 0,
+                       "renames_deferred": 0, "renames_superseded": 0, "errors": 0}
 
-        while not bot.is_closed():
+    def desired(self, status: dict) -> tuple[str, dict[int, str]]:
+        values = {"server": settings.MC_SERVER_NAME, "online": status.get("online", "?"), "max": status.get("max", "?")}
+        names = {cid: fmt.format(**values)[:100] for cid, fmt in self.channels.items()}  # 100 = Discord name limit
+        return f"{values['online']} players", names
+
+    async def publish(self, status: dict) -> None:
+        activity, names = self.desired(status)
+        if activity == self._activity:
+            self._stats["presence_skipped"] += 1
+        else:
             try:
-                status = await get_status()  # {"online": int, "max": int, ...}
-                # Desired format: "<server name> X/X"
-                target_name = f"{server_name} {status['online']}/{status['max']}"
-
-                vc = bot.get_channel(vc_id)
-                if isinstance(vc, discord.VoiceChannel):
-                    # Discord channel names have a 100-char limit; be safe:
-                    safe_name = target_name[:100]
-                    if vc.name != safe_name:
-                        await vc.edit(name=safe_name)
-
-                # Optional: also set bot presence to show just X players
-                act = discord.Activity(
-                    type=discord.ActivityType.watching,
-                    name=f"{status['online']} players"
-                )
-                await bot.change_presence(activity=act)
-
-            except Exception:
-                # swallow errors; next tick will retry
-                pass
-
-            await asyncio.sleep(settings.POLL_INTERVAL_SECONDS)
-
-    bot.loop.create_task(updater())
+                await self.bot.change_presence(activity=discord.Activity(type=discord.ActivityType.watching,
+                                                                         name=activity))
+                self._activity = activity
+                self._stats["presence_sent"] += 1
+            except Exception as e:
+                self._stats["errors"] += 1
+                log.debug("[presence] change_presence failed: %s", e)
+        for cid, name in names.items():
+            await self._rename(cid, name)
+
+    async def _rename(self, channel_id: int, name: str) -> None:
+        vc = self.bot.get_channel(channel_id)
+        if vc is None:
+            return
+        published = self._names.setdefault(channel_id, vc.name)
+        if name == published:
+            if self._pending.pop(channel_id, None) is not None:
+                self._stats["renames_superseded"] += 1  # changed back before the budget freed
+            self._stats["renames_skipped"] += 1
+            return
+        if not self.budget.available(channel_id):
+            previous = self._pending.get(channel_id)
+            if previous != name:
+                self._stats["renames_superseded" if previous else "renames_deferred"] += 1
+            self._pending[channel_id] = name
+            return
+        self._pending.pop(channel_id, None)
+        self.budget.spend(channel_id)
+        try:
+            await rename_channel(vc, name)
+            self._names[channel_id] = name
+            self._stats["renames_sent"] += 1
+        except (discord.HTTPException, discord.RateLimited) as e:
+            self._stats["errors"] += 1
+            log.warning("[presence] renaming channel %s failed: %s", channel_id, e)
+
+    def next_due(self) -> float | None:
+        """Seconds until a held rename can go out, if any is waiting."""
+        if not self._pending:
+            return None
+        return max(0.0, min(self.budget.wait_time(cid) for cid in self._pending))
+
+    async def run(self, poll: float) -> None:
+        await self.bot.wait_until_ready()
+        while not self.bot.is_closed():
+            try:
+                # shared snapshot; the status poller keeps it fresh, so this is usually free
+                status = (await get_snapshot(max_age=poll, priority=Priority.BACKGROUND)).as_dict()
+                await self.publish(status)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.debug("[presence] update failed: %s", e)
+            timeout = poll
+            if (due := self.next_due()) is not None:
+                timeout = min(timeout, due + 0.5)
+            # join/leave from the log wake us right away; then let the burst settle
+            if await status_service.wait_changed(timeout=timeout):
+                await asyncio.sleep(self.debounce)
+
+    def stats(self) -> dict:
+        return {"pending_renames": dict(self._pending), **self._stats}
+
+
+_publisher: PresencePublisher | None = None
+
+
+def presence_stats() -> dict | None:
+    return _publisher.stats() if _publisher else None
+
+
+def setup_presence_tasks(bot):
+    global _publisher
+    channels = {int(settings.DISCORD_VOICE_CHANNEL_ID or 0): "{server} {online}/{max}"}
+    status_vc = int(getattr(settings, "MC_STATUS_VOICE_CHANNEL_ID", 0) or 0)
+    channels.setdefault(status_vc, "MC Online: {online}/{max}")
+    _publisher = PresencePublisher(
+        bot,
+        channels,
+        budget=RenameBudget(int(getattr(settings, "CHANNEL_RENAME_LIMIT", 2)),
+                            float(getattr(settings, "CHANNEL_RENAME_WINDOW_SECONDS", 600))),
+        debounce=float(getattr(settings, "PRESENCE_DEBOUNCE_SECONDS", 3)),
+    )
+    bot.loop.create_task(_publisher.run(float(settings.POLL_INTERVAL_SECONDS)))
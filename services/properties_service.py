@@ -0,0 +1,169 @@
+# services/properties_service.py
+"""
+server.properties over SFTP, parsed once and kept until the file changes.
+
+Every read starts with a `stat`; the cached parse is reused while size and mtime match.
+Edits only rewrite the lines whose value changes (comments, order and unknown lines are
+kept), are skipped when nothing changes, and are written to a temp file that replaces the
+original only if the original still has the size/mtime we read, so two admins editing at
+the same time get a conflict instead of silently losing one of the edits.
+"""
+from __future__ import annotations
+import asyncio
+import contextlib
+import logging
+import posixpath
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from exceptions import PropertiesConflict
+from utils.config import settings
+from utils.sftp_client import MTIME_SETTLE_SECONDS, SftpTarget, default_target, replace_file, sftp_conn
+
+log = logging.getLogger(__name__)
+
+Stamp = tuple[int, int]  # (size, mtime) as reported by stat
+
+
+@dataclass
+class PropertiesDoc:
+    lines: list[str]  # the file as read, comments and blank lines included
+    values: dict[str, str]  # key -> value, in file order
+    index: dict[str, int] = field(default_factory=dict)  # key -> line number of its last definition
+    newline: str = "\n"
+    encoding: str = "utf-8"
+
+    @property
+    def comments(self) -> list[str]:
+        return [line for line in self.lines if line.lstrip().startswith(("#", "!"))]
+
+    def get(self, key: str, default: str | None = None) -> str | None:
+        return self.values.get(key, default)
+
+    def diff(self, changes: dict[str, str]) -> dict[str, tuple[str | None, str]]:
+        """key -> (old value or None if new, new value) for the changes that change something."""
+        return {k: (self.values.get(k), v) for k, v in changes.items() if self.values.get(k) != v}
+
+    def render(self, changes: dict[str, str]) -> str:
+        lines = list(self.lines)
+        for k, v in changes.items():
+            if k in self.index:
+                lines[self.index[k]] = f"{k}={v}"
+            else:
+                lines.append(f"{k}={v}")
+        return self.newline.join(lines) + self.newline
+
+
+def parse_properties(text: str, encoding: str = "utf-8") -> PropertiesDoc:
+    lines = text.splitlines()
+    values: dict[str, str] = {}
+    index: dict[str, int] = {}
+    for i, line in enumerate(lines):
+        s = line.strip()
+        if not s or s.startswith(("#", "!")) or "=" not in s:
+            continue
+        k, v = s.split("=", 1)
+        values[k.strip()] = v.strip()
+        index[k.strip()] = i
+    return PropertiesDoc(lines, values, index, "\r\n" if "\r\n" in text else "\n", encoding)
+
+
+def _decode(data: bytes) -> tuple[str, str]:
+    # Minecraft writes UTF-8 but still reads ISO-8859-1 files, so keep whichever we got
+    try:
+        return data.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError:
+        return data.decode("latin-1"), "latin-1"
+
+
+def _stamp(attrs) -> Stamp:
+    return int(attrs.size or 0), int(attrs.mtime or 0)
+
+
+class PropertiesService:
+    """Parsed server.properties per (target, path), revalidated with one `stat` per use."""
+
+    def __init__(self):
+        self._cache: dict[tuple[SftpTarget, str], tuple[Stamp, PropertiesDoc]] = {}
+        self._locks: dict[tuple[SftpTarget, str], asyncio.Lock] = {}
+        self._stats = {"hits": 0, "reads": 0, "writes": 0, "unchanged": 0, "conflicts": 0}
+
+    async def get(self, path: str | None = None, target: SftpTarget | None = None) -> PropertiesDoc:
+        path = path or settings.MC_PROPERTIES_PATH
+        async with sftp_conn(target) as sftp:
+            _, doc = await self._load(sftp, (target or default_target(), path))
+        return doc
+
+    async def edit(self, changes: dict[str, str], path: str | None = None,
+                   target: SftpTarget | None = None) -> dict[str, tuple[str | None, str]]:
+        """Apply `changes`; returns what actually changed (empty if the file was left alone)."""
+        path = path or settings.MC_PROPERTIES_PATH
+        key = (target or default_target(), path)
+        async with self._locks.setdefault(key, asyncio.Lock()), sftp_conn(target) as sftp:
+            stamp, doc = await self._load(sftp, key)
+            diff = doc.diff(changes)
+            if not diff:
+                self._stats["unchanged"] += 1
+                return {}
+            data = doc.render({k: new for k, (_, new) in diff.items()}).encode(doc.encoding)
+            tmp = f"{posixpath.dirname(path) or '.'}/.{posixpath.basename(path)}.{uuid.uuid4().hex[:8]}.tmp"
+            try:
+                await self._write_temp(sftp, tmp, data, path)
+                # optimistic concurrency: only replace the version our diff was made against
+                if _stamp(await sftp.stat(path)) != stamp:
+                    self._stats["conflicts"] += 1
+                    raise PropertiesConflict(f"{path} was changed by someone else; nothing was written")
+                await replace_file(sftp, tmp, path)
+            except BaseException:
+                self._cache.pop(key, None)
+                with contextlib.suppress(Exception):
+                    await sftp.remove(tmp)
+                raise
+            self._stats["writes"] += 1
+            self._remember(key, _stamp(await sftp.stat(path)), parse_properties(data.decode(doc.encoding), doc.encoding))
+        log.info("[properties] %s: changed %s", path, ", ".join(diff))
+        return diff
+
+    async def _load(self, sftp, key: tuple[SftpTarget, str]) -> tuple[Stamp, PropertiesDoc]:
+        path = key[1]
+        stamp = _stamp(await sftp.stat(path))
+        cached = self._cache.get(key)
+        if cached and cached[0] == stamp:
+            self._stats["hits"] += 1
+            return cached
+        async with (await sftp.open(path, "rb")) as f:
+            data = await f.read()
+        self._stats["reads"] += 1
+        doc = parse_properties(*_decode(data))
+        self._remember(key, stamp, doc)
+        return stamp, doc
+
+    def _remember(self, key: tuple[SftpTarget, str], stamp: Stamp, doc: PropertiesDoc) -> None:
+        # a write later in the same second can keep the size and mtime; only cache settled files
+        if time.time() - stamp[1] >= MTIME_SETTLE_SECONDS:
+            self._cache[key] = (stamp, doc)
+        else:
+            self._cache.pop(key, None)
+
+    async def _write_temp(self, sftp, tmp: str, data: bytes, like: str) -> None:
+        async with (await sftp.open(tmp, "wb")) as f:
+            await f.write(data)
+        perms = (await sftp.stat(like)).permissions
+        if perms is not None:
+            await sftp.chmod(tmp, perms & 0o7777)
+
+    def stats(self) -> dict:
+        return {"cached": len(self._cache), **self._stats}
+
+
+properties_service = PropertiesService()
+
+
+async def get_properties(path: str | None = None, target: SftpTarget | None = None) -> PropertiesDoc:
+    return await properties_service.get(path, target)
+
+
+async def edit_properties(changes: dict[str, str], path: str | None = None,
+                          target: SftpTarget | None = None) -> dict[str, tuple[str | None, str]]:
+    return await properties_service.edit(changes, path, target)
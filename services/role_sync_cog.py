@@ -8,8 +8,9 @@ from discord import app_commands
 from discord.ext import commands, tasks
 
 from utils.permissions import guild_only
-from db.models_game import AccountLink
+from models.models_game import AccountLink
 from utils.db import async_session_maker
+from utils.discord_scheduler import guild_call
 
 log = logging.getLogger(__name__)
 
@@ -55,7 +56,8 @@ class RoleSyncCog(commands.Cog):
             role = discord.utils.get(guild.roles, name=desired_role_name)
             if not role:
                 try:
-                    role = await guild.create_role(name=desired_role_name, mentionable=False)
+                    role = await guild_call(guild.id, lambda: guild.create_role(name=desired_role_name, mentionable=False),
+                                            key=f"create_role:{desired_role_name}")
                 except discord.Forbidden:
                     log.warning("Cannot create role %s", desired_role_name)
                     continue
@@ -63,9 +65,9 @@ class RoleSyncCog(commands.Cog):
             to_remove = [r for r in member.roles if r.name.startswith("Rank:") and r != role]
             try:
                 if role not in member.roles:
-                    await member.add_roles(role, reason="Rank sync")
+                    await guild_call(guild.id, lambda: member.add_roles(role, reason="Rank sync"))
                 if to_remove:
-                    await member.remove_roles(*to_remove, reason="Rank cleanup")
+                    await guild_call(guild.id, lambda: member.remove_roles(*to_remove, reason="Rank cleanup"))
             except discord.Forbidden:
                 log.warning("Missing perms to edit roles for %s", member)
 
@@ -0,0 +1,151 @@
+# services/server_registry.py
+from __future__ import annotations
+import asyncio
+import functools
+import logging
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.exc import InterfaceError, OperationalError, ProgrammingError
+
+from exceptions import UnknownServer
+from models.server import Server
+from services.status_service import StatusService, status_service
+from utils.config import settings
+from utils.db import async_session_maker
+from utils.rcon_client import CmdResult, RconPool, get_pool, get_status
+from utils.scheduling import Priority
+from utils.sftp_client import SftpTarget, default_target
+
+log = logging.getLogger(__name__)
+
+ALL_SERVERS = "all"  # pseudo server name: fan a command out to every server
+
+
+@dataclass
+class ManagedServer:
+    name: str
+    rcon: RconPool
+    sftp: SftpTarget
+    status: StatusService
+    properties_path: str
+    plugins_dir: str
+    is_default: bool = False
+
+
+def _key(name: str) -> str:
+    return name.strip().lower()
+
+
+def _default_server() -> ManagedServer:
+    """The server configured through MC_RCON_* / SFTP_* env; shares the module-level pool and status."""
+    return ManagedServer(
+        name=settings.MC_SERVER_NAME,
+        rcon=get_pool(),
+        sftp=default_target(),
+        status=status_service,
+        properties_path=settings.MC_PROPERTIES_PATH,
+        plugins_dir=settings.MC_PLUGINS_DIR,
+        is_default=True,
+    )
+
+
+def _from_row(row: Server) -> ManagedServer:
+    pool = RconPool(row.rcon_host, row.rcon_port, row.rcon_password or settings.MC_RCON_PASSWORD)
+    base = (row.server_dir or "").rstrip("/")
+    return ManagedServer(
+        name=row.name,
+        rcon=pool,
+        sftp=SftpTarget(row.sftp_host, row.sftp_port, row.sftp_user, row.sftp_password or settings.SFTP_PASSWORD),
+        status=StatusService(fetch=functools.partial(get_status, pool=pool)),
+        properties_path=f"{base}/server.properties" if base else settings.MC_PROPERTIES_PATH,
+        plugins_dir=f"{base}/plugins" if base else settings.MC_PLUGINS_DIR,
+    )
+
+
+class ServerRegistry:
+    """
+    Every Minecraft server the bot manages, by name.
+
+    The env-configured server is always present and is the default target; active rows of
+    the `server` table add more (a row pointing at the same RCON host:port is skipped).
+    """
+
+    def __init__(self):
+        default = _default_server()
+        self._default = default
+        self._servers: dict[str, ManagedServer] = {_key(default.name): default}
+        self._pollers: list[asyncio.Task] = []
+
+    async def load(self) -> None:
+        try:
+            async with async_session_maker() as s:
+                rows = list((await s.execute(select(Server).where(Server.is_active.is_(True)).order_by(Server.id))).scalars())
+        except ProgrammingError as e:  # e.g. UndefinedColumn: the table predates this code
+            log.error("[servers] server table does not match the model (%s); multi-server mode is OFF "
+                      "until the schema is fixed", e)
+            return
+        except (OperationalError, InterfaceError, OSError) as e:
+            log.warning("[servers] database unreachable (%s); using env server only", e)
+            return
+        servers = {_key(self._default.name): self._default}
+        for row in rows:
+            if (row.rcon_host, row.rcon_port) == (self._default.rcon.host, self._default.rcon.port):
+                continue
+            if _key(row.name) in servers or _key(row.name) == ALL_SERVERS:
+                log.warning("[servers] duplicate/reserved server name %r (id=%s) skipped", row.name, row.id)
+                continue
+            servers[_key(row.name)] = _from_row(row)
+        for old_key, old in self._servers.items():
+            if old_key not in servers and not old.is_default:
+                await old.rcon.close()
+        self._servers = servers
+        log.info("[servers] managing: %s", ", ".join(m.name for m in servers.values()))
+
+    def names(self) -> list[str]:
+        return [m.name for m in self._servers.values()]
+
+    def all(self) -> list[ManagedServer]:
+        return list(self._servers.values())
+
+    def get(self, name: str | None = None) -> ManagedServer:
+        if not name:
+            return self._default
+        try:
+            return self._servers[_key(name)]
+        except KeyError:
+            raise UnknownServer(f"Unknown server '{name}'. Known: {', '.join(self.names())}") from None
+
+    async def fan_out(self, cmd: str, priority: Priority = Priority.USER) -> dict[str, CmdResult]:
+        """Run `cmd` on every server in parallel; one result per server name."""
+        servers = self.all()
+        results = await asyncio.gather(*[m.rcon.run_many([cmd], priority=priority) for m in servers])
+        return {m.name: r[0] for m, r in zip(servers, results)}
+
+    def start_pollers(self, bot) -> None:
+        for task in self._pollers:
+            task.cancel()
+
+        async def runner(m: ManagedServer):
+            await bot.wait_until_ready()
+            await m.status.run_poller(bot.is_closed)
+
+        self._pollers = [bot.loop.create_task(runner(m)) for m in self.all()]
+
+    async def close(self) -> None:
+        for task in self._pollers:
+            task.cancel()
+        for m in self.all():
+            if not m.is_default:  # the default pool belongs to rcon_client.close_pool()
+                await m.rcon.close()
+
+    def stats(self) -> dict:
+        return {m.name: {"rcon": m.rcon.stats(), "status": m.status.stats()} for m in self.all()}
+
+
+registry = ServerRegistry()
+
+
+async def setup_server_registry(bot) -> None:
+    await registry.load()
+    registry.start_pollers(bot)
@@ -0,0 +1,105 @@
+# services/stats_buffer.py
+"""
+Write-behind buffer for incremental player stats ("kills +1" as it happens).
+
+Increments are summed in memory per player and written every `flush_every` seconds, or as
+soon as `max_players` players have pending increments, as one multi-row
+`INSERT … ON CONFLICT (player) DO UPDATE SET kills = kills + excluded.kills` upsert. A failed
+write puts the increments back so nothing is lost; `close()` (from main.on_shutdown) writes
+whatever is still pending.
+"""
+from __future__ import annotations
+import asyncio
+import contextlib
+import logging
+from typing import Awaitable, Callable
+
+from models.models_game import PlayerStats
+from services.leaderboard import leaderboard
+from utils.config import settings
+from utils.db import async_session_maker
+
+log = logging.getLogger(__name__)
+
+
+async def _write(rows: list[dict]) -> None:
+    async with async_session_maker() as s:
+        stored = await PlayerStats.bulk_increment(s, rows)
+    leaderboard.update(stored)
+
+
+class StatsDeltaBuffer:
+    def __init__(self, *, flush_every: float = 10.0, max_players: int = 500,
+                 write: Callable[[list[dict]], Awaitable[None]] = _write):
+        self.flush_every = flush_every
+        self.max_players = max(1, max_players)
+        self._write = write
+        self._pending: dict[str, list[float]] = {}  # player -> [kills, deaths, playtime_hours]
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._early: asyncio.Task | None = None
+        self._stats = {"increments": 0, "flushes": 0, "rows_written": 0, "errors": 0}
+
+    def add(self, player: str, kills: int = 0, deaths: int = 0, playtime: float = 0.0) -> None:
+        acc = self._pending.setdefault(player, [0, 0, 0.0])
+        acc[0] += kills
+        acc[1] += deaths
+        acc[2] += playtime
+        self._stats["increments"] += 1
+        if len(self._pending) >= self.max_players and (self._early is None or self._early.done()):
+            self._early = asyncio.create_task(self.flush())
+
+    def _merge_back(self, batch: dict[str, list[float]]) -> None:
+        for player, (k, d, p) in batch.items():
+            acc = self._pending.setdefault(player, [0, 0, 0.0])
+            acc[0] += k
+            acc[1] += d
+            acc[2] += p
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            rows = [{"player": p, "kills": int(k), "deaths": int(d), "playtime_hours": float(t)}
+                    for p, (k, d, t) in batch.items()]
+            try:
+                await self._write(rows)
+            except asyncio.CancelledError:
+                self._merge_back(batch)  # cancelled mid-write (e.g. loop shutdown): keep them for close()
+                raise
+            except Exception as e:
+                self._merge_back(batch)  # increments that arrived meanwhile are added on top
+                self._stats["errors"] += 1
+                log.warning("[stats] writing %d buffered player increment(s) failed: %s", len(rows), e)
+                return
+            self._stats["flushes"] += 1
+            self._stats["rows_written"] += len(rows)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_every)
+            # shielded: stopping the timer never interrupts a write that is already on the wire
+            await asyncio.shield(self.flush())
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def close(self) -> None:
+        """Stop the timer and write everything still buffered."""
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()  # waits for an in-flight flush (the lock), then writes the rest
+
+    def stats(self) -> dict:
+        return {"pending_players": len(self._pending), **self._stats}
+
+
+stats_buffer = StatsDeltaBuffer(
+    flush_every=float(getattr(settings, "STATS_FLUSH_SECONDS", 10)),
+    max_players=int(getattr(settings, "STATS_FLUSH_MAX_PLAYERS", 500)),
+)
@@ -6,7 +6,8 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from db.models_game import PlayerStats
+from models.models_game import STAT_FIELDS, PlayerStats
+from services.leaderboard import leaderboard as top_players
 from utils.db import async_session_maker
 
 log = logging.getLogger(__name__)
@@ -30,23 +31,22 @@ class StatsCog(commands.Cog):
         await interaction.response.send_message(embed=e)
 
     @app_commands.command(name="leaderboard", description="Top players")
-    @app_commands.describe(metric="Which metric to rank by")
-    async def leaderboard(self, interaction: discord.Interaction, metric: discord.app_commands.Choice[str]):
+    @app_commands.describe(metric="Which metric to rank by", page="Page number (starts at 1)", size="Players per page (max 25)")
+    @app_commands.choices(metric=[app_commands.Choice(name=m, value=m) for m in STAT_FIELDS])
+    async def leaderboard(self, interaction: discord.Interaction, metric: app_commands.Choice[str],
+                          page: app_commands.Range[int, 1, 1000] = 1, size: app_commands.Range[int, 1, 25] = 10):
         metric_key = metric.value
-        async with async_session_maker() as s:
-            rows = await PlayerStats.top(s, metric_key, limit=10)
-        lines = [f"**#{i+1}** {r.player}: {getattr(r, metric_key)}" for i, r in enumerate(rows)]
+        offset = (page - 1) * size
+        try:
+            rows = await top_players.page(metric_key, offset, size)  # from memory unless past the tracked top K
+        except Exception as e:
+            log.warning("[leaderboard] read failed: %s", e)
+            return await interaction.response.send_message("Leaderboard is unavailable right now.", ephemeral=True)
+        fmt = (lambda v: f"{v:.1f}") if metric_key == "playtime_hours" else (lambda v: f"{int(v)}")
+        lines = [f"**#{offset + i + 1}** {discord.utils.escape_markdown(p)}: {fmt(v)}" for i, (p, v) in enumerate(rows)]
         embed = discord.Embed(title=f"Leaderboard – {metric_key}", description="\n".join(lines) or "No data", color=0x7289DA)
+        embed.set_footer(text=f"Page {page}")
         await interaction.response.send_message(embed=embed)
 
-    @leaderboard.autocomplete("metric")
-    async def _lb_metric_ac(self, interaction: discord.Interaction, current: str):
-        options = [
-            app_commands.Choice(name="kills", value="kills"),
-            app_commands.Choice(name="deaths", value="deaths"),
-            app_commands.Choice(name="playtime_hours", value="playtime_hours"),
-        ]
-        return [o for o in options if current.lower() in o.name.lower()][:5]
-
 async def setup(bot):
     await bot.add_cog(StatsCog(bot))
\ No newline at end of file
@@ -0,0 +1,175 @@
+# services/status_service.py
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, replace
+from typing import Callable
+
+from services.game_events import JOIN, LEAVE, SERVER_START, SERVER_STOP, EventBus, GameEvent
+from utils.config import settings
+from utils.rcon_client import get_status
+from utils.scheduling import Priority
+
+log = logging.getLogger(__name__)
+
+POLL_SECONDS = max(1.0, float(getattr(settings, "POLL_INTERVAL_SECONDS", 15)))
+INTERACTIVE_MAX_AGE = float(getattr(settings, "STATUS_INTERACTIVE_MAX_AGE_SECONDS", 5))
+# with the log feed live, join/leave keep the player list current and `list` only reconciles
+RECONCILE_SECONDS = max(POLL_SECONDS, float(getattr(settings, "STATUS_RECONCILE_SECONDS", 300)))
+
+
+@dataclass(frozen=True)
+class StatusSnapshot:
+    online: int
+    max: int
+    players: tuple[str, ...]
+    fetched_at: float  # time.time() of the `list` reply
+    raw: str = ""
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.fetched_at)
+
+    def as_dict(self) -> dict:
+        """Same shape as `rcon_client.get_status()` so embeds/presence can take either."""
+        return {"raw": self.raw, "online": self.online, "max": self.max, "players": list(self.players)}
+
+
+class StatusService:
+    """
+    One cached `list` result shared by every reader.
+
+    Concurrent refreshes are coalesced into a single RCON call, and each caller says how
+    stale a snapshot it is willing to accept via `get(max_age=...)`.
+
+    Once `follow()`ed to the log event bus, join/leave/start/stop events patch the snapshot
+    as they happen; while the log feed is live the snapshot counts as fresh for up to
+    `reconcile_seconds` and the poller only runs `list` that often to correct any drift.
+    """
+
+    def __init__(self, fetch=get_status, poll_seconds: float = POLL_SECONDS,
+                 reconcile_seconds: float = RECONCILE_SECONDS):
+        self._fetch_status = fetch
+        self.poll_seconds = poll_seconds
+        self.reconcile_seconds = reconcile_seconds
+        self._snapshot: StatusSnapshot | None = None
+        self._inflight: asyncio.Task | None = None
+        self._last_error: str | None = None
+        self._feed_live: Callable[[], bool] = lambda: False
+        self._changed = asyncio.Event()
+        self._stats = {"hits": 0, "refreshes": 0, "coalesced": 0, "errors": 0, "events": 0}
+
+    @property
+    def live(self) -> bool:
+        """True while log events are keeping the snapshot up to date."""
+        return self._feed_live()
+
+    def peek(self) -> StatusSnapshot | None:
+        """Last good snapshot without any I/O (may be None or stale)."""
+        return self._snapshot
+
+    async def get(self, max_age: float = INTERACTIVE_MAX_AGE, priority: Priority = Priority.USER) -> StatusSnapshot:
+        snap = self._snapshot
+        if snap is not None and snap.age <= max(max_age, self.reconcile_seconds if self.live else 0):
+            self._stats["hits"] += 1
+            return snap
+        return await self.refresh(priority)
+
+    async def refresh(self, priority: Priority = Priority.USER) -> StatusSnapshot:
+        task = self._inflight
+        if task is None or task.done():
+            task = self._inflight = asyncio.create_task(self._fetch(priority))
+            # retrieve the exception even if every waiter was cancelled meanwhile
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        else:
+            self._stats["coalesced"] += 1
+        # shield: a caller timing out must not cancel the fetch other callers are waiting on
+        return await asyncio.shield(task)
+
+    async def _fetch(self, priority: Priority) -> StatusSnapshot:
+        self._stats["refreshes"] += 1
+        try:
+            st = await self._fetch_status(priority=priority)
+        except Exception as e:
+            self._stats["errors"] += 1
+            self._last_error = str(e) or type(e).__name__
+            raise
+        self._last_error = None
+        snap = StatusSnapshot(
+            online=int(st.get("online", 0)),
+            max=int(st.get("max", 0)),
+            players=tuple(st.get("players") or ()),
+            fetched_at=time.time(),
+            raw=st.get("raw", ""),
+        )
+        self._set(snap)
+        return snap
+
+    def _set(self, snap: StatusSnapshot) -> None:
+        old, self._snapshot = self._snapshot, snap
+        if old is None or (old.online, old.max, old.players) != (snap.online, snap.max, snap.players):
+            self._changed.set()
+            self._changed = asyncio.Event()  # waiters hold the old (now set) event
+
+    async def wait_changed(self, timeout: float) -> bool:
+        """Sleep until the player list/count changes or `timeout` passes; True if it changed."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    # ---- log events ----
+
+    def follow(self, bus: EventBus, feed_live: Callable[[], bool]) -> None:
+        """Patch the snapshot from `bus` events; `feed_live()` says whether the log is being read."""
+        self._feed_live = feed_live
+        bus.subscribe(self.apply_event, JOIN, LEAVE, SERVER_START, SERVER_STOP)
+
+    def apply_event(self, event: GameEvent) -> None:
+        snap = self._snapshot
+        if snap is None:
+            return  # nothing to patch yet; the first poll provides the baseline
+        self._stats["events"] += 1
+        players = snap.players
+        if event.kind == JOIN and event.player not in players:
+            players = (*players, event.player)
+            self._set(replace(snap, online=snap.online + 1, players=players))
+        elif event.kind == LEAVE and event.player in players:
+            self._set(replace(snap, online=max(0, snap.online - 1), players=tuple(p for p in players if p != event.player)))
+        elif event.kind in (SERVER_START, SERVER_STOP):
+            self._set(replace(snap, online=0, players=()))
+
+    async def run_poller(self, is_closed) -> None:
+        while not is_closed():
+            try:
+                await self.refresh(Priority.BACKGROUND)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.debug("[status] poll failed: %s", e)
+            waited = 0.0
+            # re-check every poll interval so a feed that goes down is noticed promptly
+            while waited < (self.reconcile_seconds if self.live else self.poll_seconds):
+                await asyncio.sleep(self.poll_seconds)
+                waited += self.poll_seconds
+
+    def stats(self) -> dict:
+        snap = self._snapshot
+        return {
+            "age_s": round(snap.age, 1) if snap else None,
+            "online": snap.online if snap else None,
+            "last_error": self._last_error,
+            "live": self.live,
+            **self._stats,
+        }
+
+
+status_service = StatusService()
+
+
+async def get_snapshot(max_age: float = INTERACTIVE_MAX_AGE, priority: Priority = Priority.USER,
+                       service: StatusService | None = None) -> StatusSnapshot:
+    return await (service or status_service).get(max_age=max_age, priority=priority)
+
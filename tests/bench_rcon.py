@@ -0,0 +1,138 @@
+# tests/bench_rcon.py
+"""
+RCON throughput/latency benchmark against the in-process FakeRconServer.
+
+    python -m tests.bench_rcon                              # all scenarios, 1..500 callers
+    python -m tests.bench_rcon -c 1,50 -s mc_cmd --latency 0.005
+
+Each row is one (scenario, concurrency) run on a fresh pool: `callers` tasks each make
+`--calls` calls. "cmds/s" counts RCON commands (a batch of 5 counts 5), latency is per call,
+"conns" is how many sockets the server accepted and "peak" how many were open at once.
+Needs the usual settings env (.env) because it imports the real client modules.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import functools
+import time
+
+from exceptions import RconError
+from services.status_service import StatusService
+from tests.fake_rcon import FakeRconServer
+from utils.config import settings
+from utils.rcon_client import RconPool, get_status, mc_cmd, mc_cmd_many
+from utils.rcon_scheduler import RconScheduler
+from utils.scheduling import Priority
+
+BATCH = ["echo a", "echo b", "echo c", "echo d", "echo e"]
+DEFAULT_CONCURRENCY = (1, 10, 50, 100, 500)
+SCENARIOS = ("mc_cmd", "get_status", "snapshot", "batch5")
+
+
+def _pct(sorted_vals: list[float], p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(p * len(sorted_vals)))]
+
+
+def _scenarios(pool: RconPool) -> dict:
+    """name -> (coroutine factory, RCON commands per call)"""
+    status = StatusService(fetch=functools.partial(get_status, pool=pool))
+    return {
+        "mc_cmd": (lambda: mc_cmd("echo hi", pool=pool), 1),
+        "get_status": (lambda: get_status(Priority.USER, pool=pool), 1),
+        "snapshot": (lambda: status.get(max_age=0.05), 1),  # coalesced get_status
+        "batch5": (lambda: mc_cmd_many(BATCH, pool=pool), len(BATCH)),
+    }
+
+
+async def bench_one(srv: FakeRconServer, scenario: str, callers: int, calls: int, *,
+                    prod_limits: bool = False) -> dict:
+    limits = {p: 10**9 for p in Priority}
+    if prod_limits:
+        limits = {
+            Priority.ADMIN: int(getattr(settings, "RCON_QUEUE_LIMIT_ADMIN", 100)),
+            Priority.USER: int(getattr(settings, "RCON_QUEUE_LIMIT_USER", 50)),
+            Priority.BACKGROUND: int(getattr(settings, "RCON_QUEUE_LIMIT_BACKGROUND", 10)),
+        }
+    sched = RconScheduler(int(getattr(settings, "RCON_MAX_INFLIGHT", 4)), limits)
+    pool = RconPool(srv.host, srv.port, srv.password, scheduler=sched)
+    make, per_call = _scenarios(pool)[scenario]
+    srv.reset_stats()
+    latencies: list[float] = []
+    errors = 0
+
+    async def caller():
+        nonlocal errors
+        for _ in range(calls):
+            t0 = time.perf_counter()
+            try:
+                await make()
+            except (RconError, asyncio.TimeoutError):
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[caller() for _ in range(callers)])
+    elapsed = time.perf_counter() - t0
+    await pool.close()
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "callers": callers,
+        "calls": callers * calls,
+        "errors": errors,
+        "cmds_per_s": round(len(latencies) * per_call / elapsed, 1) if elapsed else 0.0,
+        "server_cmds": srv.stats["commands"],
+        "p50_ms": round(_pct(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(_pct(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(_pct(latencies, 0.99) * 1000, 2),
+        "conns": srv.stats["connections"],
+        "peak": srv.stats["peak_open"],
+    }
+
+
+async def run_benchmark(concurrency=DEFAULT_CONCURRENCY, scenarios=None, *, calls: int = 20,
+                        latency: float = 0.0, prod_limits: bool = False) -> list[dict]:
+    async with FakeRconServer(latency=latency) as srv:
+        return [
+            await bench_one(srv, name, n, calls, prod_limits=prod_limits)
+            for name in scenarios or SCENARIOS
+            for n in concurrency
+        ]
+
+
+_COLUMNS = ("scenario", "callers", "calls", "errors", "cmds_per_s", "server_cmds",
+            "p50_ms", "p95_ms", "p99_ms", "conns", "peak")
+
+
+def format_table(rows: list[dict]) -> str:
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in _COLUMNS}
+    lines = ["  ".join(c.rjust(widths[c]) for c in _COLUMNS)]
+    lines += ["  ".join(str(r[c]).rjust(widths[c]) for c in _COLUMNS) for r in rows]
+    return "\n".join(lines)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-c", "--concurrency", default=",".join(map(str, DEFAULT_CONCURRENCY)),
+                    help="comma separated caller counts")
+    ap.add_argument("-s", "--scenario", action="append", choices=SCENARIOS, help="repeatable; default: all")
+    ap.add_argument("-n", "--calls", type=int, default=20, help="calls per caller")
+    ap.add_argument("--latency", type=float, default=0.001, help="fake server seconds per command")
+    ap.add_argument("--prod-limits", action="store_true", help="use the configured RCON_QUEUE_LIMIT_* (expect rejections)")
+    args = ap.parse_args()
+    rows = asyncio.run(run_benchmark(
+        [int(x) for x in args.concurrency.split(",") if x.strip()],
+        args.scenario,
+        calls=args.calls,
+        latency=args.latency,
+        prod_limits=args.prod_limits,
+    ))
+    print(format_table(rows))
+
+
+if __name__ == "__main__":
+    main()
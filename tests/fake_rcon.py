@@ -0,0 +1,152 @@
+# tests/fake_rcon.py
+"""
+In-process stand-in for a Minecraft server's RCON listener.
+
+It speaks the real wire protocol (length-prefixed little-endian packets) and copies the
+vanilla behaviour the client depends on: outputs longer than 4096 bytes are split into
+several RESPONSE_VALUE packets, an unknown packet type is answered with "Unknown request N",
+a bad password gets an auth reply with id -1, and all commands run one at a time on a single
+"main thread" regardless of how many sockets are open.
+
+    async with FakeRconServer(latency=0.002) as srv:
+        pool = RconPool(srv.host, srv.port, srv.password)
+"""
+from __future__ import annotations
+import asyncio
+import contextlib
+import struct
+from typing import Callable
+
+TYPE_RESPONSE = 0
+TYPE_COMMAND = 2
+TYPE_AUTH_RESPONSE = 2
+TYPE_LOGIN = 3
+FRAGMENT_SIZE = 4096
+
+
+def _packet(req_id: int, ptype: int, body: bytes) -> bytes:
+    payload = struct.pack("<ii", req_id, ptype) + body + b"\x00\x00"
+    return struct.pack("<i", len(payload)) + payload
+
+
+class FakeRconServer:
+    """
+    latency     seconds each command spends on the (single) server thread
+    handler     cmd -> output; defaults to `default_output`. If it raises, the server hangs up
+                like a command that crashed the connection
+    reject_auth answer every login with the "auth failed" id even if the password matches
+    drop_every  close the socket instead of answering every Nth command (0 = never)
+    """
+
+    def __init__(self, *, password: str = "pw", latency: float = 0.0, handler: Callable[[str], str] | None = None,
+                 reject_auth: bool = False, drop_every: int = 0, players: list[str] | None = None,
+                 max_players: int = 20):
+        self.password = password
+        self.latency = latency
+        self.handler = handler or self.default_output
+        self.reject_auth = reject_auth
+        self.drop_every = drop_every
+        self.players = list(players if players is not None else ["Alice", "Bob"])
+        self.max_players = max_players
+        self.host = "127.0.0.1"
+        self.port = 0
+        self._server: asyncio.base_events.Server | None = None
+        self._main_thread = asyncio.Lock()
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._handlers: set[asyncio.Task] = set()
+        self.stats: dict[str, int] = {}
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.stats = {"connections": 0, "peak_open": 0, "logins": 0, "auth_failures": 0,
+                      "commands": 0, "fragments": 0, "dropped": 0}
+
+    @property
+    def open_connections(self) -> int:
+        return len(self._writers)
+
+    def default_output(self, cmd: str) -> str:
+        name, _, arg = cmd.partition(" ")
+        if name == "list":
+            return (f"There are {len(self.players)} of a max of {self.max_players} players online: "
+                    + ", ".join(self.players))
+        if name == "version":
+            return "This server is running Paper version 1.20.4-496 (MC: 1.20.4)"
+        if name == "echo":
+            return arg
+        if name == "big":  # `big 10000` -> 10000 bytes, i.e. a multi-packet response
+            return "x" * int(arg or FRAGMENT_SIZE)
+        return "Unknown or incomplete command, see below for error"
+
+    async def start(self) -> "FakeRconServer":
+        self._server = await asyncio.start_server(self._handle, self.host, 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self) -> None:
+        self.drop_connections()
+        # let the handlers see EOF and finish instead of being cancelled at loop shutdown
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def drop_connections(self) -> None:
+        """Close every client socket, like a server restart would."""
+        for w in list(self._writers):
+            w.close()
+
+    async def __aenter__(self) -> "FakeRconServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats["connections"] += 1
+        self._handlers.add(asyncio.current_task())
+        self._writers.add(writer)
+        self.stats["peak_open"] = max(self.stats["peak_open"], len(self._writers))
+        authed = False
+        try:
+            while True:
+                (length,) = struct.unpack("<i", await reader.readexactly(4))
+                data = await reader.readexactly(length)
+                req_id, ptype = struct.unpack_from("<ii", data)
+                body = data[8:-2]
+
+                if ptype == TYPE_LOGIN:
+                    self.stats["logins"] += 1
+                    authed = not self.reject_auth and body.decode("utf-8", "replace") == self.password
+                    if not authed:
+                        self.stats["auth_failures"] += 1
+                    writer.write(_packet(req_id if authed else -1, TYPE_AUTH_RESPONSE, b""))
+                elif not authed:
+                    break  # vanilla hangs up on anything before a successful login
+                elif ptype == TYPE_COMMAND:
+                    self.stats["commands"] += 1
+                    if self.drop_every and self.stats["commands"] % self.drop_every == 0:
+                        self.stats["dropped"] += 1
+                        break
+                    async with self._main_thread:
+                        if self.latency:
+                            await asyncio.sleep(self.latency)
+                        try:
+                            out = self.handler(body.decode("utf-8", "replace")).encode("utf-8")
+                        except Exception:
+                            self.stats["dropped"] += 1
+                            break
+                    for i in range(0, max(len(out), 1), FRAGMENT_SIZE):
+                        self.stats["fragments"] += 1
+                        writer.write(_packet(req_id, TYPE_RESPONSE, out[i:i + FRAGMENT_SIZE]))
+                else:
+                    writer.write(_packet(req_id, TYPE_RESPONSE, f"Unknown request {ptype:x}".encode()))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._handlers.discard(asyncio.current_task())
+            self._writers.discard(writer)
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
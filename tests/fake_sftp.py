@@ -0,0 +1,69 @@
+# tests/fake_sftp.py
+"""
+Local asyncssh server for SFTP tests: password auth, SFTP chrooted to a temp directory.
+Pass `exec_handler` (an asyncssh process factory) to accept exec channels; without it the
+server refuses them, like SFTP-only hosting panels do.
+
+    async with LocalSshServer(tmp_path) as srv:
+        async with sftp_conn(srv.target) as sftp: ...
+"""
+from __future__ import annotations
+import asyncssh
+
+from utils.sftp_client import SftpTarget
+
+
+class _Server(asyncssh.SSHServer):
+    def __init__(self, owner: "LocalSshServer"):
+        self._owner = owner
+
+    def connection_made(self, conn):
+        self._owner.connections += 1
+        self._owner.open_conns.add(conn)
+
+    def connection_lost(self, exc):
+        self._owner.open_conns = {c for c in self._owner.open_conns if not c.is_closed()}
+
+    def begin_auth(self, username: str) -> bool:
+        return True
+
+    def password_auth_supported(self) -> bool:
+        return True
+
+    def validate_password(self, username: str, password: str) -> bool:
+        return password == self._owner.password
+
+
+class LocalSshServer:
+    def __init__(self, root, *, password: str = "pw", exec_handler=None):
+        self.root = str(root)
+        self.exec_handler = exec_handler
+        self.password = password
+        self.connections = 0
+        self.open_conns: set = set()
+        self._acceptor = None
+        self.target: SftpTarget | None = None
+
+    async def __aenter__(self) -> "LocalSshServer":
+        key = asyncssh.generate_private_key("ssh-ed25519")
+        self._acceptor = await asyncssh.listen(
+            "127.0.0.1", 0,
+            server_host_keys=[key],
+            server_factory=lambda: _Server(self),
+            sftp_factory=lambda chan: asyncssh.SFTPServer(chan, chroot=self.root),
+            process_factory=self.exec_handler,
+            allow_scp=False,
+        )
+        port = self._acceptor.sockets[0].getsockname()[1]
+        self.target = SftpTarget("127.0.0.1", port, "mc", self.password)
+        return self
+
+    def drop_connections(self) -> None:
+        for conn in list(self.open_conns):
+            conn.abort()
+        self.open_conns.clear()
+
+    async def __aexit__(self, *exc) -> None:
+        self.drop_connections()
+        self._acceptor.close()
+        await self._acceptor.wait_closed()
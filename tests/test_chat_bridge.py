@@ -0,0 +1,268 @@
+import asyncio
+import gzip
+import os
+
+import pytest
+
+from services.chat_outbox import ChatOutbox
+from services.game_events import CHAT as CHAT_EVENT, parse_line
+from services.log_tail import Checkpoint, _find_archive, catch_up, head_hash
+from services.mc_chat_bridge import ChatBridge
+from tests.fake_sftp import LocalSshServer
+from utils.sftp_client import close_ssh_pool, sftp_conn
+
+pytestmark = pytest.mark.asyncio
+
+CHAT = "[19:33:43] [Server thread/INFO]: <Alice> hello"
+
+
+class StubBot:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+
+class MemoryStore:
+    def __init__(self, cp=None):
+        self.cp = cp
+
+    async def load(self, path):
+        return self.cp
+
+    async def save(self, path, cp):
+        self.cp = cp
+
+
+def _collecting_bridge(srv, bot, mode, store=None):
+    bridge = ChatBridge(bot, 1, "/logs/latest.log", mode=mode, poll=0.05, target=srv.target,
+                        store=store or MemoryStore(), checkpoint_every=0.05)
+    got: list[str] = []
+
+    async def emit(lines):
+        got.extend(lines)
+        if any((ev := parse_line(line)) and ev.kind == CHAT_EVENT for line in lines):
+            bot.closed = True
+
+    bridge._emit = emit
+    return bridge, got
+
+
+async def test_stream_mode_reads_lines_from_tail(tmp_path):
+    commands = []
+
+    async def fake_tail(process):
+        commands.append(process.command)
+        process.stdout.write("[19:33:40] [Server thread/INFO]: Done\n" + CHAT + "\n")
+        await asyncio.sleep(5)
+        process.exit(0)
+
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "latest.log").write_text("[19:00:00] [main/INFO]: header\n")
+    bot = StubBot()
+    async with LocalSshServer(tmp_path, exec_handler=fake_tail) as srv:
+        bridge, got = _collecting_bridge(srv, bot, "auto")
+        await asyncio.wait_for(bridge.run(), 5)
+        await close_ssh_pool()
+    assert commands == ["tail -c +32 -f -- /logs/latest.log 2>/dev/null"]  # resumes right after EOF
+    assert got[-1] == CHAT
+    assert bridge.mode == "auto"
+
+
+async def test_auto_falls_back_to_polling_without_exec(tmp_path):
+    (tmp_path / "logs").mkdir()
+    log_file = tmp_path / "logs" / "latest.log"
+    log_file.write_text("old line\n")
+
+    bot = StubBot()
+    async with LocalSshServer(tmp_path) as srv:
+        bridge, got = _collecting_bridge(srv, bot, "auto")
+        task = asyncio.create_task(bridge.run())
+        while bridge.mode != "poll" or bridge.offset == 0:
+            await asyncio.sleep(0.02)
+        with log_file.open("a") as f:
+            f.write(CHAT + "\n")
+        await asyncio.wait_for(task, 5)
+        await close_ssh_pool()
+    assert got == [CHAT]  # started at EOF, so "old line" is not replayed
+
+
+HEADER = b"[08:00:00] [main/INFO]: Starting\n"
+LOG = "/logs/latest.log"
+
+
+def _chat(n):
+    return f"[08:00:0{n}] [Server thread/INFO]: <Alice> msg{n}\n".encode()
+
+
+def _text(*chunks):
+    return b"".join(chunks).decode().splitlines()
+
+
+async def test_catch_up_resumes_at_checkpoint(tmp_path):
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "latest.log").write_bytes(HEADER + _chat(1) + _chat(2) + b"[08:00:03] partial")
+    cp = Checkpoint(head_hash(HEADER), len(HEADER + _chat(1)))
+    async with LocalSshServer(tmp_path) as srv:
+        async with sftp_conn(srv.target) as sftp:
+            lines, new_cp, dropped = await catch_up(sftp, LOG, cp, max_lines=10)
+            capped, _, capped_dropped = await catch_up(sftp, LOG, Checkpoint(cp.head_hash, 0), max_lines=1)
+        await close_ssh_pool()
+    assert lines == _text(_chat(2))
+    assert new_cp.offset == len(HEADER + _chat(1) + _chat(2))  # the partial line is read again later
+    assert dropped == 0
+    assert capped == _text(_chat(2)) and capped_dropped == 2
+
+
+async def test_catch_up_follows_rotation_into_gz(tmp_path):
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    old = HEADER + _chat(1) + _chat(2)
+    cp = Checkpoint(head_hash(old), len(HEADER + _chat(1)), mtime=1000.0)
+    (logs / "2026-10-16-1.log.gz").write_bytes(gzip.compress(old))
+    os.utime(logs / "2026-10-16-1.log.gz", (1005, 1005))
+    (logs / "2026-10-15-1.log.gz").write_bytes(gzip.compress(b"[07:00:00] other day\n"))
+    # the new file is already longer than the old offset, so a size check alone would miss it
+    new = b"[09:00:00] [main/INFO]: Starting again\n" + _chat(3) + _chat(4)
+    (logs / "latest.log").write_bytes(new)
+    async with LocalSshServer(tmp_path) as srv:
+        async with sftp_conn(srv.target) as sftp:
+            lines, new_cp, _ = await catch_up(sftp, LOG, cp, max_lines=10)
+        await close_ssh_pool()
+    assert lines == _text(_chat(2), new)
+    assert new_cp == Checkpoint(head_hash(new), len(new), new_cp.mtime)
+
+
+class CountingSftp:
+    """Counts the bytes read through sftp.open() handles."""
+
+    def __init__(self, sftp):
+        self._sftp, self.read = sftp, 0
+
+    def __getattr__(self, name):
+        return getattr(self._sftp, name)
+
+    async def open(self, path, mode="r"):
+        f = await self._sftp.open(path, mode)
+        owner = self
+
+        class Handle:
+            async def __aenter__(self):
+                await f.__aenter__()
+                return self
+
+            async def __aexit__(self, *exc):
+                return await f.__aexit__(*exc)
+
+            async def seek(self, *args):
+                return await f.seek(*args)
+
+            async def read(self, n=-1):
+                data = await f.read(n)
+                owner.read += len(data)
+                return data
+
+        return Handle()
+
+
+async def test_rotated_archive_is_matched_by_its_head_and_read_only_from_the_checkpoint(tmp_path):
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    body = b"".join(f"[08:{i // 60 % 60:02d}:{i % 60:02d}] [Server thread/INFO]: <P{i}> {os.urandom(24).hex()}\n"
+                    .encode() for i in range(40000))
+    old = HEADER + body + _chat(5)
+    half = len(old) // 2
+    (logs / "2026-10-16-1.log.gz").write_bytes(gzip.compress(old[:half]) + gzip.compress(old[half:]))
+    (logs / "2026-10-16-2.log.gz").write_bytes(gzip.compress(b"[06:00:00] [main/INFO]: another boot\n" + body))
+    for name in ("2026-10-16-1.log.gz", "2026-10-16-2.log.gz"):
+        os.utime(logs / name, (1005, 1005))
+    new = b"[09:00:00] [main/INFO]: Starting again\n"
+    (logs / "latest.log").write_bytes(new)
+    cp = Checkpoint(head_hash(old), len(old) - len(_chat(5)), mtime=1000.0)
+    async with LocalSshServer(tmp_path) as srv:
+        async with sftp_conn(srv.target) as sftp:
+            counting = CountingSftp(sftp)
+            assert await _find_archive(counting, LOG, cp) == "/logs/2026-10-16-1.log.gz"
+            assert counting.read <= 2 * 4096  # two head probes, not two whole archives
+            lines, _, _ = await catch_up(sftp, LOG, cp, max_lines=10)
+            capped, _, _ = await catch_up(sftp, LOG, Checkpoint(cp.head_hash, 0, 1000.0), max_lines=2)
+        await close_ssh_pool()
+    assert lines == _text(_chat(5), new)
+    assert capped == _text(_chat(5), new)  # only the budget's worth of the archive tail is kept
+
+
+async def test_bridge_replays_lines_missed_while_down(tmp_path):
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "latest.log").write_bytes(HEADER + _chat(1) + _chat(2))
+    store = MemoryStore(Checkpoint(head_hash(HEADER), len(HEADER + _chat(1))))
+    bot = StubBot()
+    async with LocalSshServer(tmp_path) as srv:
+        bridge, got = _collecting_bridge(srv, bot, "poll", store)
+        await asyncio.wait_for(bridge.run(), 5)
+        await close_ssh_pool()
+    assert got == _text(_chat(2))
+    assert store.cp.offset == len(HEADER + _chat(1) + _chat(2))
+
+
+async def test_outbox_packs_lines_into_few_messages():
+    sent = []
+
+    async def send(content):
+        sent.append(content)
+
+    outbox = ChatOutbox(send, window=0.05)
+    lines = [f"**Alice**: message number {i}" for i in range(300)]
+    for line in lines:
+        outbox.put(line)
+    while outbox.depth or not sent:
+        await asyncio.sleep(0.02)
+    outbox.close()
+    assert all(len(m) <= 2000 for m in sent)
+    assert len(sent) == 5
+    assert "\n".join(sent).splitlines() == lines
+    assert outbox.stats()["sent_lines"] == 300 and outbox.stats()["skipped"] == 0
+
+
+async def test_outbox_full_queue_skips_oldest_with_marker():
+    sent = []
+
+    async def send(content):
+        sent.append(content)
+
+    outbox = ChatOutbox(send, max_lines=10, window=60)
+    for i in range(25):
+        outbox.put(f"line {i}")
+    assert outbox.stats()["depth"] == 10
+    await outbox.flush()
+    outbox.close()
+    assert sent == ["*… 15 lines skipped …*\n" + "\n".join(f"line {i}" for i in range(15, 25))]
+    assert outbox.stats()["skipped"] == 15
+
+
+async def test_auto_retries_the_stream_after_falling_back(tmp_path):
+    attempts = []
+
+    async def flaky_tail(process):
+        attempts.append(process.command)
+        if len(attempts) == 1:
+            process.exit(1)  # e.g. a hiccup right at startup
+            return
+        process.stdout.write(CHAT + "\n")
+        await asyncio.sleep(5)
+        process.exit(0)
+
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "latest.log").write_text("[19:00:00] [main/INFO]: header\n")
+    bot = StubBot()
+    async with LocalSshServer(tmp_path, exec_handler=flaky_tail) as srv:
+        bridge, got = _collecting_bridge(srv, bot, "auto")
+        bridge.stream_retry = bridge._retry_delay = 0.2
+        task = asyncio.create_task(bridge.run())
+        while bridge.mode != "poll":
+            await asyncio.sleep(0.01)
+        assert bridge.stats()["stream_retry_in_s"] > 0
+        await asyncio.wait_for(task, 5)
+        await close_ssh_pool()
+    assert len(attempts) == 2 and got == [CHAT]
+    assert bridge.mode == "auto" and bridge._retry_delay == 0.4  # still backing off: the retry was short-lived
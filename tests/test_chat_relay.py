@@ -0,0 +1,54 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from services.chat_relay import ChatRelay, build_commands
+from utils.rcon_protocol import MAX_COMMAND_LEN
+
+
+def _lines(cmd):
+    assert cmd.startswith("tellraw @a ")
+    comps = json.loads(cmd[len("tellraw @a "):])
+    return "".join(c["text"] if isinstance(c, dict) else c for c in comps).split("\n")
+
+
+def test_build_commands_coalesces_and_escapes():
+    cmds = build_commands([("Alice", 'hi "there" \\o/'), ("Bób", "ahoj ěščř")])
+    assert len(cmds) == 1 and cmds[0].isascii()
+    assert _lines(cmds[0]) == ['[Discord] Alice: hi "there" \\o/', "[Discord] Bób: ahoj ěščř"]
+
+
+def test_build_commands_splits_at_the_rcon_limit():
+    messages = [(f"user{i}", "x" * 200) for i in range(20)] + [("Huge", "é" * 256)]
+    cmds = build_commands(messages, skipped=3)
+    assert all(len(c.encode()) <= MAX_COMMAND_LEN for c in cmds)
+    lines = [line for c in cmds for line in _lines(c)]
+    assert lines[0] == "[Discord] … 3 message(s) skipped"
+    assert lines[1:-1] == [f"[Discord] user{i}: {'x' * 200}" for i in range(20)]
+    assert lines[-1].startswith("[Discord] Huge: éé") and lines[-1].endswith("…")
+
+
+@pytest.mark.asyncio
+async def test_relay_batches_and_caps_rcon_rate():
+    sent: list[tuple[float, str]] = []
+
+    async def run(cmd):
+        sent.append((time.monotonic(), cmd))
+
+    relay = ChatRelay(run, window=0.05, max_cmds_per_second=4, user_messages=3, user_seconds=60)
+    for user in range(10):
+        for n in range(4):
+            accepted = relay.submit(user, f"user{user}", f"message {n} " + "y" * 60)
+            assert accepted == (n < 3)  # the fourth message within the minute is over budget
+    while relay.stats()["relayed"] < 30:
+        await asyncio.sleep(0.02)
+    relay.close()
+
+    assert relay.stats()["rate_limited"] == 10
+    assert 1 < len(sent) < 30  # a few packed commands, not one per message
+    assert sum(len(_lines(cmd)) for _, cmd in sent) == 30
+    # the burst allows 4 commands at once; anything beyond that is paced at 4/s
+    for (t0, _), (t1, _) in zip(sent[3:], sent[4:]):
+        assert t1 - t0 >= 0.19
@@ -0,0 +1,26 @@
+import time
+
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+def test_opens_after_threshold_and_probes_once(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    br = CircuitBreaker(failure_threshold=2, reset_after=5, max_backoff=20)
+
+    br.record_failure("refused")
+    assert br.state == CLOSED
+    br.record_failure("refused")
+    assert br.state == OPEN and not br.allow()
+
+    now[0] += 5
+    assert br.state == HALF_OPEN
+    assert br.allow()        # the single probe
+    assert not br.allow()    # everyone else still fails fast
+
+    br.record_failure("refused")  # probe failed -> backoff doubles
+    now[0] += 5
+    assert br.state == OPEN
+    now[0] += 5
+    assert br.allow()
+    br.record_success()
+    assert br.state == CLOSED and br.snapshot()["down_since"] is None
@@ -0,0 +1,75 @@
+import asyncio
+
+import discord
+import pytest
+
+from utils.discord_scheduler import DiscordScheduler
+from utils.scheduling import Priority
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_priority_order_and_one_call_per_route():
+    sched = DiscordScheduler(max_inflight=1)
+    order, gate = [], asyncio.Event()
+
+    async def blocker():
+        await gate.wait()
+
+    def call(name):
+        async def run():
+            order.append(name)
+            return name
+        return run
+
+    first = sched.submit("channel:1", blocker, Priority.BACKGROUND)
+    futs = [sched.submit("channel:2", call("bg"), Priority.BACKGROUND),
+            sched.submit("channel:3", call("user"), Priority.USER),
+            sched.submit("channel:4", call("admin"), Priority.ADMIN)]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(first, *futs)
+    assert order == ["admin", "user", "bg"]
+    stats = sched.stats()
+    assert stats["background"]["submitted"] == 2 and stats["in_flight"] == 0
+
+
+async def test_superseded_edits_are_coalesced():
+    sched = DiscordScheduler(max_inflight=4)
+    sent, gate = [], asyncio.Event()
+
+    def edit(text):
+        async def run():
+            await gate.wait()
+            sent.append(text)
+            return text
+        return run
+
+    running = sched.submit("channel:1", edit("v1"), key="edit:9")
+    await asyncio.sleep(0)  # v1 is on the wire; the next edits queue behind it on the same route
+    queued = [sched.submit("channel:1", edit(f"v{i}"), key="edit:9") for i in (2, 3, 4)]
+    gate.set()
+    assert await running == "v1"
+    assert await asyncio.gather(*queued) == ["v4", "v4", "v4"]
+    assert sent == ["v1", "v4"] and sched.stats()["coalesced"] == 2
+
+
+async def test_rate_limited_route_cools_down_and_retries():
+    sched = DiscordScheduler(max_inflight=2)
+    attempts = []
+
+    async def rename():
+        attempts.append(asyncio.get_running_loop().time())
+        if len(attempts) == 1:
+            raise discord.RateLimited(0.2)
+        return "ok"
+
+    async def other():
+        return "other"
+
+    fut = sched.submit("channel:1:rename", rename, key="rename:1")
+    await asyncio.sleep(0.01)
+    assert await asyncio.wait_for(sched.submit("channel:2", other), 0.1) == "other"  # not blocked
+    assert await fut == "ok"
+    assert attempts[1] - attempts[0] >= 0.19
+    assert sched.stats()["rate_limited"] == 1
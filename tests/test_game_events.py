@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from services.game_events import EventBus, GameEvent, parse_line
+from services.status_service import StatusService
+
+pytestmark = pytest.mark.asyncio
+
+LINES = {
+    "[19:33:43] [Server thread/INFO]: <Alice> hello there": ("chat", "Alice", "hello there"),
+    "[19:33:43] [Async Chat Thread - #0/INFO]: [Not Secure] <Bob> hi": ("chat", "Bob", "hi"),
+    "[10:00:00 INFO]: Alice joined the game": ("join", "Alice", ""),
+    "[10:00:00] [Server thread/INFO]: .BedrockGuy left the game": ("leave", ".BedrockGuy", ""),
+    "[10:00:00] [Server thread/INFO]: Alice was slain by Zombie": ("death", "Alice", "Alice was slain by Zombie"),
+    "[10:00:00] [Server thread/INFO]: Bob fell from a high place": ("death", "Bob", "Bob fell from a high place"),
+    "[10:00:00] [Server thread/INFO]: Alice has made the advancement [Stone Age]": ("advancement", "Alice", "Stone Age"),
+    '[10:00:00] [Server thread/INFO]: Done (7.125s)! For help, type "help"': ("server_start", None, ""),
+    "[10:00:00 INFO]: Stopping server": ("server_stop", None, ""),
+}
+NOISE = [
+    "[10:00:00] [Server thread/INFO]: Villager EntityVillager['Villager'/42] died, message: 'Villager was slain'",
+    "[10:00:00] [Server thread/WARN]: Alice moved too quickly!",
+    "[10:00:00] [Server thread/INFO]: [LuckPerms] Everything was loaded",
+    "[10:00:00] [Server thread/INFO]: Preparing spawn area: 83%",
+]
+
+
+async def test_parse_line_types_events():
+    for line, expected in LINES.items():
+        ev = parse_line(line)
+        assert ev is not None, line
+        assert (ev.kind, ev.player, ev.message) == expected
+    assert [parse_line(line) for line in NOISE] == [None] * len(NOISE)
+
+
+async def test_bus_runs_sync_and_async_handlers():
+    bus = EventBus()
+    seen, joined = [], asyncio.Event()
+
+    async def on_join(ev):
+        joined.set()
+
+    bus.subscribe(seen.append)
+    unsubscribe = bus.subscribe(on_join, "join")
+    bus.subscribe(lambda ev: 1 / 0, "join")  # a broken handler does not stop the others
+    bus.publish(GameEvent("join", "Alice"))
+    await asyncio.wait_for(joined.wait(), 1)
+    unsubscribe()
+    bus.publish(GameEvent("chat", "Alice", "hi"))
+    assert [e.kind for e in seen] == ["join", "chat"]
+    assert bus.stats()["handler_errors"] == 1
+
+
+async def test_status_follows_join_and_leave_without_polling():
+    calls = 0
+
+    async def fake_status(**_):
+        nonlocal calls
+        calls += 1
+        return {"online": 1, "max": 20, "players": ["Alice"], "raw": ""}
+
+    bus, live = EventBus(), True
+    svc = StatusService(fetch=fake_status, reconcile_seconds=300)
+    svc.follow(bus, lambda: live)
+    await svc.get(max_age=0)
+
+    waiter = asyncio.create_task(svc.wait_changed(timeout=1))
+    await asyncio.sleep(0)
+    bus.publish(parse_line("[10:00:00 INFO]: Bob joined the game"))
+    assert await waiter
+    snap = await svc.get(max_age=0)  # still served from the event-maintained snapshot
+    assert (snap.online, snap.players, calls) == (2, ("Alice", "Bob"), 1)
+
+    bus.publish(parse_line("[10:00:01 INFO]: Alice left the game"))
+    bus.publish(parse_line("[10:00:01 INFO]: Alice left the game"))  # replayed lines are idempotent
+    assert (await svc.get(max_age=0)).players == ("Bob",)
+
+    live = False  # log feed down: readers get a real `list` again
+    assert (await svc.get(max_age=0)).players == ("Alice",) and calls == 2
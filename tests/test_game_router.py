@@ -0,0 +1,109 @@
+import contextlib
+import json
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from api import game_router
+from api.game_router import parse_stats_body, stat_row, stats_bulk
+from models.models_game import PlayerStats
+
+
+class StubRequest:
+    def __init__(self, body: bytes, content_type: str):
+        self._body = body
+        self.headers = {"content-type": content_type}
+
+    async def body(self):
+        return self._body
+
+
+def test_parse_json_and_ndjson():
+    rows = [{"player": "Alice", "kills": 3}, {"player": "Bob", "deaths": 1}]
+    assert parse_stats_body(json.dumps(rows).encode(), "application/json") == rows
+    assert parse_stats_body(json.dumps({"items": rows}).encode(), "application/json") == rows
+    nd = b'{"player": "Alice", "kills": 3}\n\n{oops\n{"player": "Bob", "deaths": 1}\n'
+    items = parse_stats_body(nd, "application/x-ndjson")
+    assert items[0] == rows[0] and items[2] == rows[1]
+    assert isinstance(items[1], ValueError) and "line 3" in str(items[1])
+
+
+def test_stat_row_validation():
+    assert stat_row({"player": " Alice ", "kills": 3, "playtime_hours": 1}) == {
+        "player": "Alice", "kills": 3, "playtime_hours": 1.0}
+    for bad in ({"kills": 1}, {"player": "x" * 33}, {"player": "A", "kills": -1},
+                {"player": "A", "deaths": 1.5}, {"player": "A", "kills": True}, {"player": "A", "kills": "3"}):
+        with pytest.raises(ValueError):
+            stat_row(bad)
+    # /stats/update keeps accepting numeric strings, as it did before validation existed
+    assert stat_row({"player": "A", "kills": "3", "playtime_hours": " 1.5"}, numeric_strings=True) == {
+        "player": "A", "kills": 3, "playtime_hours": 1.5}
+    for bad in ({"player": "A", "kills": "three"}, {"player": "A", "kills": "nan"}, {"player": "A", "deaths": "-1"}):
+        with pytest.raises(ValueError):
+            stat_row(bad, numeric_strings=True)
+
+
+def test_upsert_statement_updates_only_given_fields():
+    sql = str(PlayerStats._upsert_stmt([{"player": "A", "kills": 1}, {"player": "B", "kills": 2}], ("kills",))
+              .compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (player) DO UPDATE SET kills = excluded.kills" in sql
+    assert "deaths = " not in sql and "%(player_m1)s" in sql
+
+
+@pytest.mark.asyncio
+async def test_bulk_reports_row_errors_and_writes_the_rest(monkeypatch):
+    written = []
+
+    async def fake_bulk_upsert(s, rows):
+        written.extend(rows)
+        return {i: "value too long" for i, r in enumerate(rows) if r["player"] == "Broken"}, []
+
+    @contextlib.asynccontextmanager
+    async def fake_session():
+        yield None
+
+    monkeypatch.setattr(game_router, "_require_token", lambda _auth: _noop())
+    monkeypatch.setattr(game_router, "async_session_maker", fake_session)
+    monkeypatch.setattr(PlayerStats, "bulk_upsert", staticmethod(fake_bulk_upsert))
+    body = "\n".join(json.dumps(r) for r in (
+        {"player": "Alice", "kills": 1},
+        {"player": "Bob", "deaths": -2},
+        {"player": "Broken", "kills": 1},
+        {"player": "Alice", "deaths": 4},
+    )).encode()
+    res = await stats_bulk(StubRequest(body, "application/x-ndjson"), authorization="Bearer t")
+    assert written == [{"player": "Alice", "kills": 1, "deaths": 4}, {"player": "Broken", "kills": 1}]
+    assert (res["ok"], res["received"], res["upserted"]) == (False, 4, 1)
+    assert [(e["index"], e["error"]) for e in res["errors"]] == [
+        (1, "deaths must be a non-negative number"), (2, "value too long")]
+
+
+async def _noop():
+    return None
+
+
+@pytest.mark.asyncio
+async def test_bulk_buffers_increments(monkeypatch):
+    from services.stats_buffer import StatsDeltaBuffer
+
+    buf = StatsDeltaBuffer(flush_every=3600, write=None)
+    upserted = []
+
+    async def fake_bulk_upsert(s, rows):
+        upserted.extend(rows)
+        return {}, []
+
+    @contextlib.asynccontextmanager
+    async def fake_session():
+        yield None
+
+    monkeypatch.setattr(game_router, "stats_buffer", buf)
+    monkeypatch.setattr(game_router, "_require_token", lambda _auth: _noop())
+    monkeypatch.setattr(game_router, "async_session_maker", fake_session)
+    monkeypatch.setattr(PlayerStats, "bulk_upsert", staticmethod(fake_bulk_upsert))
+    body = json.dumps([{"player": "Alice", "kills_delta": 1}, {"player": "Alice", "kills_delta": 2},
+                       {"player": "Bob", "deaths": 3, "playtime_delta": 0.5}]).encode()
+    res = await stats_bulk(StubRequest(body, "application/json"), authorization="Bearer t")
+    assert (res["ok"], res["upserted"], res["buffered"]) == (True, 1, 3)
+    assert upserted == [{"player": "Bob", "deaths": 3}]
+    assert buf._pending == {"Alice": [3, 0, 0.0], "Bob": [0, 0, 0.5]}
@@ -0,0 +1,61 @@
+import asyncio
+import random
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from models.models_game import PlayerStats
+from services.leaderboard import Leaderboard, TopK
+
+
+def test_topk_matches_a_full_sort_under_random_updates():
+    rng = random.Random(7)
+    truth: dict[str, int] = {}
+    board = TopK(10)
+    board.seed([], complete=True)
+    for _ in range(3000):
+        player = f"p{rng.randrange(60)}"
+        value = max(0, truth.get(player, 0) + rng.choice((1, 2, 5, -1)))  # mostly up, sometimes down
+        truth[player] = value
+        board.update(player, value)
+        expected = sorted(truth.items(), key=lambda kv: (-kv[1], kv[0]))
+        n = board.certain()
+        assert board.page(0, n) == [(p, float(v)) for p, v in expected[:n]]
+    assert board.covers(5)
+
+
+def test_topk_seeded_from_partial_view_keeps_untracked_out():
+    board = TopK(3)
+    board.seed([("a", 50), ("b", 40), ("c", 30)], complete=False)  # more players exist below 30
+    board.update("b", 10)  # falls below the floor: someone untracked may be ahead now
+    assert board.page(0, 3) == [("a", 50.0), ("c", 30.0)] and board.covers(1) and not board.covers(2)
+    board.update("d", 35)
+    assert board.page(0, 3) == [("a", 50.0), ("d", 35.0), ("c", 30.0)]
+
+
+@pytest.mark.asyncio
+async def test_leaderboard_serves_pages_from_memory():
+    lb = Leaderboard(k=5)
+    for board in lb.boards.values():
+        board.seed([], complete=True)
+    lb.ready = True
+    lb.update(SimpleNamespace(player=f"p{i}", kills=i, deaths=10 - i, playtime_hours=i / 2) for i in range(8))
+    assert await lb.page("kills", 0, 2) == [("p7", 7.0), ("p6", 6.0)]
+    assert await lb.page("deaths", 2, 2) == [("p2", 8.0), ("p3", 7.0)]
+    assert lb.stats()["memory_hits"] == 2 and lb.stats()["tracked"]["kills"] == 5
+
+
+def test_ties_use_the_same_order_as_the_database_query():
+    board = TopK(5)
+    board.seed([("alice", 7), ("Bob", 7), ("carol", 7), ("Dave", 9)], complete=True)
+    assert [p for p, _ in board.page(0, 5)] == ["Dave", "Bob", "alice", "carol"]  # code-point order, like COLLATE "C"
+    captured = []
+
+    class Session:
+        async def execute(self, q):
+            captured.append(str(q.compile(dialect=postgresql.dialect())))
+            return SimpleNamespace(scalars=lambda: [])
+
+    asyncio.run(PlayerStats.top(Session(), "kills", limit=5, offset=5))
+    assert 'ORDER BY player_stats.kills DESC NULLS LAST, player_stats.player COLLATE "C"' in captured[0]
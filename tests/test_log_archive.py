@@ -0,0 +1,116 @@
+import gzip
+from datetime import date, datetime, timezone
+
+import pytest
+
+from services.game_events import GameEvent, parse_line
+from services.log_archive import LogArchive, backfill, gz_lines
+from tests.fake_sftp import LocalSshServer
+from utils.sftp_client import close_ssh_pool, sftp_conn
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeTable:
+    """Stands in for the INSERT … ON CONFLICT (dedupe) DO NOTHING."""
+
+    def __init__(self):
+        self.rows = {}
+        self.calls = 0
+        self.fail = False
+
+    async def insert(self, rows):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("db down")
+        new = [r for r in rows if r["dedupe"] not in self.rows]
+        self.rows.update((r["dedupe"], r) for r in new)
+        return len(new)
+
+
+def _ev(line, at):
+    ev = parse_line(line)
+    return GameEvent(ev.kind, ev.player, ev.message, line, at)
+
+
+async def test_live_events_are_batched_dated_and_kept_on_db_errors():
+    table = FakeTable()
+    archive = LogArchive("srv", batch=3, tz=timezone.utc, insert=table.insert)
+    at = datetime(2024, 6, 1, 0, 0, 2, tzinfo=timezone.utc).timestamp()
+    archive.on_event(_ev("[23:59:58] [Server thread/INFO]: <Alice> before midnight", at))
+    archive.on_event(_ev("[00:00:01] [Server thread/INFO]: <Alice> gg", at))
+    archive.on_event(_ev("[00:00:01] [Server thread/INFO]: <Alice> gg", at))  # same line, same second: kept
+    await archive._flushing
+    assert table.calls == 1 and len(table.rows) == 3
+    stamps = sorted(r["logged_at"] for r in table.rows.values())
+    assert stamps[0] == datetime(2024, 5, 31, 23, 59, 58, tzinfo=timezone.utc)
+    assert stamps[-1] == datetime(2024, 6, 1, 0, 0, 1, tzinfo=timezone.utc)
+
+    table.fail = True
+    archive.on_event(_ev("[00:00:05] [Server thread/INFO]: Bob joined the game", at + 3))
+    await archive.flush()
+    assert archive.stats()["buffered"] == 1 and archive.stats()["errors"] == 1
+    table.fail = False
+    await archive.flush()
+    assert archive.stats()["buffered"] == 0 and archive.stats()["archived"] == 4
+
+
+async def test_gz_lines_streams_concatenated_members(tmp_path):
+    lines = [f"[12:00:{i % 60:02d}] [Server thread/INFO]: <P{i}> message {i}" for i in range(5000)]
+    data = gzip.compress("\n".join(lines[:3000]).encode() + b"\n") + gzip.compress("\n".join(lines[3000:]).encode())
+    (tmp_path / "a.log.gz").write_bytes(data)
+    async with LocalSshServer(tmp_path) as srv:
+        async with sftp_conn(srv.target) as sftp:
+            got = [line async for line in gz_lines(sftp, "/a.log.gz", chunk=4096)]
+        await close_ssh_pool()
+    assert got == lines
+
+
+async def test_backfill_dates_rows_and_skips_what_is_archived(tmp_path):
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    day1 = [
+        "[23:58:00] [Server thread/INFO]: Alice joined the game",
+        "[23:59:59] [Server thread/INFO]: Preparing spawn area: 83%",
+        "[00:00:10] [Server thread/INFO]: <Alice> happy new day",
+    ]
+    (logs / "2024-05-31-1.log.gz").write_bytes(gzip.compress("\n".join(day1).encode()))
+    (logs / "2024-05-30-1.log.gz").write_bytes(gzip.compress(b"[10:00:00] [Server thread/INFO]: Bob left the game\n"))
+    (logs / "latest.log").write_text("[10:00:00] [Server thread/INFO]: <Bob> live\n")
+    table = FakeTable()
+    async with LocalSshServer(tmp_path) as srv:
+        res = await backfill("srv", "/logs", srv.target, since=date(2024, 5, 31), tz=timezone.utc, insert=table.insert)
+        again = await backfill("srv", "/logs", srv.target, since=date(2024, 5, 31), tz=timezone.utc,
+                               insert=table.insert)
+        await close_ssh_pool()
+    assert (res.files, res.events, res.inserted) == (1, 2, 2)
+    assert (again.events, again.inserted) == (2, 0)
+    by_kind = {r["kind"]: r for r in table.rows.values()}
+    assert by_kind["join"]["logged_at"] == datetime(2024, 5, 31, 23, 58, tzinfo=timezone.utc)
+    assert by_kind["chat"]["logged_at"] == datetime(2024, 6, 1, 0, 0, 10, tzinfo=timezone.utc)
+    assert by_kind["chat"]["message"] == "happy new day"
+
+
+async def test_a_row_the_database_refuses_is_dropped_and_the_rest_archived():
+    table = FakeTable()
+
+    async def insert(rows):
+        if any(r["player"] == "Mallory" for r in rows):
+            raise ValueError("value too long")  # DataError stand-in: fails on every retry
+        return await table.insert(rows)
+
+    archive = LogArchive("srv", batch=8, tz=timezone.utc, insert=insert)
+    at = datetime(2024, 6, 1, 12, tzinfo=timezone.utc).timestamp()
+    long_name = "x" * 40
+    archive.on_event(_ev(f"[12:00:00] [Server thread/INFO]: <{long_name}> hi", at))
+    for i in range(6):
+        archive.on_event(_ev(f"[12:00:0{i}] [Server thread/INFO]: <P{i}> msg {i}", at))
+    archive.on_event(_ev("[12:00:09] [Server thread/INFO]: <Mallory> bad", at))
+    await archive._flushing
+    assert len(table.rows) == 7 and archive.stats()["buffered"] == 0
+    assert archive.stats()["rejected"] == 1 and archive.stats()["archived"] == 7
+    assert {r["player"] for r in table.rows.values()} >= {"x" * 32}
+
+    archive.on_event(_ev("[12:01:00] [Server thread/INFO]: <Bob> still archiving", at + 60))
+    await archive.flush()
+    assert len(table.rows) == 8
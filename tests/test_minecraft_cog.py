@@ -4,6 +4,7 @@ import discord
 from discord.ext import commands
 
 from services.minecraft_cog import MinecraftCog
+from services.status_service import StatusSnapshot
 
 pytestmark = pytest.mark.asyncio
 
@@ -35,12 +36,12 @@ def bot(event_loop):
 async def test_servers_embed(monkeypatch, bot):
     cog = MinecraftCog(bot)
 
-    async def fake_status():
-        return {"online": 2, "max": 20, "players": ["Alice", "Bob"], "raw": "ok"}
+    async def fake_snapshot(**_):
+        return StatusSnapshot(online=2, max=20, players=("Alice", "Bob"), fetched_at=0.0, raw="ok")
 
-    async def fake_cmd(cmd: str): return "Paper 1.20.4"
+    async def fake_cmd(cmd: str, **_): return "Paper 1.20.4"
 
-    monkeypatch.setattr("services.minecraft_cog.get_status", fake_status)
+    monkeypatch.setattr("services.minecraft_cog.get_snapshot", fake_snapshot)
     monkeypatch.setattr("services.minecraft_cog.mc_cmd", fake_cmd)
 
     inter = StubInteraction(role_ids=[])
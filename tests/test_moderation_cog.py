@@ -7,6 +7,7 @@ from services.moderation_cog import ModerationCog
 pytestmark = pytest.mark.asyncio
 
 class StubChannel:
+    id = 1
     async def send(self, *_a, **_k): return None
 
 class StubMessage:
@@ -0,0 +1,122 @@
+import os
+import zipfile
+
+import asyncssh
+import pytest
+
+from services.plugin_index import PluginIndex, parse_yaml_subset
+from tests.fake_sftp import LocalSshServer
+from utils.sftp_client import close_ssh_pool
+
+OLD = 1_000_000
+
+PLUGIN_YML = """\
+name: Essentials
+main: com.earth2me.essentials.Essentials
+version: '2.20.1'  # quoted on purpose
+api-version: "1.13"
+description: |
+  Provides an essential, core set of commands.
+  name: not a key
+depend: [Vault]
+softdepend:
+- LuckPerms
+- WorldGuard
+commands:
+  home:
+    description: Teleport home
+"""
+
+PAPER_YML = """\
+name: Modern
+version: 1.0
+main: dev.example.Modern
+dependencies:
+  server:
+    LuckPerms:
+      load: BEFORE
+      required: true
+    PlaceholderAPI:
+      required: false
+"""
+
+
+def _jar(path, entries, mtime=OLD, compression=zipfile.ZIP_DEFLATED):
+    with zipfile.ZipFile(path, "w", compression=compression) as z:
+        for i in range(200):  # a realistic amount of class files around the descriptor
+            z.writestr(f"com/example/C{i}.class", os.urandom(512))
+        for name, text in entries.items():
+            z.writestr(name, text)
+    os.utime(path, (mtime, mtime))
+
+
+def test_yaml_subset():
+    y = parse_yaml_subset(PLUGIN_YML)
+    assert y["name"] == "Essentials" and y["version"] == "2.20.1" and y["api-version"] == "1.13"
+    assert y["depend"] == ["Vault"] and y["softdepend"] == ["LuckPerms", "WorldGuard"]
+    assert y["commands"] == {"home": {"description": "Teleport home"}}
+
+
+@pytest.mark.asyncio
+async def test_scan_reads_descriptors_and_reindexes_only_changed_jars(tmp_path):
+    plugins = tmp_path / "plugins"
+    (plugins / "Essentials").mkdir(parents=True)
+    (plugins / "Orphan").mkdir()
+    _jar(plugins / "EssentialsX.jar", {"plugin.yml": PLUGIN_YML})
+    _jar(plugins / "modern.jar", {"plugin.yml": "name: Legacy\n", "paper-plugin.yml": PAPER_YML},
+         compression=zipfile.ZIP_STORED)
+    _jar(plugins / "library.jar", {"META-INF/MANIFEST.MF": "Manifest-Version: 1.0\n"})
+    (plugins / "broken.jar").write_bytes(b"not a zip at all")
+    os.utime(plugins / "broken.jar", (OLD, OLD))
+
+    index = PluginIndex()
+    async with LocalSshServer(tmp_path) as srv:
+        infos, folders = await index.scan("/plugins", srv.target)
+        by_file = {p.file: p for p in infos}
+        ess, modern = by_file["EssentialsX.jar"], by_file["modern.jar"]
+        assert (ess.name, ess.version, ess.main) == ("Essentials", "2.20.1", "com.earth2me.essentials.Essentials")
+        assert ess.depend == ("Vault",) and ess.softdepend == ("LuckPerms", "WorldGuard")
+        assert (modern.name, modern.descriptor) == ("Modern", "paper-plugin.yml")
+        assert modern.depend == ("LuckPerms",) and modern.softdepend == ("PlaceholderAPI",)
+        assert by_file["library.jar"].error == "no plugin.yml"
+        assert by_file["broken.jar"].error == "not a ZIP file"
+        assert folders == ["Essentials", "Orphan"]
+        jar_bytes = sum(os.path.getsize(plugins / p.file) for p in infos)
+        assert index.stats()["bytes_read"] < jar_bytes / 2  # never the whole jars
+
+        await index.scan("/plugins", srv.target)
+        assert index.stats()["indexed"] == 4 and index.stats()["hits"] == 4
+
+        _jar(plugins / "EssentialsX.jar", {"plugin.yml": PLUGIN_YML.replace("2.20.1", "2.21.0")}, mtime=OLD + 60)
+        infos, _ = await index.scan("/plugins", srv.target)
+        await close_ssh_pool()
+    assert index.stats()["indexed"] == 5
+    assert {p.file: p.version for p in infos}["EssentialsX.jar"] == "2.21.0"
+
+
+@pytest.mark.asyncio
+async def test_jar_that_fails_to_open_is_one_errored_row(tmp_path, monkeypatch):
+    plugins = tmp_path / "plugins"
+    plugins.mkdir()
+    _jar(plugins / "EssentialsX.jar", {"plugin.yml": PLUGIN_YML})
+    _jar(plugins / "locked.jar", {"plugin.yml": "name: Locked\n"})
+    real_open = asyncssh.SFTPClient.open
+    denied = {"/plugins/locked.jar"}
+
+    async def open_(self, path, *args, **kwargs):
+        if path in denied:
+            raise asyncssh.SFTPPermissionDenied("Permission denied")
+        return await real_open(self, path, *args, **kwargs)
+
+    monkeypatch.setattr(asyncssh.SFTPClient, "open", open_)
+    index = PluginIndex()
+    async with LocalSshServer(tmp_path) as srv:
+        infos, _ = await index.scan("/plugins", srv.target)
+        by_file = {p.file: p for p in infos}
+        assert by_file["EssentialsX.jar"].name == "Essentials"
+        assert by_file["locked.jar"].error == "Permission denied" and by_file["locked.jar"].name is None
+
+        denied.clear()  # fixed without a new mtime: the error was not cached
+        infos, _ = await index.scan("/plugins", srv.target)
+        await close_ssh_pool()
+    assert {p.file: p.name for p in infos}["locked.jar"] == "Locked"
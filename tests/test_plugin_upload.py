@@ -0,0 +1,66 @@
+import hashlib
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from tests.fake_sftp import LocalSshServer
+from utils.sftp_client import close_ssh_pool, upload_plugin_from_url
+
+pytestmark = pytest.mark.asyncio
+
+JAR = b"PK\x03\x04" + bytes(range(256)) * 1024  # ~256 KiB, several chunks
+
+
+@pytest_asyncio.fixture
+async def http_server():
+    async def jar(request):
+        return web.Response(body=JAR)
+
+    async def html(request):
+        return web.Response(body=b"<html>not found</html>")
+
+    app = web.Application()
+    app.router.add_get("/dl/Cool Plugin.jar", jar)
+    app.router.add_get("/dl/readme.txt", html)
+    app.router.add_get("/dl/fake.jar", html)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}"
+    await runner.cleanup()
+
+
+async def test_streams_into_place_with_hash_and_progress(tmp_path, http_server):
+    (tmp_path / "plugins").mkdir()
+    (tmp_path / "plugins" / "Cool Plugin.jar").write_bytes(b"old version")
+    seen = []
+
+    async def progress(done, total):
+        seen.append((done, total))
+
+    async with LocalSshServer(tmp_path) as srv:
+        up = await upload_plugin_from_url(f"{http_server}/dl/Cool%20Plugin.jar", "/plugins", srv.target,
+                                          progress=progress)
+        await close_ssh_pool()
+    assert up.name == "Cool Plugin.jar" and up.size == len(JAR)
+    assert up.sha256 == hashlib.sha256(JAR).hexdigest()
+    assert (tmp_path / "plugins" / "Cool Plugin.jar").read_bytes() == JAR
+    assert [p.name for p in (tmp_path / "plugins").iterdir()] == ["Cool Plugin.jar"]  # no temp left
+    assert seen[-1] == (len(JAR), len(JAR))
+
+
+async def test_rejects_oversized_and_non_jar_downloads(tmp_path, http_server):
+    (tmp_path / "plugins").mkdir()
+    async with LocalSshServer(tmp_path) as srv:
+        with pytest.raises(ValueError, match="limit"):
+            await upload_plugin_from_url(f"{http_server}/dl/Cool%20Plugin.jar", "/plugins", srv.target,
+                                         max_bytes=1024)
+        with pytest.raises(ValueError, match="not a jar"):
+            await upload_plugin_from_url(f"{http_server}/dl/fake.jar", "/plugins", srv.target)
+        with pytest.raises(ValueError, match=r"\.jar"):
+            await upload_plugin_from_url(f"{http_server}/dl/readme.txt", "/plugins", srv.target)
+        await close_ssh_pool()
+    assert list((tmp_path / "plugins").iterdir()) == []
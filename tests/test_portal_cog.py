@@ -0,0 +1,84 @@
+import discord
+import pytest
+
+from services import portal_cog
+from services.portal_cog import PortalCog
+
+pytestmark = pytest.mark.asyncio
+
+
+class MemoryStore:
+    def __init__(self, row=None):
+        self.row = row
+        self.saves = 0
+
+    async def load(self, channel_id):
+        return self.row
+
+    async def save(self, channel_id, message_id, content_hash):
+        self.saves += 1
+        self.row = (message_id, content_hash)
+
+
+class FakeChannel(discord.TextChannel):
+    def __init__(self):
+        self.id = 42
+        self.edits = []
+        self.sent = 0
+        self.scans = 0
+        self.missing = set()
+
+    def get_partial_message(self, message_id):
+        channel = self
+
+        class Partial:
+            id = message_id
+
+            async def edit(self, **kwargs):
+                if message_id in channel.missing:
+                    raise discord.NotFound(type("R", (), {"status": 404, "reason": "gone"})(), "Unknown Message")
+                channel.edits.append(message_id)
+
+        p = Partial()
+        p.channel = channel
+        return p
+
+    async def fetch_message(self, message_id):
+        raise AssertionError("the portal must not GET its message")
+
+    async def history(self, limit):
+        self.scans += 1
+        return
+        yield
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+        return type("M", (), {"id": 1000 + self.sent})()
+
+
+class FakeBot:
+    user = None
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def get_channel(self, _id):
+        return self.channel
+
+
+async def test_portal_edits_by_id_and_skips_identical_renders(monkeypatch):
+    monkeypatch.setattr(portal_cog, "rcon_health", lambda: {"state": "closed"})
+    ch = FakeChannel()
+    store = MemoryStore(row=(7, None))  # id remembered from before a restart
+    cog = PortalCog(FakeBot(ch), store=store)
+    info = {"online": 1, "max": 20, "players": ["Alice"]}
+
+    await cog._post_or_update_portal(live_info=info)
+    await cog._post_or_update_portal(live_info=info)
+    await cog._post_or_update_portal(live_info=dict(info, online=2, players=["Alice", "Bob"]))
+    assert ch.edits == [7, 7] and ch.sent == 0 and ch.scans == 0
+    assert cog.stats()["skipped"] == 1 and store.row[1] is not None
+
+    ch.missing.add(7)  # someone deleted the portal message
+    await cog._post_or_update_portal(live_info=info)
+    assert ch.sent == 1 and store.row[0] == 1001
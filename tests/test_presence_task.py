@@ -14,10 +14,12 @@ import types
 import pytest
 import discord
 from services.presence_task import setup_presence_tasks
+from services.status_service import StatusSnapshot
 
 pytestmark = pytest.mark.asyncio
 
 class StubVoice:
+    id = 1
     def __init__(self, name="old"): self.name = name
     async def edit(self, name): self.name = name
 
@@ -32,10 +34,10 @@ class StubBot:
     async def change_presence(self, **_): return None
 
 async def test_presence_updates(monkeypatch):
-    async def fake_status():
-        return {"online": 3, "max": 10, "players": [], "raw": ""}
+    async def fake_snapshot(**_):
+        return StatusSnapshot(online=3, max=10, players=(), fetched_at=0.0)
 
-    monkeypatch.setattr("services.presence_task.get_status", fake_status)
+    monkeypatch.setattr("services.presence_task.get_snapshot", fake_snapshot)
 
     bot = StubBot()
     setup_presence_tasks(bot)
@@ -43,3 +45,51 @@ async def test_presence_updates(monkeypatch):
     await asyncio.sleep(0.05)
     # stop further loops
     bot._closed = True
+
+
+class Clock:
+    def __init__(self): self.now = 1000.0
+    def __call__(self): return self.now
+
+
+class CountingBot(StubBot):
+    def __init__(self):
+        super().__init__()
+        self.presences = 0
+        self.renames = []
+        bot = self
+
+        class Voice(StubVoice):
+            async def edit(self, name):
+                bot.renames.append(name)
+                self.name = name
+        self._channel = Voice("MC 0/10")
+
+    async def change_presence(self, **_):
+        self.presences += 1
+
+
+async def test_publisher_sends_only_changes_within_rename_budget():
+    from services.presence_task import PresencePublisher, RenameBudget
+
+    clock = Clock()
+    bot = CountingBot()
+    pub = PresencePublisher(bot, {1: "MC {online}/{max}"}, budget=RenameBudget(2, 600, clock))
+
+    await pub.publish({"online": 0, "max": 10})
+    await pub.publish({"online": 0, "max": 10})
+    assert (bot.presences, bot.renames) == (1, [])  # channel already had the right name
+
+    for online in (1, 2, 3, 4, 5):
+        await pub.publish({"online": online, "max": 10})
+        clock.now += 10
+    assert bot.renames == ["MC 1/10", "MC 2/10"]  # budget spent; only the newest value waits
+    assert pub.stats()["pending_renames"] == {1: "MC 5/10"}
+    assert 0 < pub.next_due() <= 600
+
+    clock.now += pub.next_due()
+    await pub.publish({"online": 5, "max": 10})
+    assert bot.renames == ["MC 1/10", "MC 2/10", "MC 5/10"]
+    s = pub.stats()
+    assert (s["presence_sent"], s["presence_skipped"]) == (6, 2)
+    assert (s["renames_sent"], s["renames_deferred"], s["renames_superseded"]) == (3, 1, 2)
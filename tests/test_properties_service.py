@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from exceptions import PropertiesConflict
+from services.properties_service import PropertiesService, parse_properties
+from tests.fake_sftp import LocalSshServer
+from utils.sftp_client import close_ssh_pool
+
+PROPS = "#Minecraft server properties\n#Fri Oct 16 08:00:00 UTC 2026\nmotd=A Minecraft Server\nmax-players=20\npvp=true\n"
+OLD = 1_000_000
+
+
+def _write(tmp_path, text=PROPS, mtime=OLD):
+    path = tmp_path / "server.properties"
+    path.write_text(text)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_parse_keeps_comments_and_order():
+    doc = parse_properties(PROPS)
+    assert list(doc.values) == ["motd", "max-players", "pvp"]
+    assert doc.comments == PROPS.splitlines()[:2]
+    assert doc.render({"max-players": "50", "spawn-protection": "0"}) == PROPS.replace("max-players=20", "max-players=50") + "spawn-protection=0\n"
+
+
+@pytest.mark.asyncio
+async def test_reads_are_cached_until_the_file_changes(tmp_path):
+    _write(tmp_path)
+    svc = PropertiesService()
+    async with LocalSshServer(tmp_path) as srv:
+        assert (await svc.get("/server.properties", srv.target)).get("motd") == "A Minecraft Server"
+        await svc.get("/server.properties", srv.target)
+        assert svc.stats()["reads"] == 1 and svc.stats()["hits"] == 1
+
+        _write(tmp_path, PROPS.replace("20", "30"), OLD + 60)
+        assert (await svc.get("/server.properties", srv.target)).get("max-players") == "30"
+        assert svc.stats()["reads"] == 2
+        await close_ssh_pool()
+
+
+@pytest.mark.asyncio
+async def test_edit_writes_a_diff_and_skips_no_ops(tmp_path):
+    path = _write(tmp_path)
+    svc = PropertiesService()
+    async with LocalSshServer(tmp_path) as srv:
+        assert await svc.edit({"pvp": "true"}, "/server.properties", srv.target) == {}
+        assert os.stat(path).st_mtime == OLD  # not even rewritten
+
+        changed = await svc.edit({"pvp": "false", "motd": "A Minecraft Server"}, "/server.properties", srv.target)
+        await close_ssh_pool()
+    assert changed == {"pvp": ("true", "false")}
+    assert path.read_text() == PROPS.replace("pvp=true", "pvp=false")
+    assert [p.name for p in tmp_path.iterdir()] == ["server.properties"]  # temp file renamed away
+    assert svc.stats()["writes"] == 1 and svc.stats()["unchanged"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_change_is_a_conflict(tmp_path):
+    path = _write(tmp_path)
+    svc = PropertiesService()
+    write_temp = svc._write_temp
+
+    async def someone_else_edits_meanwhile(sftp, tmp, data, like):
+        await write_temp(sftp, tmp, data, like)
+        _write(tmp_path, PROPS.replace("20", "99"), OLD + 60)
+
+    svc._write_temp = someone_else_edits_meanwhile
+    async with LocalSshServer(tmp_path) as srv:
+        with pytest.raises(PropertiesConflict):
+            await svc.edit({"pvp": "false"}, "/server.properties", srv.target)
+        await close_ssh_pool()
+    assert path.read_text() == PROPS.replace("20", "99")  # their edit survives
+    assert [p.name for p in tmp_path.iterdir()] == ["server.properties"]
+    assert svc.stats()["conflicts"] == 1
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from exceptions import RconError
+from tests.fake_rcon import FakeRconServer
+from utils.rcon_client import RconPool, get_status, mc_cmd_many
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_commands_reuse_one_connection():
+    async with FakeRconServer() as srv:
+        pool = RconPool(srv.host, srv.port, srv.password, scheduler=None)
+        assert (await get_status(pool=pool))["players"] == ["Alice", "Bob"]
+        results = await mc_cmd_many(["echo a", "echo b"], pool=pool)
+        assert [r.output for r in results] == ["a", "b"]
+        assert srv.stats["connections"] == 1
+        await pool.close()
+
+
+async def test_dropped_connections():
+    async with FakeRconServer() as srv:
+        pool = RconPool(srv.host, srv.port, srv.password, scheduler=None)
+        await pool.run("echo 1")
+        srv.drop_connections()  # server restart between commands: reconnect transparently
+        assert await pool.run("echo 2") == "2"
+        assert srv.stats["connections"] == 2
+        assert pool.stats()["discarded"] == 1 and pool.stats()["open"] == 1
+
+        srv.drop_every = 1  # server hangs up mid-command
+        with pytest.raises(RconError):
+            await pool.run("echo 3")
+        await pool.close()
+
+
+async def test_idle_connection_is_pinged_and_replaced_when_dead():
+    async with FakeRconServer() as srv:
+        pool = RconPool(srv.host, srv.port, srv.password, keepalive=0, scheduler=None)
+        await pool.run("echo 1")
+        assert await pool.run("echo 2") == "2"
+        assert pool.stats()["pings"] == 1 and srv.stats["connections"] == 1
+        assert srv.stats["commands"] == 2  # a ping runs nothing on the server
+
+        srv.drop_connections()
+        assert await pool.run("echo 3") == "3"
+        assert srv.stats["connections"] == 2 and pool.stats()["errors"] == 0
+        await pool.close()
+
+
+async def test_dns_lookup_is_cached_across_reconnects():
+    async with FakeRconServer() as srv:
+        pool = RconPool(srv.host, srv.port, srv.password, scheduler=None)
+        for i in range(3):
+            assert await pool.run(f"echo {i}") == str(i)
+            srv.drop_connections()
+        assert srv.stats["connections"] == 3
+        assert pool.stats()["dns_lookups"] == 1 and pool.stats()["resolved_ip"] == srv.host
+        await pool.close()
+
+        uncached = RconPool(srv.host, srv.port, srv.password, dns_ttl=0, scheduler=None)
+        await uncached.run("echo a")
+        srv.drop_connections()
+        await uncached.run("echo b")
+        assert uncached.stats()["dns_lookups"] == 2
+        await uncached.close()
+
+
+def _recording(srv, fail: set[str]):
+    ran = []
+
+    def handler(cmd):
+        ran.append(cmd)
+        if cmd in fail:
+            raise RuntimeError(cmd)
+        return srv.default_output(cmd)
+
+    return ran, handler
+
+
+async def test_run_many_unordered_fans_out_across_sessions():
+    async with FakeRconServer(latency=0.02) as srv:
+        pool = RconPool(srv.host, srv.port, srv.password, size=4, scheduler=None)
+        results = await pool.run_many([f"echo {i}" for i in range(4)], ordered=False)
+        assert [r.output for r in results] == ["0", "1", "2", "3"]  # input order, whatever the finish order
+        assert srv.stats["peak_open"] == 4
+        assert all(r.ok and r.elapsed_ms >= 20 for r in results)
+        await pool.close()
+
+
+async def test_run_many_stop_on_error_leaves_the_tail_unexecuted():
+    async with FakeRconServer() as srv:
+        ran, srv.handler = _recording(srv, fail={"boom"})
+        pool = RconPool(srv.host, srv.port, srv.password, scheduler=None)
+        results = await pool.run_many(["echo a", "boom", "echo c", "echo d"], stop_on_error=True)
+        assert [r.ok for r in results] == [True, False, False, False]
+        assert isinstance(results[1].error, RconError)
+        assert all("skipped" in str(r.error) for r in results[2:])
+        assert "echo c" not in ran and "echo d" not in ran
+
+        ran.clear()
+        results = await pool.run_many(["boom", "echo c"])  # without it, the rest still runs
+        assert [r.ok for r in results] == [False, True] and ran[-1] == "echo c"
+        await pool.close()
+
+
+async def test_run_many_timeout_is_reported_per_command():
+    async with FakeRconServer(latency=0.2) as srv:
+        pool = RconPool(srv.host, srv.port, srv.password, scheduler=None)
+        results = await mc_cmd_many(["echo slow"], pool=pool, timeout=0.05)
+        (r,) = results
+        assert isinstance(r.error, asyncio.TimeoutError) and r.output is None
+        assert 50 <= r.elapsed_ms < 200
+        await pool.close()
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from exceptions import RconAuthError
+from tests.bench_rcon import run_benchmark
+from tests.fake_rcon import FakeRconServer
+from utils.rcon_client import RconPool
+from utils.rcon_protocol import (FRAGMENT_SIZE, TYPE_AUTH_RESPONSE, TYPE_COMMAND, TYPE_RESPONSE, RconConnection,
+                                 encode_packet, read_packet)
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_multi_packet_responses_are_reassembled():
+    async with FakeRconServer() as srv:
+        pool = RconPool(srv.host, srv.port, srv.password, scheduler=None)
+        assert len(await pool.run("big 10000")) == 10000
+        assert len(await pool.run("big 4096")) == 4096  # exactly one full fragment
+        assert await pool.run("echo after") == "after"  # stream still in sync
+        assert srv.stats["fragments"] == 3 + 1 + 1
+        await pool.close()
+
+
+async def test_fragments_are_reassembled_on_one_connection():
+    async with FakeRconServer() as srv:
+        conn = await RconConnection.open(srv.host, srv.port, srv.password)
+        out, short = await asyncio.gather(conn.command("big 10000"), conn.command("echo tail"))
+        assert len(out) == 10000 and short == "tail"
+        assert await conn.command(f"big {FRAGMENT_SIZE * 2}") == "x" * FRAGMENT_SIZE * 2  # ends on a full fragment
+        conn.close()
+        await conn.wait_closed()
+
+
+async def _scripted_server(script):
+    """Raw server: answers the login, then lets `script(reader, writer)` answer commands in any order."""
+    async def handle(reader, writer):
+        rid, _, _ = await read_packet(reader)
+        writer.write(encode_packet(rid, TYPE_AUTH_RESPONSE, b""))
+        try:
+            await script(reader, writer)
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def test_out_of_order_and_late_replies_are_matched_by_id():
+    async def script(reader, writer):
+        packets = [await read_packet(reader) for _ in range(3)]
+        assert all(ptype == TYPE_COMMAND for _, ptype, _ in packets)
+        (a, _, _), (b, _, _), (c, _, _) = packets
+        # answer newest first; `slow` (a) only after its caller gave up
+        writer.write(encode_packet(c, TYPE_RESPONSE, b"C"))
+        writer.write(encode_packet(b, TYPE_RESPONSE, b"B"))
+        await writer.drain()
+        await asyncio.sleep(0.1)
+        writer.write(encode_packet(a, TYPE_RESPONSE, b"A (late)"))
+        d, _, _ = await read_packet(reader)
+        writer.write(encode_packet(d, TYPE_RESPONSE, b"D"))
+        await writer.drain()
+        await reader.read()
+
+    server = await _scripted_server(script)
+    port = server.sockets[0].getsockname()[1]
+    conn = await RconConnection.open("127.0.0.1", port, "pw")
+    slow = asyncio.create_task(conn.command("slow", timeout=0.05))
+    await asyncio.sleep(0)
+    b, c = await asyncio.gather(conn.command("b"), conn.command("c"))
+    assert (b, c) == ("B", "C")
+    with pytest.raises(asyncio.TimeoutError):
+        await slow
+    await asyncio.sleep(0.1)  # the late reply arrives and is dropped
+    assert await conn.command("d") == "D" and conn.inflight == 0
+    conn.close()
+    await conn.wait_closed()
+    server.close()
+    await server.wait_closed()
+
+
+async def test_auth_failure():
+    async with FakeRconServer(reject_auth=True) as srv:
+        pool = RconPool(srv.host, srv.port, srv.password, scheduler=None)
+        with pytest.raises(RconAuthError):
+            await pool.run("list")
+
+
+async def test_benchmark_smoke():
+    rows = await run_benchmark((1, 8), calls=3)
+    assert {r["scenario"] for r in rows} == {"mc_cmd", "get_status", "snapshot", "batch5"}
+    assert all(r["errors"] == 0 and r["cmds_per_s"] > 0 and r["peak"] <= 4 for r in rows)
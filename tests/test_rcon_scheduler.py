@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from exceptions import RconBusy
+from utils.rcon_scheduler import RconScheduler
+from utils.scheduling import Priority
+
+pytestmark = pytest.mark.asyncio
+
+async def test_admin_jumps_background_queue():
+    sched = RconScheduler(max_inflight=1, queue_limits={p: 10 for p in Priority})
+    order: list[str] = []
+    gate = asyncio.Event()
+
+    async def job(name: str, prio: Priority, hold: bool = False):
+        async with sched.slot(prio):
+            order.append(name)
+            if hold:
+                await gate.wait()
+
+    first = asyncio.create_task(job("poll-0", Priority.BACKGROUND, hold=True))
+    await asyncio.sleep(0)
+    polls = [asyncio.create_task(job(f"poll-{i}", Priority.BACKGROUND)) for i in range(1, 4)]
+    await asyncio.sleep(0)
+    admin = asyncio.create_task(job("ban", Priority.ADMIN))
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(first, admin, *polls)
+
+    assert order[:2] == ["poll-0", "ban"]
+    assert sched.stats()["in_flight"] == 0
+
+async def test_full_class_queue_rejects():
+    sched = RconScheduler(max_inflight=1, queue_limits={Priority.ADMIN: 5, Priority.USER: 5, Priority.BACKGROUND: 1})
+    await sched.acquire(Priority.USER)
+    queued = asyncio.create_task(sched.acquire(Priority.BACKGROUND))
+    await asyncio.sleep(0)
+    with pytest.raises(RconBusy):
+        await sched.acquire(Priority.BACKGROUND)
+    sched.release()
+    await queued
+    sched.release()
+    assert sched.stats()["background"]["rejected"] == 1
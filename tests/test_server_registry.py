@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy.exc import ProgrammingError
+
+from exceptions import RconError, UnknownServer
+from services import minecraft_cog, server_registry
+from services.server_registry import ManagedServer, ServerRegistry
+from utils.rcon_client import CmdResult
+
+pytestmark = pytest.mark.asyncio
+
+
+class StubPool:
+    def __init__(self, out=None, err=None):
+        self.out, self.err = out, err
+
+    async def run_many(self, cmds, **_):
+        return [CmdResult(cmd=cmds[0], output=self.out, error=self.err)]
+
+
+def _server(name, **pool):
+    return ManagedServer(name=name, rcon=StubPool(**pool), sftp=None, status=None,
+                         properties_path="/p", plugins_dir="/d")
+
+
+@pytest.fixture
+def reg(monkeypatch):
+    r = ServerRegistry()
+    r._servers = {"lobby": _server("Lobby", out="ok"), "survival": _server("Survival", err=RconError("down"))}
+    r._default = r._servers["lobby"]
+    monkeypatch.setattr(minecraft_cog, "registry", r)
+    return r
+
+
+async def test_get_by_name_and_default(reg):
+    assert reg.get().name == "Lobby"
+    assert reg.get(" SURVIVAL ").name == "Survival"
+    with pytest.raises(UnknownServer):
+        reg.get("creative")
+
+
+async def test_all_fans_out_and_labels_each_server(reg):
+    out = await minecraft_cog._mc("all", "say hi")
+    assert out.splitlines() == ["[Lobby] ok", "[Survival] error: down"]
+
+
+async def test_schema_mismatch_is_reported_not_mistaken_for_no_servers(reg, monkeypatch, caplog):
+    class BrokenSession:
+        async def __aenter__(self):
+            raise ProgrammingError("SELECT server.rcon_password …", {}, Exception("UndefinedColumn"))
+
+        async def __aexit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(server_registry, "async_session_maker", BrokenSession)
+    await reg.load()
+    assert reg.names() == ["Lobby", "Survival"]  # unchanged
+    assert any(r.levelname == "ERROR" and "does not match the model" in r.message for r in caplog.records)
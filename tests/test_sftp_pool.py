@@ -0,0 +1,91 @@
+import asyncio
+import os
+
+import asyncssh
+import pytest
+
+from tests.fake_sftp import LocalSshServer
+from utils.sftp_client import SshPool, close_ssh_pool, list_plugins
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_channels_share_one_connection(tmp_path):
+    (tmp_path / "server.properties").write_text("motd=hi\n")
+    pool = SshPool(size=2, channels=4, idle=60)
+    async with LocalSshServer(tmp_path) as srv:
+        async def read():
+            async with pool.sftp(srv.target) as sftp:
+                async with await sftp.open("/server.properties", "r") as f:
+                    return await f.read()
+
+        assert await asyncio.gather(*[read() for _ in range(4)]) == ["motd=hi\n"] * 4
+        assert await read() == "motd=hi\n"
+        assert srv.connections == 1
+        assert pool.stats()["channels_reused"] >= 1
+        await pool.close()
+
+
+async def test_sftp_errors_keep_the_channel(tmp_path):
+    pool = SshPool(size=1, channels=2, idle=60)
+    async with LocalSshServer(tmp_path) as srv:
+        with pytest.raises(asyncssh.SFTPNoSuchFile):
+            async with pool.sftp(srv.target) as sftp:
+                await sftp.stat("/missing")
+        async with pool.sftp(srv.target) as sftp:
+            assert await sftp.listdir("/") is not None
+        assert pool.stats()["channels_opened"] == 1
+        await pool.close()
+
+
+async def test_reconnects_after_server_drop(tmp_path):
+    pool = SshPool(size=1, channels=2, idle=60)
+    async with LocalSshServer(tmp_path) as srv:
+        async with pool.sftp(srv.target) as sftp:
+            await sftp.listdir("/")
+        srv.drop_connections()
+        await asyncio.sleep(0.05)
+        async with pool.sftp(srv.target) as sftp:
+            await sftp.listdir("/")
+        assert srv.connections == 2
+        await pool.close()
+
+
+async def test_idle_connections_are_evicted(tmp_path):
+    pool = SshPool(size=1, channels=2, idle=0.05)
+    async with LocalSshServer(tmp_path) as srv:
+        async with pool.sftp(srv.target) as sftp:
+            await sftp.listdir("/")
+        await asyncio.sleep(0.2)
+        assert pool.stats()["evicted"] == 1
+        assert pool.stats()["targets"][f"mc@127.0.0.1:{srv.target.port}"]["open"] == 0
+        await pool.close()
+
+
+async def test_list_plugins_uses_readdir_and_caches_by_dir_mtime(tmp_path, monkeypatch):
+    plugins = tmp_path / "plugins"
+    (plugins / "Essentials").mkdir(parents=True)
+    (plugins / "b.jar").write_bytes(b"PK")
+    (plugins / "A.jar").write_bytes(b"PK")
+    os.utime(plugins, (1_000_000, 1_000_000))
+    calls = {"readdir": 0, "stat": 0}
+    for name in calls:
+        orig = getattr(asyncssh.SFTPClient, name)
+
+        def counting(self, *a, _orig=orig, _name=name, **k):
+            calls[_name] += 1
+            return _orig(self, *a, **k)
+
+        monkeypatch.setattr(asyncssh.SFTPClient, name, counting)
+
+    async with LocalSshServer(tmp_path) as srv:
+        expected = ["A.jar", "b.jar", "Essentials/"]
+        assert await list_plugins("/plugins", srv.target) == expected
+        assert await list_plugins("/plugins", srv.target) == expected
+        assert calls == {"readdir": 1, "stat": 2}  # one dir stat per call, no per-entry stats
+
+        (plugins / "c.jar").write_bytes(b"PK")
+        os.utime(plugins, (1_000_100, 1_000_100))
+        assert await list_plugins("/plugins", srv.target) == ["A.jar", "b.jar", "c.jar", "Essentials/"]
+        assert calls["readdir"] == 2
+        await close_ssh_pool()
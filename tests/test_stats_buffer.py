@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from models.models_game import PlayerStats
+from services.stats_buffer import StatsDeltaBuffer
+
+class FakeDb:
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    async def write(self, rows):
+        if self.fail:
+            raise ConnectionError("db down")
+        self.batches.append(sorted(rows, key=lambda r: r["player"]))
+
+
+@pytest.mark.asyncio
+async def test_increments_coalesce_per_player_and_survive_errors():
+    db = FakeDb()
+    buf = StatsDeltaBuffer(flush_every=3600, max_players=100, write=db.write)
+    for _ in range(5):
+        buf.add("Alice", kills=1)
+    buf.add("Bob", deaths=1, playtime=0.25)
+    db.fail = True
+    await buf.flush()
+    buf.add("Alice", kills=1, playtime=0.5)
+    assert buf.stats()["errors"] == 1 and buf.stats()["pending_players"] == 2
+    db.fail = False
+    await buf.close()
+    assert db.batches == [[{"player": "Alice", "kills": 6, "deaths": 0, "playtime_hours": 0.5},
+                           {"player": "Bob", "kills": 0, "deaths": 1, "playtime_hours": 0.25}]]
+    assert buf.stats() == {"pending_players": 0, "increments": 7, "flushes": 1, "rows_written": 2, "errors": 1}
+
+
+@pytest.mark.asyncio
+async def test_size_threshold_flushes_early():
+    db = FakeDb()
+    buf = StatsDeltaBuffer(flush_every=3600, max_players=3, write=db.write)
+    for name in ("A", "B", "C"):
+        buf.add(name, kills=1)
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert [len(b) for b in db.batches] == [3]
+
+
+def test_increment_statement_adds_to_stored_values():
+    sql = str(PlayerStats._increment_stmt([{"player": "A", "kills": 1, "deaths": 0, "playtime_hours": 0.0}])
+              .compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (player) DO UPDATE SET kills = (player_stats.kills + excluded.kills)" in sql
+    assert "playtime_hours = (player_stats.playtime_hours + excluded.playtime_hours)" in sql
+
+
+@pytest.mark.asyncio
+async def test_close_during_a_timer_flush_loses_nothing():
+    written = []
+
+    async def slow_write(rows):
+        await asyncio.sleep(0.2)
+        written.extend(rows)
+
+    buf = StatsDeltaBuffer(flush_every=0.05, max_players=100, write=slow_write)
+    buf.start()
+    buf.add("Alice", kills=5)
+    await asyncio.sleep(0.1)  # the timer's flush is inside the write now
+    buf.add("Bob", deaths=1)
+    await buf.close()
+    assert sorted((r["player"], r["kills"], r["deaths"]) for r in written) == [("Alice", 5, 0), ("Bob", 0, 1)]
+    assert buf.stats()["pending_players"] == 0 and buf.stats()["rows_written"] == 2
+
+
+@pytest.mark.asyncio
+async def test_a_cancelled_write_keeps_its_increments():
+    async def hanging_write(rows):
+        await asyncio.sleep(10)
+
+    buf = StatsDeltaBuffer(flush_every=3600, max_players=100, write=hanging_write)
+    buf.add("Alice", kills=2)
+    task = asyncio.create_task(buf.flush())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert buf.stats()["pending_players"] == 1
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from services.status_service import StatusService
+
+pytestmark = pytest.mark.asyncio
+
+async def test_concurrent_refreshes_share_one_fetch():
+    calls = 0
+
+    async def fake_status(**_):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"online": 2, "max": 20, "players": ["Alice", "Bob"], "raw": "ok"}
+
+    svc = StatusService(fetch=fake_status)
+    snaps = await asyncio.gather(*[svc.get(max_age=0) for _ in range(50)])
+    assert calls == 1
+    assert all(s is snaps[0] for s in snaps)
+    assert snaps[0].players == ("Alice", "Bob")
+
+async def test_max_age_controls_staleness():
+    calls = 0
+
+    async def fake_status(**_):
+        nonlocal calls
+        calls += 1
+        return {"online": calls, "max": 20, "players": [], "raw": ""}
+
+    svc = StatusService(fetch=fake_status)
+    first = await svc.get(max_age=60)
+    assert (await svc.get(max_age=60)) is first
+    assert (await svc.get(max_age=-1)).online == 2
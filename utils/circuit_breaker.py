@@ -0,0 +1,103 @@
+# utils/circuit_breaker.py
+from __future__ import annotations
+import time
+from datetime import datetime, timezone
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    closed    -> calls go through; `failure_threshold` consecutive failures open the breaker.
+    open      -> calls are rejected immediately until the backoff expires.
+    half_open -> exactly one probe call is let through; success closes the breaker,
+                 failure re-opens it with the backoff doubled (capped at `max_backoff`).
+
+    State only changes when someone asks, so there are no timers to clean up.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_after: float = 5.0, max_backoff: float = 120.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_after = reset_after
+        self.max_backoff = max(reset_after, max_backoff)
+        self._state = CLOSED
+        self._failures = 0
+        self._backoff = reset_after
+        self._retry_at = 0.0
+        self._down_since: float | None = None  # wall clock, for humans
+        self._probing = False
+        self._last_error: str | None = None
+        self._stats = {"rejected": 0, "opened": 0, "probes": 0}
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() >= self._retry_at:
+            self._state = HALF_OPEN
+        return self._state
+
+    @property
+    def down_since(self) -> float | None:
+        return self._down_since
+
+    def allow(self) -> bool:
+        st = self.state
+        if st == CLOSED:
+            return True
+        if st == HALF_OPEN and not self._probing:
+            self._probing = True
+            self._stats["probes"] += 1
+            return True
+        self._stats["rejected"] += 1
+        return False
+
+    def record_success(self) -> None:
+        self._state = CLOSED
+        self._failures = 0
+        self._backoff = self.reset_after
+        self._down_since = None
+        self._probing = False
+        self._last_error = None
+
+    def record_failure(self, error: BaseException | str | None = None) -> None:
+        self._failures += 1
+        if error is not None:
+            self._last_error = str(error) or type(error).__name__
+        if self._state == HALF_OPEN:
+            self._open(min(self._backoff * 2, self.max_backoff))
+        elif self._state == CLOSED and self._failures >= self.failure_threshold:
+            self._open(self.reset_after)
+        self._probing = False
+
+    def release(self) -> None:
+        """The allowed call ended without a verdict (e.g. cancelled); free the probe slot."""
+        self._probing = False
+
+    def _open(self, backoff: float) -> None:
+        self._state = OPEN
+        self._backoff = backoff
+        self._retry_at = time.monotonic() + backoff
+        if self._down_since is None:
+            self._down_since = time.time()
+            self._stats["opened"] += 1
+
+    def describe(self, what: str = "Server") -> str:
+        since = self._down_since
+        when = datetime.fromtimestamp(since, timezone.utc).strftime("%H:%M:%S UTC") if since else "?"
+        retry_in = max(0.0, self._retry_at - time.monotonic())
+        msg = f"{what} offline since {when} (next check in {retry_in:.0f}s)"
+        return f"{msg}: {self._last_error}" if self._last_error else msg
+
+    def snapshot(self) -> dict:
+        st = self.state
+        return {
+            "state": st,
+            "consecutive_failures": self._failures,
+            "down_since": (
+                datetime.fromtimestamp(self._down_since, timezone.utc).isoformat() if self._down_since else None
+            ),
+            "retry_in_s": round(max(0.0, self._retry_at - time.monotonic()), 1) if st == OPEN else 0.0,
+            "last_error": self._last_error,
+            **self._stats,
+        }
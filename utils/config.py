@@ -9,26 +9,64 @@ class Settings(BaseSettings):
     DISCORD_SERVER_MOD_ROLE_IDS: str = ""
     DISCORD_ALERT_CHANNEL_ID: int
     DISCORD_VOICE_CHANNEL_ID: int
+    MC_STATUS_VOICE_CHANNEL_ID: int = 0  # optional second status channel ("MC Online: X/Y")
     DISCORD_COMMAND_PREFIX: str = "!"
     DISCORD_MC_CHAT_CHANNEL_ID: int = 0  # channel to forward MC chat into
+    # outbound REST calls the bot makes on its own (posts, edits, renames) in flight at once
+    DISCORD_REST_MAX_INFLIGHT: int = 4
+    # rate-limit waits longer than this are handed back to the scheduler (discord.py minimum: 30)
+    DISCORD_MAX_RATELIMIT_WAIT_SECONDS: float = 30
 
     # RCON
     # Optional RCON keepalive
     RCON_KEEPALIVE_SECONDS: int = 30
+    RCON_POOL_SIZE: int = 4
+    RCON_PIPELINE_DEPTH: int = 1  # commands in flight per socket; vanilla only handles 1
+    RCON_CONNECT_TIMEOUT: int = 5
+    RCON_CMD_TIMEOUT: int = 8
+    RCON_DNS_TTL_SECONDS: int = 300
+    # Global RCON gate: commands in flight across all sockets + per-priority queue limits
+    RCON_MAX_INFLIGHT: int = 4
+    RCON_QUEUE_LIMIT_ADMIN: int = 100
+    RCON_QUEUE_LIMIT_USER: int = 50
+    RCON_QUEUE_LIMIT_BACKGROUND: int = 10
+    # Circuit breaker: open after N consecutive failures, probe again after a doubling backoff
+    RCON_BREAKER_FAILURES: int = 3
+    RCON_BREAKER_RESET_SECONDS: int = 5
+    RCON_BREAKER_MAX_BACKOFF_SECONDS: int = 120
     MC_RCON_HOST: str = "s450618-zn4kp.spot.gs"
     MC_RCON_PORT: int = 31096
     MC_RCON_PASSWORD: str
     MC_SERVER_NAME: str = "VŠB Minecraft"
     MC_LOG_PATH: str = "/path/to/server/logs/latest.log"
+    CHAT_BRIDGE_MODE: str = "auto"  # auto | stream (tail -f over SSH exec) | poll (SFTP)
+    CHAT_BRIDGE_CATCHUP_MAX_LINES: int = 200  # replayed after a restart/rotation; 0 = start at EOF
+    CHAT_BRIDGE_CHECKPOINT_SECONDS: int = 10
+    CHAT_BRIDGE_FLUSH_SECONDS: float = 1.0  # lines arriving within this window share one Discord message
+    CHAT_BRIDGE_QUEUE_MAX_LINES: int = 500  # beyond this the oldest queued lines are skipped (with a marker)
+    # Discord -> Minecraft (tellraw) relay for DISCORD_MC_CHAT_CHANNEL_ID
+    CHAT_RELAY_FLUSH_SECONDS: float = 0.5
+    CHAT_RELAY_MAX_RCON_PER_SECOND: float = 2
+    CHAT_RELAY_USER_MESSAGES: int = 3  # per user per CHAT_RELAY_USER_SECONDS
+    CHAT_RELAY_USER_SECONDS: int = 10
+    # Chat/event archive (/logsearch)
+    LOG_ARCHIVE_FLUSH_SECONDS: float = 5  # buffered events are inserted in one batch this often
+    LOG_ARCHIVE_BATCH: int = 200
+    MC_LOG_TIMEZONE: str = "UTC"  # timezone of the [HH:MM:SS] stamps in the server log
 
     # SFTP
     SFTP_HOST: str
     SFTP_PORT: int = 22
     SFTP_USERNAME: str
     SFTP_PASSWORD: str
+    SSH_POOL_SIZE: int = 2
+    SSH_MAX_CHANNELS: int = 8
+    SSH_IDLE_SECONDS: int = 300
+    SSH_CONNECT_TIMEOUT: int = 10
     MC_SERVER_DIR: str
     MC_PROPERTIES_PATH: str
     MC_PLUGINS_DIR: str
+    PLUGIN_MAX_MB: int = 100  # /plugin refuses bigger downloads
     
 
     # DB
@@ -40,8 +78,23 @@ class Settings(BaseSettings):
 
     # App
     APP_ENV: str = "dev"
+    GAME_EVENT_TOKEN: str = ""  # Bearer token for the /game/* API used by the game plugin (empty = API off)
+    # stat increments (*_delta) are summed in memory and written this often, or once this many players are pending
+    STATS_FLUSH_SECONDS: float = 10
+    STATS_FLUSH_MAX_PLAYERS: int = 500
+    LEADERBOARD_SIZE: int = 100  # players per metric kept in memory for /leaderboard
     LOG_LEVEL: str = "INFO"
     POLL_INTERVAL_SECONDS: int = 15
+    # how old a cached server status may be when a user clicks "Server Info" & co.
+    STATUS_INTERACTIVE_MAX_AGE_SECONDS: int = 5
+    # while the chat bridge is reading the log, join/leave keep the player list current and
+    # `list` only runs this often to reconcile
+    STATUS_RECONCILE_SECONDS: int = 300
+    # presence/voice channel names: bursts of changes settle for this long before publishing
+    PRESENCE_DEBOUNCE_SECONDS: float = 3
+    # Discord allows 2 renames per channel per 10 minutes; newer names wait for the budget
+    CHANNEL_RENAME_LIMIT: int = 2
+    CHANNEL_RENAME_WINDOW_SECONDS: int = 600
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
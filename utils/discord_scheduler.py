@@ -0,0 +1,204 @@
+# utils/discord_scheduler.py
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+import discord
+
+from utils.config import settings
+from utils.scheduling import ClassStats, Priority
+
+log = logging.getLogger(__name__)
+
+Call = Callable[[], Awaitable[Any]]
+
+
+class _Job:
+    __slots__ = ("route", "key", "call", "priority", "futures", "queued_at", "attempts")
+
+    def __init__(self, route: str, key: str | None, call: Call, priority: Priority):
+        self.route = route
+        self.key = key
+        self.call = call
+        self.priority = priority
+        self.futures: list[asyncio.Future] = []
+        self.queued_at = time.perf_counter()
+        self.attempts = 0
+
+
+class DiscordScheduler:
+    """
+    Single outbound queue for bot-initiated Discord REST calls (posts, edits, renames, roles).
+
+    Jobs name a `route` (the rate-limit bucket they hit, e.g. "channel:123") and run at most
+    one at a time per route, `max_inflight` overall, most important priority class first, so
+    a user-triggered post never waits behind a burst of background edits and one hot bucket
+    cannot occupy every slot. A job with a `key` (e.g. "edit:<message id>") that is still
+    queued is replaced by a newer one with the same key: only the latest edit is sent and
+    every caller gets its result. A route that hit a long rate limit cools down for
+    `retry_after` and its job is queued again instead of holding a slot while discord.py sleeps.
+
+    Interaction responses stay direct: they use the interaction's own webhook bucket and must
+    be answered within 3 seconds.
+    """
+
+    def __init__(self, max_inflight: int = 4, max_attempts: int = 3):
+        self.max_inflight = max(1, max_inflight)
+        self.max_attempts = max(1, max_attempts)
+        self._queues: dict[Priority, deque[_Job]] = {p: deque() for p in Priority}
+        self._by_key: dict[str, _Job] = {}
+        self._busy: set[str] = set()
+        self._cooldown: dict[str, float] = {}  # route -> monotonic time it may be used again
+        self._inflight = 0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._stats = {p: ClassStats() for p in Priority}
+        self._counters = {"coalesced": 0, "rate_limited": 0, "errors": 0}
+
+    def submit(self, route: str, call: Call, priority: Priority = Priority.BACKGROUND,
+               key: str | None = None) -> asyncio.Future:
+        self._stats[priority].submitted += 1
+        fut = asyncio.get_running_loop().create_future()
+        job = self._by_key.get(key) if key else None
+        if job is not None:
+            job.call = call  # superseded: the queued job now sends the newest payload
+            job.futures.append(fut)
+            self._counters["coalesced"] += 1
+            if priority < job.priority:
+                self._queues[job.priority].remove(job)
+                self._queues[priority].append(job)
+                job.priority = priority
+        else:
+            job = _Job(route, key, call, priority)
+            job.futures.append(fut)
+            self._queues[priority].append(job)
+            if key:
+                self._by_key[key] = job
+        self._wake()
+        return fut
+
+    async def run(self, route: str, call: Call, priority: Priority = Priority.BACKGROUND, key: str | None = None):
+        return await self.submit(route, call, priority, key)
+
+    def _wake(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()  # the dispatcher exits when idle; a new one gets a fresh event
+            self._task = asyncio.create_task(self._dispatch())
+        self._wakeup.set()
+
+    def _next_job(self, now: float) -> tuple[_Job | None, float | None]:
+        """Most important runnable job, or (None, seconds until a cooling route frees up)."""
+        soonest: float | None = None
+        for p in Priority:
+            for job in self._queues[p]:
+                if job.route in self._busy:
+                    continue
+                until = self._cooldown.get(job.route, 0.0)
+                if until > now:
+                    soonest = until - now if soonest is None else min(soonest, until - now)
+                    continue
+                self._queues[p].remove(job)
+                return job, None
+        return None, soonest
+
+    async def _dispatch(self) -> None:
+        while True:
+            self._wakeup.clear()
+            wait: float | None = None
+            while self._inflight < self.max_inflight:
+                job, wait = self._next_job(time.monotonic())
+                if job is None:
+                    break
+                self._start(job)
+            if not self._inflight and not any(self._queues.values()):
+                return
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def _start(self, job: _Job) -> None:
+        if job.key and self._by_key.get(job.key) is job:
+            del self._by_key[job.key]  # a newer edit from now on queues behind this one
+        self._busy.add(job.route)
+        self._inflight += 1
+        if job.attempts == 0:
+            self._stats[job.priority].waits.append(time.perf_counter() - job.queued_at)
+        job.attempts += 1
+        asyncio.create_task(self._execute(job))
+
+    async def _execute(self, job: _Job) -> None:
+        try:
+            result = await job.call()
+        except discord.RateLimited as e:
+            self._counters["rate_limited"] += 1
+            self._cooldown[job.route] = time.monotonic() + e.retry_after
+            log.info("[discord_rest] %s rate limited for %.0fs", job.route, e.retry_after)
+            if job.attempts < self.max_attempts:
+                self._requeue(job)
+            else:
+                self._settle(job, exc=e)
+        except Exception as e:
+            self._counters["errors"] += 1
+            self._settle(job, exc=e)
+        else:
+            self._settle(job, result=result)
+        finally:
+            self._busy.discard(job.route)
+            self._inflight -= 1
+            self._wake()
+
+    def _requeue(self, job: _Job) -> None:
+        newer = self._by_key.get(job.key) if job.key else None
+        if newer is not None:
+            newer.futures.extend(job.futures)  # a newer payload was queued meanwhile; it answers both
+            return
+        self._queues[job.priority].appendleft(job)
+        if job.key:
+            self._by_key[job.key] = job
+
+    @staticmethod
+    def _settle(job: _Job, result: Any = None, exc: BaseException | None = None) -> None:
+        for fut in job.futures:
+            if fut.done():
+                continue  # caller gave up waiting
+            if exc is not None:
+                fut.set_exception(exc)
+            else:
+                fut.set_result(result)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "max_inflight": self.max_inflight,
+            "in_flight": self._inflight,
+            "routes_cooling": sum(1 for until in self._cooldown.values() if until > now),
+            **self._counters,
+            **{p.name.lower(): self._stats[p].summary(len(self._queues[p])) for p in Priority},
+        }
+
+
+rest = DiscordScheduler(max_inflight=int(getattr(settings, "DISCORD_REST_MAX_INFLIGHT", 4)))
+
+
+async def send_message(channel, content: str | None = None, *, priority: Priority = Priority.BACKGROUND, **kwargs):
+    return await rest.run(f"channel:{channel.id}", lambda: channel.send(content, **kwargs), priority)
+
+
+async def edit_message(message, *, priority: Priority = Priority.BACKGROUND, **kwargs):
+    """Edit a (partial) message; a queued edit of the same message is replaced, not sent twice."""
+    return await rest.run(f"channel:{message.channel.id}", lambda: message.edit(**kwargs), priority,
+                          key=f"edit:{message.id}")
+
+
+async def rename_channel(channel, name: str, *, priority: Priority = Priority.BACKGROUND):
+    # renames have their own (2 per 10 min) bucket; keep them off the channel's message route
+    return await rest.run(f"channel:{channel.id}:rename", lambda: channel.edit(name=name), priority,
+                          key=f"rename:{channel.id}")
+
+
+async def guild_call(guild_id: int, call: Call, *, priority: Priority = Priority.BACKGROUND, key: str | None = None):
+    return await rest.run(f"guild:{guild_id}", call, priority, key)
@@ -2,9 +2,21 @@ from __future__ import annotations
 import discord
 from discord.ext import commands
 
+from utils.config import settings
+
 def guild_only():
     async def predicate(ctx: commands.Context):
         if ctx.guild is None:
             raise commands.NoPrivateMessage("This command can't be used in DMs.")
         return True
-    return commands.check(predicate)
\ No newline at end of file
+    return commands.check(predicate)
+
+def is_mod(inter: discord.Interaction) -> bool:
+    """Admin, mod or server-mod role (DISCORD_*_ROLE_IDS)."""
+    uid_roles = {r.id for r in getattr(inter.user, "roles", [])}
+    allowed = (
+        set(settings.roles_from_csv(settings.DISCORD_ADMIN_ROLE_IDS))
+        | set(settings.roles_from_csv(settings.DISCORD_MOD_ROLE_IDS))
+        | set(settings.roles_from_csv(settings.DISCORD_SERVER_MOD_ROLE_IDS))
+    )
+    return bool(uid_roles & allowed)
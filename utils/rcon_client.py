@@ -3,45 +3,372 @@ from __future__ import annotations
 import asyncio
 import contextlib
 import logging
-from aiomcrcon import Client
+import socket
+import time
+from dataclasses import dataclass
+from exceptions import RconAuthError, RconError, RconUnavailable
+from utils.circuit_breaker import CircuitBreaker
 from utils.config import settings
+from utils.rcon_protocol import MAX_COMMAND_LEN, RconConnection
+from utils.rcon_scheduler import RconScheduler, scheduler as default_scheduler
+from utils.scheduling import Priority
 
 log = logging.getLogger(__name__)
 
 _CONNECT_TIMEOUT = int(getattr(settings, "RCON_CONNECT_TIMEOUT", 5))
 _CMD_TIMEOUT = int(getattr(settings, "RCON_CMD_TIMEOUT", 8))
+_POOL_SIZE = max(1, int(getattr(settings, "RCON_POOL_SIZE", 4)))
+_PIPELINE_DEPTH = max(1, int(getattr(settings, "RCON_PIPELINE_DEPTH", 1)))
+_KEEPALIVE = max(1, int(getattr(settings, "RCON_KEEPALIVE_SECONDS", 30)))
+_DNS_TTL = int(getattr(settings, "RCON_DNS_TTL_SECONDS", 300))
+_BREAKER_FAILURES = int(getattr(settings, "RCON_BREAKER_FAILURES", 3))
+_BREAKER_RESET = float(getattr(settings, "RCON_BREAKER_RESET_SECONDS", 5))
+_BREAKER_MAX_BACKOFF = float(getattr(settings, "RCON_BREAKER_MAX_BACKOFF_SECONDS", 120))
 
-async def _tcp_probe(host: str, port: int, timeout: float = 3.0) -> None:
-    """Low-level TCP test so we can separate DNS/refused/timeouts from auth errors."""
-    try:
-        fut = asyncio.open_connection(host=host, port=port)
-        reader, writer = await asyncio.wait_for(fut, timeout=timeout)
-        writer.close()
-        with contextlib.suppress(Exception):
-            await writer.wait_closed()
-    except asyncio.TimeoutError as e:
-        raise RuntimeError(f"TCP timeout to {host}:{port}") from e
-    except Exception as e:
-        # DNS error, refused, unreachable, etc.
-        raise RuntimeError(f"TCP connect failed to {host}:{port}: {e}") from e
-
-async def mc_cmd(cmd: str) -> str:
-    """One-shot RCON: TCP probe → connect → send → close, with clear error messages."""
-    host, port, pwd = settings.MC_RCON_HOST, settings.MC_RCON_PORT, settings.MC_RCON_PASSWORD
-    # 1) quick TCP probe
-    await _tcp_probe(host, port, timeout=min(_CONNECT_TIMEOUT, 5))
-    # 2) RCON connect+cmd
-    c = Client(host, port, pwd)
-    try:
-        await asyncio.wait_for(c.connect(), timeout=_CONNECT_TIMEOUT)
-        return await asyncio.wait_for(c.send_cmd(cmd), timeout=_CMD_TIMEOUT)
-    finally:
-        with contextlib.suppress(Exception):
-            await c.close()
-
-async def get_status() -> dict:
-    """Return parsed status from `list`."""
-    out = await mc_cmd("list")
+class _PooledConn:
+    __slots__ = ("conn", "created_at", "last_used", "uses", "load")
+
+    def __init__(self, conn: RconConnection):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+        self.load = 0  # commands reserved/in flight on this socket
+
+class RconPool:
+    """
+    Long-lived RCON connections to one server.
+
+    At most `size` sockets are open and each carries up to `depth` commands in flight.
+    Vanilla's RCON reader drops the connection when two requests arrive in one read, so
+    keep depth at 1 unless the server (or an RCON proxy in front of it) buffers properly.
+    A socket idle for longer than `keepalive` seconds is pinged before reuse, and a command
+    that fails on a reused socket is retried once on a fresh one. While the server is down
+    the circuit breaker rejects commands without touching the network.
+    """
+
+    def __init__(self, host: str, port: int, password: str, *, size: int = _POOL_SIZE,
+                 depth: int = _PIPELINE_DEPTH, keepalive: float = _KEEPALIVE, dns_ttl: float = _DNS_TTL,
+                 scheduler: RconScheduler | None = default_scheduler):
+        self.host, self.port, self.password = host, port, password
+        self.scheduler = scheduler
+        self.size = size
+        self.depth = depth
+        self.keepalive = keepalive
+        self.dns_ttl = dns_ttl
+        self._conns: list[_PooledConn] = []
+        self._slots = asyncio.Semaphore(size * depth)
+        self._connect_lock = asyncio.Lock()
+        self._addr: tuple[str, float] | None = None  # (ip, expires_at)
+        self._dns_lock = asyncio.Lock()
+        self.breaker = CircuitBreaker(_BREAKER_FAILURES, _BREAKER_RESET, _BREAKER_MAX_BACKOFF)
+        self._stats = {
+            "commands": 0,
+            "fast_failed": 0,
+            "connects": 0,
+            "reused": 0,
+            "retries": 0,
+            "discarded": 0,
+            "pings": 0,
+            "timeouts": 0,
+            "dns_lookups": 0,
+            "errors": 0,
+        }
+
+    # ---- DNS ----------------------------------------------------------
+
+    async def _resolve(self) -> str:
+        if self._addr and self._addr[1] > time.monotonic():
+            return self._addr[0]
+        async with self._dns_lock:  # concurrent cold connects share one lookup
+            if self._addr and self._addr[1] > time.monotonic():
+                return self._addr[0]
+            return await self._lookup()
+
+    async def _lookup(self) -> str:
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await asyncio.wait_for(
+                loop.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM),
+                timeout=_CONNECT_TIMEOUT,
+            )
+        except asyncio.TimeoutError as e:
+            raise RconError(f"DNS timeout resolving {self.host}") from e
+        except OSError as e:
+            if self._addr:  # keep serving the stale address rather than failing on a DNS hiccup
+                log.warning("[rcon] DNS lookup for %s failed (%s); reusing %s", self.host, e, self._addr[0])
+                return self._addr[0]
+            raise RconError(f"DNS lookup failed for {self.host}: {e}") from e
+        self._stats["dns_lookups"] += 1
+        ip = infos[0][4][0]
+        self._addr = (ip, time.monotonic() + self.dns_ttl)
+        return ip
+
+    # ---- connections ----------------------------------------------------
+
+    async def _connect(self) -> _PooledConn:
+        ip = await self._resolve()
+        try:
+            conn = await RconConnection.open(ip, self.port, self.password, timeout=_CONNECT_TIMEOUT)
+        except RconAuthError as e:
+            raise RconAuthError(f"RCON auth failed for {self.host}:{self.port} (check MC_RCON_PASSWORD)") from e
+        except asyncio.TimeoutError as e:
+            self._addr = None  # a moved host is picked up on the next attempt
+            raise RconError(f"TCP timeout to {self.host}:{self.port}") from e
+        except (OSError, asyncio.IncompleteReadError, RconError) as e:
+            self._addr = None
+            raise RconError(f"TCP connect failed to {self.host}:{self.port}: {e}") from e
+        self._stats["connects"] += 1
+        return _PooledConn(conn)
+
+    def _discard(self, pc: _PooledConn) -> None:
+        if pc in self._conns:
+            self._conns.remove(pc)
+            self._stats["discarded"] += 1
+        pc.conn.close()
+
+    async def _healthy(self, pc: _PooledConn) -> bool:
+        if pc.conn.closed:
+            return False
+        if pc.load > 1 or time.monotonic() - pc.last_used < self.keepalive:
+            return True
+        self._stats["pings"] += 1
+        try:
+            await pc.conn.ping(timeout=_CONNECT_TIMEOUT)
+            return True
+        except Exception:
+            log.debug("[rcon] idle connection to %s:%s failed keepalive; reconnecting", self.host, self.port)
+            return False
+
+    def _pick(self) -> _PooledConn | None:
+        """Least-loaded open socket with a free slot; most recently used wins ties."""
+        best = None
+        for pc in self._conns:
+            if pc.conn.closed or pc.load >= self.depth:
+                continue
+            if best is None or (pc.load, -pc.last_used) < (best.load, -best.last_used):
+                best = pc
+        return best
+
+    async def _checkout(self) -> _PooledConn:
+        """Reserve a slot on a healthy socket. Caller must hold `self._slots`."""
+        while True:
+            for pc in [pc for pc in self._conns if pc.conn.closed]:
+                self._discard(pc)
+            pc = self._pick()
+            if pc is not None and (pc.load == 0 or len(self._conns) >= self.size):
+                pc.load += 1
+                if await self._healthy(pc):
+                    if pc.uses:
+                        self._stats["reused"] += 1
+                    return pc
+                pc.load -= 1
+                self._discard(pc)
+                continue
+            async with self._connect_lock:
+                pc = self._pick()
+                if pc is None or (pc.load and len(self._conns) < self.size):
+                    pc = await self._connect()
+                    pc.load += 1
+                    self._conns.append(pc)
+                    return pc
+            # another caller opened or freed a socket while we waited for the lock; pick again
+
+    def _release(self, pc: _PooledConn, suspect: bool = False) -> None:
+        pc.load -= 1
+        # a timed-out socket is pinged on its next checkout in case the peer silently went away
+        pc.last_used = 0.0 if suspect else time.monotonic()
+
+    @contextlib.asynccontextmanager
+    async def session(self, priority: Priority = Priority.USER):
+        """Reserve one pool slot and run several commands back-to-back on the same socket."""
+        # the scheduler gate comes first: nobody holds a socket while queued behind priorities
+        async with self.scheduler.slot(priority) if self.scheduler else contextlib.nullcontext():
+            async with self._slots:
+                s = RconSession(self)
+                try:
+                    yield s
+                finally:
+                    s._release()
+
+    async def run(self, cmd: str, timeout: float = _CMD_TIMEOUT, priority: Priority = Priority.USER) -> str:
+        async with self.session(priority) as s:
+            return await s.cmd(cmd, timeout=timeout)
+
+    async def run_many(self, cmds: list[str], *, ordered: bool = True, stop_on_error: bool = False,
+                       timeout: float = _CMD_TIMEOUT, priority: Priority = Priority.USER) -> list[CmdResult]:
+        """
+        ordered=True runs the commands one after another on one socket.
+        ordered=False sends them concurrently across the pool's free slots.
+        With stop_on_error the commands that did not run are reported as skipped.
+        """
+        if ordered:
+            results: list[CmdResult] = []
+            async with self.session(priority) as s:
+                for i, cmd in enumerate(cmds):
+                    r = await s.timed(cmd, timeout=timeout)
+                    results.append(r)
+                    if stop_on_error and not r.ok:
+                        results += [CmdResult(c, error=_SKIPPED) for c in cmds[i + 1:]]
+                        break
+            return results
+
+        async def one(cmd: str) -> CmdResult:
+            async with self.session(priority) as s:
+                return await s.timed(cmd, timeout=timeout)
+
+        tasks = [asyncio.create_task(one(c)) for c in cmds]
+        if stop_on_error:
+            for fut in asyncio.as_completed(tasks):
+                with contextlib.suppress(asyncio.CancelledError):
+                    if not (await fut).ok:
+                        for t in tasks:
+                            t.cancel()
+                        break
+        done = await asyncio.gather(*tasks, return_exceptions=True)
+        return [r if isinstance(r, CmdResult) else CmdResult(c, error=_SKIPPED) for c, r in zip(cmds, done)]
+
+    async def close(self) -> None:
+        conns, self._conns = self._conns, []
+        for pc in conns:
+            pc.conn.close()
+        for pc in conns:
+            await pc.conn.wait_closed()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "target": f"{self.host}:{self.port}",
+            "size": self.size,
+            "depth": self.depth,
+            "open": len(self._conns),
+            "in_flight": sum(pc.load for pc in self._conns),
+            "idle": sum(1 for pc in self._conns if pc.load == 0),
+            "oldest_conn_age_s": round(max((now - pc.created_at for pc in self._conns), default=0.0), 1),
+            "resolved_ip": self._addr[0] if self._addr else None,
+            "breaker": self.breaker.snapshot(),
+            **self._stats,
+        }
+
+@dataclass(frozen=True)
+class CmdResult:
+    cmd: str
+    output: str | None = None
+    error: Exception | None = None
+    elapsed_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+_SKIPPED = RconError("skipped: an earlier command failed")
+
+class RconSession:
+    """Commands sharing one reserved pool slot; get one from `RconPool.session()`."""
+
+    def __init__(self, pool: RconPool):
+        self._pool = pool
+        self._pc: _PooledConn | None = None
+        self._suspect = False
+
+    async def cmd(self, cmd: str, timeout: float = _CMD_TIMEOUT) -> str:
+        if len(cmd.encode("utf-8")) > MAX_COMMAND_LEN:
+            raise ValueError(f"Commands must be {MAX_COMMAND_LEN} bytes or less to be sent via RCON")
+        pool = self._pool
+        pool._stats["commands"] += 1
+        breaker = pool.breaker
+        if not breaker.allow():
+            pool._stats["fast_failed"] += 1
+            raise RconUnavailable(breaker.describe("Minecraft server"))
+        try:
+            out = await self._send(cmd, timeout)
+        except (asyncio.TimeoutError, RconError) as e:
+            breaker.record_failure(e if str(e) else "command timed out")
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return out
+
+    async def _send(self, cmd: str, timeout: float) -> str:
+        pool = self._pool
+        retried = False
+        while True:
+            if self._pc is None:
+                self._pc = await pool._checkout()
+            pc = self._pc
+            try:
+                out = await pc.conn.command(cmd, timeout=timeout)
+            except asyncio.TimeoutError:
+                # replies are matched by id, so the socket stays usable
+                pool._stats["timeouts"] += 1
+                self._suspect = True
+                raise
+            except RconError as e:
+                self._pc = None
+                pc.load -= 1
+                pool._discard(pc)
+                if pc.uses and not retried:
+                    retried = True
+                    pool._stats["retries"] += 1
+                    log.debug("[rcon] stale connection (%s); retrying on a fresh one", e)
+                    continue
+                pool._stats["errors"] += 1
+                raise RconError(f"RCON connection to {pool.host}:{pool.port} lost: {e}") from e
+            pc.uses += 1
+            return out
+
+    async def timed(self, cmd: str, timeout: float = _CMD_TIMEOUT) -> CmdResult:
+        """Like `cmd`, but never raises; the error (if any) is returned in the result."""
+        t0 = time.perf_counter()
+        try:
+            out = await self.cmd(cmd, timeout=timeout)
+        except Exception as e:
+            return CmdResult(cmd, error=e, elapsed_ms=(time.perf_counter() - t0) * 1000)
+        return CmdResult(cmd, output=out, elapsed_ms=(time.perf_counter() - t0) * 1000)
+
+    def _release(self) -> None:
+        if self._pc is not None:
+            self._pool._release(self._pc, suspect=self._suspect)
+            self._pc = None
+
+_pool: RconPool | None = None
+
+def get_pool() -> RconPool:
+    global _pool
+    if _pool is None:
+        _pool = RconPool(settings.MC_RCON_HOST, settings.MC_RCON_PORT, settings.MC_RCON_PASSWORD)
+    return _pool
+
+def rcon_pool_stats() -> dict:
+    return get_pool().stats()
+
+def rcon_health() -> dict:
+    """Circuit breaker state of the default server (for /health and the portal)."""
+    return get_pool().breaker.snapshot()
+
+async def close_pool() -> None:
+    if _pool is not None:
+        await _pool.close()
+
+async def mc_cmd(cmd: str, priority: Priority = Priority.USER, pool: RconPool | None = None) -> str:
+    """Run one RCON command over the shared connection pool (or another server's `pool`)."""
+    return await (pool or get_pool()).run(cmd, priority=priority)
+
+async def mc_cmd_many(cmds: list[str], *, ordered: bool = True, stop_on_error: bool = False,
+                      timeout: float = _CMD_TIMEOUT, priority: Priority = Priority.USER,
+                      pool: RconPool | None = None) -> list[CmdResult]:
+    """Run several RCON commands as one batch; see `RconPool.run_many`."""
+    return await (pool or get_pool()).run_many(cmds, ordered=ordered, stop_on_error=stop_on_error,
+                                               timeout=timeout, priority=priority)
+
+def rcon_session(priority: Priority = Priority.USER, pool: RconPool | None = None):
+    """`async with rcon_session() as s: await s.cmd(...)` — commands share one socket."""
+    return (pool or get_pool()).session(priority)
+
+def parse_list(out: str) -> dict:
+    """Parse the output of `list` ("There are 2 of a max of 20 players online: A, B")."""
     online = 0
     maxp = 0
     players: list[str] = []
@@ -57,6 +384,10 @@ async def get_status() -> dict:
         pass
     return {"raw": out, "online": online, "max": maxp, "players": players}
 
+async def get_status(priority: Priority = Priority.BACKGROUND, pool: RconPool | None = None) -> dict:
+    """Return parsed status from `list` (default server unless `pool` is given)."""
+    return parse_list(await (pool or get_pool()).run("list", priority=priority))
+
 # --------- helpers used by the diag command (optional) ---------
 
 def _mask(s: str | None, keep: int = 2) -> str:
@@ -73,15 +404,8 @@ def get_rcon_env() -> dict:
 
 async def get_rcon_from_properties() -> dict:
     """Read rcon fields via SFTP so we can compare with ENV."""
-    from utils.sftp_client import read_server_properties_text  # lazy import to avoid cycles
-    txt = await read_server_properties_text()
-    d: dict[str, str] = {}
-    for line in txt.splitlines():
-        line = line.strip()
-        if not line or line.startswith("#") or "=" not in line:
-            continue
-        k, v = line.split("=", 1)
-        d[k.strip()] = v.strip()
+    from services.properties_service import get_properties  # lazy import to avoid cycles
+    d = (await get_properties()).values
     return {
         "enable_rcon": d.get("enable-rcon"),
         "rcon_port": int(d["rcon.port"]) if "rcon.port" in d and d["rcon.port"].isdigit() else None,
@@ -0,0 +1,225 @@
+# utils/rcon_protocol.py
+"""
+Minimal asyncio implementation of the Source/Minecraft RCON protocol.
+
+Every request carries its own id, so several commands can be in flight on one socket and a
+late reply to a timed-out command is simply dropped instead of desyncing the stream.
+
+Long outputs arrive as several packets with the same id. A packet shorter than the server's
+fragment size is always the last one; when a full-size fragment arrives we send an empty
+RESPONSE_VALUE packet (the "sentinel"). The server answers it only after it has written every
+fragment of the command before it, so its reply marks the end of the output.
+"""
+from __future__ import annotations
+import asyncio
+import contextlib
+import itertools
+import logging
+import socket
+import struct
+from dataclasses import dataclass, field
+
+from exceptions import RconAuthError, RconError
+
+log = logging.getLogger(__name__)
+
+TYPE_RESPONSE = 0
+TYPE_COMMAND = 2
+TYPE_AUTH_RESPONSE = 2
+TYPE_LOGIN = 3
+
+MAX_COMMAND_LEN = 1446  # vanilla reads requests into a 1460 byte buffer
+FRAGMENT_SIZE = 4096  # vanilla splits responses into 4096 byte bodies
+_MAX_PACKET = 1 << 20  # sanity limit, real servers stay far below this
+
+
+def encode_packet(req_id: int, ptype: int, body: str | bytes) -> bytes:
+    data = body.encode("utf-8") if isinstance(body, str) else body
+    payload = struct.pack("<ii", req_id, ptype) + data + b"\x00\x00"
+    return struct.pack("<i", len(payload)) + payload
+
+
+async def read_packet(reader: asyncio.StreamReader) -> tuple[int, int, bytes]:
+    """Read one packet and return (request id, type, body bytes)."""
+    (length,) = struct.unpack("<i", await reader.readexactly(4))
+    if not 10 <= length <= _MAX_PACKET:
+        raise RconError(f"Malformed RCON packet (length={length})")
+    data = await reader.readexactly(length)
+    req_id, ptype = struct.unpack_from("<ii", data)
+    return req_id, ptype, data[8:-2]
+
+
+@dataclass
+class _Pending:
+    future: asyncio.Future
+    parts: list[bytes] = field(default_factory=list)
+    sentinel_id: int | None = None
+
+
+class RconConnection:
+    """One authenticated RCON socket; use `RconConnection.open(...)` to create it."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._pending: dict[int, _Pending] = {}
+        self._sentinels: dict[int, int] = {}  # sentinel id -> command id
+        self._pings: dict[int, asyncio.Future] = {}
+        self._reader_task: asyncio.Task | None = None
+        self._error: Exception | None = None
+
+    @classmethod
+    async def open(cls, host: str, port: int, password: str, *, timeout: float = 5.0) -> "RconConnection":
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            with contextlib.suppress(OSError):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = cls(reader, writer)
+        try:
+            await asyncio.wait_for(conn._login(password), timeout)
+        except BaseException:
+            conn.close()
+            raise
+        conn._reader_task = asyncio.create_task(conn._read_loop())
+        return conn
+
+    @property
+    def closed(self) -> bool:
+        return self._error is not None or self._writer.is_closing()
+
+    @property
+    def inflight(self) -> int:
+        return len(self._pending) + len(self._pings)
+
+    def _next_id(self) -> int:
+        # stay positive: -1 is the server's "auth failed" marker
+        rid = next(self._ids)
+        if rid >= 2**31 - 1:
+            self._ids = itertools.count(1)
+            rid = next(self._ids)
+        return rid
+
+    def _send(self, req_id: int, ptype: int, body: str | bytes) -> None:
+        if self.closed:
+            raise RconError(f"RCON connection closed: {self._error or 'closed'}")
+        self._writer.write(encode_packet(req_id, ptype, body))
+
+    async def _login(self, password: str) -> None:
+        rid = self._next_id()
+        self._send(rid, TYPE_LOGIN, password)
+        await self._writer.drain()
+        while True:
+            req_id, ptype, _ = await read_packet(self._reader)
+            # some implementations send an empty RESPONSE_VALUE before the auth response
+            if ptype != TYPE_AUTH_RESPONSE:
+                continue
+            if req_id == -1:
+                raise RconAuthError("RCON password rejected")
+            if req_id == rid:
+                return
+
+    async def _read_loop(self) -> None:
+        error: Exception = RconError("RCON connection closed")
+        try:
+            while True:
+                req_id, _, body = await read_packet(self._reader)
+                self._dispatch(req_id, body)
+        except asyncio.CancelledError:
+            pass
+        except asyncio.IncompleteReadError:
+            error = RconError("RCON connection closed by server")
+        except Exception as e:
+            error = e if isinstance(e, RconError) else RconError(f"RCON read failed: {e}")
+        self._fail_all(error)
+
+    def _dispatch(self, req_id: int, body: bytes) -> None:
+        ping = self._pings.pop(req_id, None)
+        if ping is not None:
+            if not ping.done():
+                ping.set_result(None)
+            return
+
+        cmd_id = self._sentinels.pop(req_id, None)
+        if cmd_id is not None:
+            # every fragment of cmd_id has been written before this reply
+            self._complete(cmd_id)
+            return
+
+        p = self._pending.get(req_id)
+        if p is None:
+            return  # late reply to a command that already timed out
+        p.parts.append(body)
+        if len(body) < FRAGMENT_SIZE:
+            self._complete(req_id)
+        elif p.sentinel_id is None:
+            p.sentinel_id = self._next_id()
+            self._sentinels[p.sentinel_id] = req_id
+            with contextlib.suppress(RconError):
+                self._send(p.sentinel_id, TYPE_RESPONSE, b"")
+
+    def _complete(self, cmd_id: int) -> None:
+        p = self._pending.pop(cmd_id, None)
+        if p is None:
+            return
+        if p.sentinel_id is not None:
+            self._sentinels.pop(p.sentinel_id, None)
+        if not p.future.done():
+            p.future.set_result(b"".join(p.parts).decode("utf-8", errors="replace"))
+
+    def _fail_all(self, error: Exception) -> None:
+        self._error = error
+        waiters = [p.future for p in self._pending.values()] + list(self._pings.values())
+        self._pending.clear()
+        self._sentinels.clear()
+        self._pings.clear()
+        for fut in waiters:
+            if not fut.done():
+                fut.set_exception(error)
+        self._writer.close()
+
+    async def _drain(self) -> None:
+        try:
+            await self._writer.drain()
+        except (ConnectionError, OSError) as e:
+            raise RconError(f"RCON write failed: {e}") from e
+
+    async def command(self, cmd: str, *, timeout: float = 8.0) -> str:
+        """Send one command and wait for its complete (reassembled) output."""
+        if len(cmd.encode("utf-8")) > MAX_COMMAND_LEN:
+            raise ValueError(f"Commands must be {MAX_COMMAND_LEN} bytes or less to be sent via RCON")
+        rid = self._next_id()
+        fut = asyncio.get_running_loop().create_future()
+        self._send(rid, TYPE_COMMAND, cmd)
+        self._pending[rid] = _Pending(fut)
+        try:
+            await self._drain()
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            p = self._pending.pop(rid, None)
+            if p is not None and p.sentinel_id is not None:
+                self._sentinels.pop(p.sentinel_id, None)
+
+    async def ping(self, *, timeout: float = 5.0) -> None:
+        """Round-trip an empty RESPONSE_VALUE packet; runs no command on the server."""
+        rid = self._next_id()
+        fut = asyncio.get_running_loop().create_future()
+        self._send(rid, TYPE_RESPONSE, b"")
+        self._pings[rid] = fut
+        try:
+            await self._drain()
+            await asyncio.wait_for(fut, timeout)
+        finally:
+            self._pings.pop(rid, None)
+
+    def close(self) -> None:
+        if self._reader_task is not None and not self._reader_task.done():
+            self._reader_task.cancel()
+        if self._error is None:
+            self._error = RconError("RCON connection closed")
+        self._writer.close()
+
+    async def wait_closed(self) -> None:
+        with contextlib.suppress(Exception):
+            await self._writer.wait_closed()
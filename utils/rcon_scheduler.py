@@ -0,0 +1,90 @@
+# utils/rcon_scheduler.py
+from __future__ import annotations
+import asyncio
+import contextlib
+import time
+from collections import deque
+
+from exceptions import RconBusy
+from utils.config import settings
+from utils.scheduling import ClassStats, Priority
+
+
+class RconScheduler:
+    """
+    Global gate in front of every RCON command.
+
+    At most `max_inflight` commands run at once (each one is work on the Minecraft main
+    thread). When the gate is full, callers queue per priority class and a freed slot is
+    handed to the oldest waiter of the most important class, so an admin command never
+    waits behind a burst of background polls. A full class queue rejects with RconBusy.
+    """
+
+    def __init__(self, max_inflight: int, queue_limits: dict[Priority, int]):
+        self.max_inflight = max(1, max_inflight)
+        self.queue_limits = queue_limits
+        self._inflight = 0
+        self._queues: dict[Priority, deque[asyncio.Future]] = {p: deque() for p in Priority}
+        self._stats = {p: ClassStats() for p in Priority}
+
+    async def acquire(self, priority: Priority) -> None:
+        st = self._stats[priority]
+        st.submitted += 1
+        if self._inflight < self.max_inflight and not any(self._queues.values()):
+            self._inflight += 1
+            st.waits.append(0.0)
+            return
+
+        q = self._queues[priority]
+        if len(q) >= self.queue_limits.get(priority, 0):
+            st.rejected += 1
+            raise RconBusy(f"RCON busy: {len(q)} {priority.name.lower()} command(s) already queued")
+
+        fut = asyncio.get_running_loop().create_future()
+        q.append(fut)
+        t0 = time.perf_counter()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # the slot was handed to us just as we got cancelled
+            else:
+                with contextlib.suppress(ValueError):
+                    q.remove(fut)
+            raise
+        st.waits.append(time.perf_counter() - t0)
+
+    def release(self) -> None:
+        for p in Priority:
+            q = self._queues[p]
+            while q:
+                fut = q.popleft()
+                if not fut.done():
+                    fut.set_result(None)  # hand the slot over; in-flight count is unchanged
+                    return
+        self._inflight -= 1
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: Priority):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_inflight": self.max_inflight,
+            "in_flight": self._inflight,
+            **{p.name.lower(): self._stats[p].summary(len(self._queues[p])) for p in Priority},
+        }
+
+
+scheduler = RconScheduler(
+    max_inflight=int(getattr(settings, "RCON_MAX_INFLIGHT", 4)),
+    queue_limits={
+        Priority.ADMIN: int(getattr(settings, "RCON_QUEUE_LIMIT_ADMIN", 100)),
+        Priority.USER: int(getattr(settings, "RCON_QUEUE_LIMIT_USER", 50)),
+        Priority.BACKGROUND: int(getattr(settings, "RCON_QUEUE_LIMIT_BACKGROUND", 10)),
+    },
+)
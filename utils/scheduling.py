@@ -0,0 +1,38 @@
+# utils/scheduling.py
+"""Priority classes and queue-wait statistics shared by the RCON and Discord REST schedulers."""
+from __future__ import annotations
+from collections import deque
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    """Lower value is served first."""
+    ADMIN = 0       # moderator slash commands (/player ban, /server stop, …)
+    USER = 1        # anyone clicking a button or running a read-only command
+    BACKGROUND = 2  # pollers: status, presence, portal refresh, chat bridge
+
+
+class ClassStats:
+    """Per-priority counters and recent queue waits, summarised for /debug/state."""
+
+    __slots__ = ("submitted", "rejected", "waits")
+
+    def __init__(self):
+        self.submitted = 0
+        self.rejected = 0
+        self.waits: deque[float] = deque(maxlen=512)  # recent queue waits in seconds
+
+    def summary(self, depth: int) -> dict:
+        waits = sorted(self.waits)
+
+        def pct(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else 0.0
+
+        return {
+            "queued": depth,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "wait_ms_p50": pct(0.50),
+            "wait_ms_p95": pct(0.95),
+            "wait_ms_max": round(waits[-1] * 1000, 1) if waits else 0.0,
+        }
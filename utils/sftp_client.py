@@ -1,74 +1,357 @@
 # utils/sftp_client.py
+import asyncio
+import contextlib
+import hashlib
+import logging
+import posixpath
+import re
+import time
+import uuid
+import aiohttp
 import asyncssh
 import stat as pystat
 from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from urllib.parse import unquote, urlsplit
 from utils.config import settings
 
-@asynccontextmanager
-async def sftp_conn():
-    conn = await asyncssh.connect(
-        settings.SFTP_HOST,
-        port=settings.SFTP_PORT,
-        username=settings.SFTP_USERNAME,
-        password=settings.SFTP_PASSWORD,
-        known_hosts=None,
-        keepalive_interval=30,
-        keepalive_count_max=3,
-    )
-    try:
-        sftp = await conn.start_sftp_client()
-        yield sftp
-    finally:
-        conn.close()
-        await conn.wait_closed()
-
-async def upload_plugin_from_url(url: str, dest_dir: str | None = None):
-    import tempfile, os, urllib.request
-    dest_dir = dest_dir or settings.MC_PLUGINS_DIR
-    with tempfile.TemporaryDirectory() as td:
-        local = os.path.join(td, url.split("/")[-1])
-        urllib.request.urlretrieve(url, local)
-        async with sftp_conn() as sftp:
-            await sftp.put(local, f"{dest_dir}/{local.split('/')[-1]}")
-    return True
-
-async def read_server_properties_text() -> str:
-    async with sftp_conn() as sftp:
-        async with (await sftp.open(settings.MC_PROPERTIES_PATH, "r")) as f:
-            data = await f.read()
-        # Some setups may already return str; normalize to str
-        return data if isinstance(data, str) else data.decode(errors="replace")
-
-async def edit_server_properties(kv: dict[str, str]) -> None:
-    async with sftp_conn() as sftp:
-        async with (await sftp.open(settings.MC_PROPERTIES_PATH, "r")) as f:
-            data = await f.read()
-        text = data if isinstance(data, str) else data.decode(errors="replace")
-        lines = text.splitlines()
-        d: dict[str, str] = {}
-        for line in lines:
-            if not line or line.strip().startswith("#") or "=" not in line:
+log = logging.getLogger(__name__)
+
+_POOL_SIZE = max(1, int(getattr(settings, "SSH_POOL_SIZE", 2)))
+_MAX_CHANNELS = max(1, int(getattr(settings, "SSH_MAX_CHANNELS", 8)))
+_IDLE_SECONDS = float(getattr(settings, "SSH_IDLE_SECONDS", 300))
+_CONNECT_TIMEOUT = float(getattr(settings, "SSH_CONNECT_TIMEOUT", 10))
+_PLUGIN_MAX_BYTES = int(getattr(settings, "PLUGIN_MAX_MB", 100)) * 2**20
+_UPLOAD_CHUNK = 64 * 1024
+_UPLOAD_WINDOW = 8  # SFTP writes in flight per upload
+
+@dataclass(frozen=True)
+class SftpTarget:
+    host: str
+    port: int
+    username: str
+    password: str
+
+def default_target() -> SftpTarget:
+    return SftpTarget(settings.SFTP_HOST, settings.SFTP_PORT, settings.SFTP_USERNAME, settings.SFTP_PASSWORD)
+
+@dataclass(eq=False)
+class _SshConn:
+    conn: asyncssh.SSHClientConnection
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    leases: int = 0  # SFTP channels currently handed out
+    uses: int = 0
+    idle_channels: list = field(default_factory=list)  # open SFTPClients ready for reuse
+    idle_timer: asyncio.TimerHandle | None = None
+
+    @property
+    def closed(self) -> bool:
+        return self.conn.is_closed()
+
+def _channel_suspect(exc: BaseException | None) -> bool:
+    """Errors after which an SFTP channel must not be handed out again."""
+    if exc is None:
+        return False
+    if isinstance(exc, asyncssh.SFTPConnectionLost):
+        return True
+    # plain SFTP status errors (no such file, permission denied, …) leave the channel usable
+    return not isinstance(exc, asyncssh.SFTPError)
+
+class SshPool:
+    """
+    Persistent SSH connections shared by every SFTP user, keyed by target.
+
+    Each target gets at most `size` connections and each connection carries up to
+    `channels` SFTP channels at once, so concurrent callers multiplex over one handshake.
+    Channels are kept open between uses; a connection nobody used for `idle` seconds is
+    closed. A dead connection is dropped and the channel is opened again on a fresh one.
+    """
+
+    def __init__(self, *, size: int = _POOL_SIZE, channels: int = _MAX_CHANNELS,
+                 idle: float = _IDLE_SECONDS, connect_timeout: float = _CONNECT_TIMEOUT):
+        self.size = size
+        self.channels = channels
+        self.idle = idle
+        self.connect_timeout = connect_timeout
+        self._conns: dict[SftpTarget, list[_SshConn]] = {}
+        self._slots: dict[SftpTarget, asyncio.Semaphore] = {}
+        self._locks: dict[SftpTarget, asyncio.Lock] = {}
+        self._stats = {"leases": 0, "connects": 0, "channels_opened": 0, "channels_reused": 0,
+                       "retries": 0, "discarded": 0, "evicted": 0, "errors": 0}
+
+    async def _connect(self, target: SftpTarget) -> _SshConn:
+        conn = await asyncio.wait_for(asyncssh.connect(
+            target.host,
+            port=target.port,
+            username=target.username,
+            password=target.password,
+            known_hosts=None,
+            keepalive_interval=30,
+            keepalive_count_max=3,
+        ), self.connect_timeout)
+        self._stats["connects"] += 1
+        log.debug("[sftp] connected to %s:%s", target.host, target.port)
+        return _SshConn(conn)
+
+    def _discard(self, target: SftpTarget, sc: _SshConn) -> None:
+        conns = self._conns.get(target, [])
+        if sc in conns:
+            conns.remove(sc)
+            self._stats["discarded"] += 1
+        if sc.idle_timer is not None:
+            sc.idle_timer.cancel()
+        sc.idle_channels.clear()
+        sc.conn.close()
+
+    async def _reserve(self, target: SftpTarget) -> _SshConn:
+        async with self._locks.setdefault(target, asyncio.Lock()):
+            conns = self._conns.setdefault(target, [])
+            for sc in [c for c in conns if c.closed]:
+                self._discard(target, sc)
+            free = [c for c in conns if c.leases < self.channels]
+            if free:
+                # prefer a connection with a warm channel, then the least loaded one
+                sc = min(free, key=lambda c: (not c.idle_channels, c.leases))
+            elif len(conns) < self.size:
+                sc = await self._connect(target)
+                conns.append(sc)
+            else:  # cannot happen while the semaphore bounds leases; be defensive
+                sc = min(conns, key=lambda c: c.leases)
+            sc.leases += 1
+            sc.uses += 1
+            if sc.idle_timer is not None:
+                sc.idle_timer.cancel()
+                sc.idle_timer = None
+            return sc
+
+    async def _checkout(self, target: SftpTarget) -> tuple[_SshConn, asyncssh.SFTPClient]:
+        retried = False
+        while True:
+            sc = await self._reserve(target)
+            if sc.idle_channels:
+                self._stats["channels_reused"] += 1
+                return sc, sc.idle_channels.pop()
+            try:
+                sftp = await asyncio.wait_for(sc.conn.start_sftp_client(), self.connect_timeout)
+            except (asyncssh.Error, OSError, asyncio.TimeoutError) as e:
+                stale = sc.uses > 1  # it worked before, so the connection died meanwhile
+                self._checkin(target, sc, None, e)
+                self._discard(target, sc)
+                if retried or not stale:
+                    raise
+                log.debug("[sftp] stale connection to %s (%s); reconnecting", target.host, e)
+                self._stats["retries"] += 1
+                retried = True
                 continue
-            k, v = line.split("=", 1)
-            d[k].strip() if False else None  # keep flake8 happy
-            d[k.strip()] = v.strip()
-        d.update(kv)
-        new_text = "\n".join([f"{k}={v}" for k, v in d.items()]) + "\n"
-        payload = new_text if isinstance(data, str) else new_text.encode()
-        async with (await sftp.open(settings.MC_PROPERTIES_PATH, "w")) as f:
-            await f.write(payload)
-
-async def list_plugins(dir_path: str | None = None) -> list[str]:
-    dir_path = dir_path or settings.MC_PLUGINS_DIR
-    names: list[str] = []
-    async with sftp_conn() as sftp:
-        for name in await sftp.listdir(dir_path):
+            self._stats["channels_opened"] += 1
+            return sc, sftp
+
+    def _checkin(self, target: SftpTarget, sc: _SshConn, sftp: asyncssh.SFTPClient | None,
+                 error: BaseException | None) -> None:
+        sc.leases -= 1
+        sc.last_used = time.monotonic()
+        if sftp is not None:
+            if sc.closed or _channel_suspect(error) or len(sc.idle_channels) >= self.channels:
+                sftp.exit()
+            else:
+                sc.idle_channels.append(sftp)
+        if sc.leases == 0 and not sc.closed and self.idle > 0:
+            sc.idle_timer = asyncio.get_running_loop().call_later(self.idle, self._evict, target, sc)
+
+    def _evict(self, target: SftpTarget, sc: _SshConn) -> None:
+        sc.idle_timer = None
+        if sc.leases == 0:
+            self._stats["evicted"] += 1
+            self._discard(target, sc)
+
+    @asynccontextmanager
+    async def sftp(self, target: SftpTarget):
+        async with self._slots.setdefault(target, asyncio.Semaphore(self.size * self.channels)):
+            self._stats["leases"] += 1
             try:
-                attrs = await sftp.stat(f"{dir_path}/{name}")
-                mark_dir = pystat.S_ISDIR(attrs.permissions)
-                names.append(name + ("/" if mark_dir else ""))
+                sc, sftp = await self._checkout(target)
             except Exception:
-                names.append(name)
+                self._stats["errors"] += 1
+                raise
+            error: BaseException | None = None
+            try:
+                yield sftp
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                self._checkin(target, sc, sftp, error)
+
+    @asynccontextmanager
+    async def connection(self, target: SftpTarget):
+        """Lease a slot on a pooled connection for channels the caller opens itself (exec, …)."""
+        async with self._slots.setdefault(target, asyncio.Semaphore(self.size * self.channels)):
+            self._stats["leases"] += 1
+            sc = await self._reserve(target)
+            try:
+                yield sc.conn
+            finally:
+                self._checkin(target, sc, None, None)
+
+    async def close(self) -> None:
+        for target, conns in list(self._conns.items()):
+            for sc in list(conns):
+                self._discard(target, sc)
+                await sc.conn.wait_closed()
+        self._conns.clear()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "targets": {
+                f"{t.username}@{t.host}:{t.port}": {
+                    "open": len(conns),
+                    "leased": sum(c.leases for c in conns),
+                    "idle_channels": sum(len(c.idle_channels) for c in conns),
+                    "oldest_conn_age_s": round(max((now - c.created_at for c in conns), default=0.0), 1),
+                }
+                for t, conns in self._conns.items()
+            },
+            **self._stats,
+        }
+
+ssh_pool = SshPool()
+
+@asynccontextmanager
+async def sftp_conn(target: SftpTarget | None = None):
+    """An SFTP client on a pooled SSH connection; the channel is returned to the pool on exit."""
+    async with ssh_pool.sftp(target or default_target()) as sftp:
+        yield sftp
+
+def ssh_connection(target: SftpTarget | None = None):
+    """`async with ssh_connection() as conn: await conn.create_process(...)` on a pooled connection."""
+    return ssh_pool.connection(target or default_target())
+
+def ssh_pool_stats() -> dict:
+    return ssh_pool.stats()
+
+async def close_ssh_pool() -> None:
+    await ssh_pool.close()
+
+@dataclass(frozen=True)
+class PluginUpload:
+    name: str
+    path: str
+    size: int
+    sha256: str
+
+def _plugin_filename(url: str, content_disposition: str | None = None) -> str:
+    name = posixpath.basename(unquote(urlsplit(url).path))
+    if not name.lower().endswith(".jar") and content_disposition:
+        m = re.search(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)"?', content_disposition)
+        if m:
+            name = posixpath.basename(unquote(m.group(1)))
+    if not name.lower().endswith(".jar") or name.startswith(".") or "\\" in name:
+        raise ValueError("URL does not point to a .jar file")
+    return name
+
+async def replace_file(sftp, src: str, dst: str) -> None:
+    """Move `src` over `dst` on the same SFTP channel, atomically where the server allows it."""
+    try:
+        await sftp.posix_rename(src, dst)  # atomic overwrite (OpenSSH extension)
+    except asyncssh.SFTPOpUnsupported:
+        if await sftp.exists(dst):
+            await sftp.remove(dst)
+        await sftp.rename(src, dst)
+
+async def upload_plugin_from_url(url: str, dest_dir: str | None = None, target: SftpTarget | None = None, *,
+                                 max_bytes: int | None = None, progress=None) -> PluginUpload:
+    """
+    Stream a plugin jar from `url` into `dest_dir` without staging it locally.
+
+    Chunks go straight into a hidden temp file next to the destination (up to _UPLOAD_WINDOW
+    writes in flight), hashed on the way; the finished file is renamed over the old jar so
+    the server never sees a half-written plugin. `progress(done, total)` is awaited at most
+    about once a second; total is None when the server sends no Content-Length.
+    """
+    dest_dir = (dest_dir or settings.MC_PLUGINS_DIR).rstrip("/")
+    max_bytes = max_bytes or _PLUGIN_MAX_BYTES
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=60)
+    async with aiohttp.ClientSession(timeout=timeout) as http:
+        async with http.get(url) as resp:
+            resp.raise_for_status()
+            name = _plugin_filename(str(resp.url), resp.headers.get("Content-Disposition"))
+            total = resp.content_length
+            if total is not None and total > max_bytes:
+                raise ValueError(f"Plugin is {total / 2**20:.1f} MiB; the limit is {max_bytes / 2**20:.0f} MiB")
+            final = f"{dest_dir}/{name}"
+            tmp = f"{dest_dir}/.{name}.{uuid.uuid4().hex[:8]}.part"
+            digest = hashlib.sha256()
+            size = 0
+            last_report = 0.0
+            async with sftp_conn(target) as sftp:
+                try:
+                    async with (await sftp.open(tmp, "wb")) as f:
+                        pending: set[asyncio.Task] = set()
+                        try:
+                            async for chunk in resp.content.iter_chunked(_UPLOAD_CHUNK):
+                                if size == 0 and not chunk.startswith(b"PK"):
+                                    raise ValueError("Downloaded file is not a jar (zip) archive")
+                                if size + len(chunk) > max_bytes:
+                                    raise ValueError(f"Plugin exceeds the {max_bytes / 2**20:.0f} MiB limit")
+                                digest.update(chunk)
+                                pending.add(asyncio.create_task(f.write(chunk, size)))
+                                size += len(chunk)
+                                if len(pending) >= _UPLOAD_WINDOW:
+                                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                                    for t in done:
+                                        t.result()
+                                if progress and time.monotonic() - last_report >= 1.0:
+                                    last_report = time.monotonic()
+                                    await progress(size, total)
+                            await asyncio.gather(*pending)
+                        finally:
+                            for t in pending:
+                                t.cancel()
+                    if total is not None and size != total:
+                        raise ValueError(f"Download truncated: got {size} of {total} bytes")
+                    await replace_file(sftp, tmp, final)
+                except BaseException:
+                    with contextlib.suppress(Exception):
+                        await sftp.remove(tmp)
+                    raise
+    if progress:
+        await progress(size, total or size)
+    log.info("[sftp] uploaded plugin %s (%d bytes, sha256=%s)", final, size, digest.hexdigest())
+    return PluginUpload(name, final, size, digest.hexdigest())
+
+# (target, dir) -> (dir mtime, sorted names); a directory's mtime changes whenever an entry is added/removed/renamed
+_plugin_list_cache: dict[tuple[SftpTarget, str], tuple[int, list[str]]] = {}
+MTIME_SETTLE_SECONDS = 2  # SFTP v3 mtimes have 1 s resolution; don't trust one from the current second
+
+async def plugin_dir_entries(sftp, dir_path: str) -> list[tuple[str, asyncssh.SFTPAttrs]]:
+    """One readdir of `dir_path` with symlinks followed; folder names end with "/"."""
+    entries: list[tuple[str, asyncssh.SFTPAttrs]] = []
+    for entry in await sftp.readdir(dir_path):
+        name, attrs = entry.filename, entry.attrs
+        if name in (".", ".."):
+            continue
+        if attrs.permissions is not None and pystat.S_ISLNK(attrs.permissions):
+            with contextlib.suppress(Exception):  # readdir attrs are lstat(); follow symlinks
+                attrs = await sftp.stat(f"{dir_path}/{name}")
+        is_dir = attrs.permissions is not None and pystat.S_ISDIR(attrs.permissions)
+        entries.append((name + ("/" if is_dir else ""), attrs))
+    return entries
+
+async def list_plugins(dir_path: str | None = None, target: SftpTarget | None = None) -> list[str]:
+    """Jars first, then other entries (folders end with "/"); one readdir, cached until the dir changes."""
+    dir_path = dir_path or settings.MC_PLUGINS_DIR
+    key = (target or default_target(), dir_path)
+    async with sftp_conn(target) as sftp:
+        mtime = int((await sftp.stat(dir_path)).mtime or 0)
+        cached = _plugin_list_cache.get(key)
+        if cached and cached[0] == mtime:
+            return list(cached[1])
+        names = [name for name, _ in await plugin_dir_entries(sftp, dir_path)]
     jars = sorted([n for n in names if n.lower().endswith(".jar")])
-    rest = sorted([n for n in names if n not in jars])
-    return jars + rest
+    rest = sorted([n for n in names if not n.lower().endswith(".jar")])
+    result = jars + rest
+    if time.time() - mtime >= MTIME_SETTLE_SECONDS:
+        _plugin_list_cache[key] = (mtime, result)
+    return list(result)